@@ -0,0 +1,25 @@
+"""add_clinicas_tipo_servico_index
+
+Revision ID: 2d8a6f3b1c07
+Revises: 9e1f4c7a2d53
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8a6f3b1c07'
+down_revision = '9e1f4c7a2d53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Clínicas por tipo de serviço (detalhes completos do pet, agendamento)
+    op.create_index(op.f('ix_clinicas_tipo_servico'), 'clinicas', ['tipo_servico'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_clinicas_tipo_servico'), table_name='clinicas')
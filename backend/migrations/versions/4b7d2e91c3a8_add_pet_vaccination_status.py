@@ -0,0 +1,57 @@
+"""add_pet_vaccination_status
+
+Revision ID: 4b7d2e91c3a8
+Revises: add_concurso_table
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7d2e91c3a8'
+down_revision = 'add_concurso_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pet_vaccination_status',
+        sa.Column('pet_id', sa.Integer(), nullable=False),
+        sa.Column('ultima_vacinacao', sa.Date(), nullable=False),
+        sa.Column('proxima_vacinacao', sa.Date(), nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['pet_id'], ['pets.id'], ),
+        sa.PrimaryKeyConstraint('pet_id')
+    )
+    op.create_index(op.f('ix_pet_vaccination_status_proxima_vacinacao'), 'pet_vaccination_status', ['proxima_vacinacao'], unique=False)
+
+    # Popular o resumo com as vacinações já existentes (validade de 365 dias).
+    # A data de vencimento é calculada em Python: aritmética de datas em SQL muda de banco para banco.
+    servicos = sa.table('servicos', sa.column('pet_id', sa.Integer), sa.column('tipo', sa.String),
+                        sa.column('data_agendada', sa.Date))
+    resumo = sa.table('pet_vaccination_status', sa.column('pet_id', sa.Integer), sa.column('ultima_vacinacao', sa.Date),
+                      sa.column('proxima_vacinacao', sa.Date), sa.column('atualizado_em', sa.DateTime))
+    ultimas = op.get_bind().execute(
+        sa.select(servicos.c.pet_id, sa.func.max(servicos.c.data_agendada))
+        .where(servicos.c.tipo == 'vacinacao')
+        .group_by(servicos.c.pet_id)
+    ).all()
+    agora = datetime.now()
+    linhas = []
+    for pet_id, ultima in ultimas:
+        if isinstance(ultima, str):  # SQLite devolve datas de func.max() como texto
+            ultima = date.fromisoformat(ultima[:10])
+        linhas.append({'pet_id': pet_id, 'ultima_vacinacao': ultima,
+                       'proxima_vacinacao': ultima + timedelta(days=365), 'atualizado_em': agora})
+    if linhas:
+        op.bulk_insert(resumo, linhas)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pet_vaccination_status_proxima_vacinacao'), table_name='pet_vaccination_status')
+    op.drop_table('pet_vaccination_status')
@@ -0,0 +1,37 @@
+"""add_concurso_votes
+
+Revision ID: 6c3e9a1f7b24
+Revises: 2d8a6f3b1c07
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c3e9a1f7b24'
+down_revision = '2d8a6f3b1c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Um voto por usuário e foto; o índice único (concurso_id, user_id) também serve as buscas por foto
+    op.create_table(
+        'concurso_votes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('concurso_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('data_voto', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['concurso_id'], ['concursos.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('concurso_id', 'user_id', name='uq_concurso_votes_concurso_user')
+    )
+    op.create_index(op.f('ix_concurso_votes_user_id'), 'concurso_votes', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_concurso_votes_user_id'), table_name='concurso_votes')
+    op.drop_table('concurso_votes')
@@ -0,0 +1,61 @@
+"""add_agendamentos_recorrentes
+
+Revision ID: 8f2b5d4e6a19
+Revises: 6c3e9a1f7b24
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2b5d4e6a19'
+down_revision = '6c3e9a1f7b24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'agendamentos_recorrentes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('pet_id', sa.Integer(), nullable=False),
+        sa.Column('clinica_id', sa.Integer(), nullable=True),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('intervalo', sa.Integer(), nullable=False),
+        sa.Column('unidade', sa.String(length=10), nullable=False),
+        sa.Column('data_inicio', sa.Date(), nullable=False),
+        sa.Column('data_fim', sa.Date(), nullable=True),
+        sa.Column('max_ocorrencias', sa.Integer(), nullable=True),
+        sa.Column('ocorrencias_geradas', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('passos_gerados', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('gerado_ate', sa.Date(), nullable=True),
+        sa.Column('preco', sa.Float(), nullable=True),
+        sa.Column('clinica', sa.String(length=100), nullable=True),
+        sa.Column('veterinario', sa.String(length=100), nullable=True),
+        sa.Column('ativo', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.Column('versao', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['pet_id'], ['pets.id'], ),
+        sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_agendamentos_recorrentes_pet_id'), 'agendamentos_recorrentes', ['pet_id'], unique=False)
+    op.create_index(op.f('ix_agendamentos_recorrentes_ativo'), 'agendamentos_recorrentes', ['ativo'], unique=False)
+
+    with op.batch_alter_table('servicos') as batch_op:
+        batch_op.add_column(sa.Column('recorrencia_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_servicos_recorrencia_id', 'agendamentos_recorrentes', ['recorrencia_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_servicos_recorrencia_id'), ['recorrencia_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('servicos') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_servicos_recorrencia_id'))
+        batch_op.drop_constraint('fk_servicos_recorrencia_id', type_='foreignkey')
+        batch_op.drop_column('recorrencia_id')
+
+    op.drop_index(op.f('ix_agendamentos_recorrentes_ativo'), table_name='agendamentos_recorrentes')
+    op.drop_index(op.f('ix_agendamentos_recorrentes_pet_id'), table_name='agendamentos_recorrentes')
+    op.drop_table('agendamentos_recorrentes')
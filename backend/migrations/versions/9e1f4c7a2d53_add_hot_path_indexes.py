@@ -0,0 +1,36 @@
+"""add_hot_path_indexes
+
+Revision ID: 9e1f4c7a2d53
+Revises: 4b7d2e91c3a8
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f4c7a2d53'
+down_revision = '4b7d2e91c3a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serviços de um pet por tipo e data (vacinações, atrasados, gastos do mês)
+    op.create_index('ix_servicos_pet_tipo_data', 'servicos', ['pet_id', 'tipo', 'data_agendada'], unique=False)
+    # Intervalos de data sem filtro de pet (próximos agendamentos, limpeza de atrasados)
+    op.create_index(op.f('ix_servicos_data_agendada'), 'servicos', ['data_agendada'], unique=False)
+    # Pets de um usuário
+    op.create_index(op.f('ix_pets_owner_id'), 'pets', ['owner_id'], unique=False)
+    # Foto do concurso de um pet e ranking por votos
+    op.create_index(op.f('ix_concursos_pet_id'), 'concursos', ['pet_id'], unique=False)
+    op.create_index('ix_concursos_votos_data_envio', 'concursos', ['votos', 'data_envio'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_concursos_votos_data_envio', table_name='concursos')
+    op.drop_index(op.f('ix_concursos_pet_id'), table_name='concursos')
+    op.drop_index(op.f('ix_pets_owner_id'), table_name='pets')
+    op.drop_index(op.f('ix_servicos_data_agendada'), table_name='servicos')
+    op.drop_index('ix_servicos_pet_tipo_data', table_name='servicos')
@@ -0,0 +1,44 @@
+"""add_servicos_archive
+
+Revision ID: a3c7e2f9b841
+Revises: 8f2b5d4e6a19
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c7e2f9b841'
+down_revision = '8f2b5d4e6a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serviços passados saem de servicos e ficam aqui com o mesmo id (histórico)
+    op.create_table(
+        'servicos_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('pet_id', sa.Integer(), nullable=False),
+        sa.Column('clinica_id', sa.Integer(), nullable=True),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('data_agendada', sa.Date(), nullable=False),
+        sa.Column('preco', sa.Float(), nullable=True),
+        sa.Column('clinica', sa.String(length=100), nullable=True),
+        sa.Column('veterinario', sa.String(length=100), nullable=True),
+        sa.Column('recorrencia_id', sa.Integer(), nullable=True),
+        sa.Column('arquivado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['pet_id'], ['pets.id'], ),
+        sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_servicos_archive_pet_data', 'servicos_archive', ['pet_id', 'data_agendada', 'id'], unique=False)
+    op.create_index('ix_servicos_archive_pet_tipo_data', 'servicos_archive', ['pet_id', 'tipo', 'data_agendada'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_servicos_archive_pet_tipo_data', table_name='servicos_archive')
+    op.drop_index('ix_servicos_archive_pet_data', table_name='servicos_archive')
+    op.drop_table('servicos_archive')
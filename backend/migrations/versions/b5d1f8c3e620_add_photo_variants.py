@@ -0,0 +1,29 @@
+"""add_photo_variants
+
+Revision ID: b5d1f8c3e620
+Revises: a3c7e2f9b841
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1f8c3e620'
+down_revision = 'a3c7e2f9b841'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # URLs das miniaturas/versões WebP geradas em segundo plano, em JSON
+    op.add_column('pets', sa.Column('photo_variants', sa.String(), nullable=True))
+    op.add_column('concursos', sa.Column('imagem_variants', sa.String(length=1000), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('concursos') as batch_op:
+        batch_op.drop_column('imagem_variants')
+    with op.batch_alter_table('pets') as batch_op:
+        batch_op.drop_column('photo_variants')
@@ -0,0 +1,35 @@
+"""add_arquivos
+
+Revision ID: c9e4a7b2d315
+Revises: b5d1f8c3e620
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a7b2d315'
+down_revision = 'b5d1f8c3e620'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Uploads gravados pelo conteúdo (ab/cd/<sha256>.<ext>) e quantas fotos usam cada um
+    op.create_table(
+        'arquivos',
+        sa.Column('caminho', sa.String(length=200), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('tamanho', sa.Integer(), nullable=False),
+        sa.Column('referencias', sa.Integer(), nullable=False),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('caminho')
+    )
+    op.create_index(op.f('ix_arquivos_hash'), 'arquivos', ['hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_arquivos_hash'), table_name='arquivos')
+    op.drop_table('arquivos')
@@ -0,0 +1,38 @@
+"""add_upload_sessoes
+
+Revision ID: e2b6d9f4a718
+Revises: c9e4a7b2d315
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6d9f4a718'
+down_revision = 'c9e4a7b2d315'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Uploads retomáveis em andamento (os blocos ficam em disco, em uploads/.tmp/sessoes/<id>/)
+    op.create_table(
+        'upload_sessoes',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('destino', sa.String(length=20), nullable=False),
+        sa.Column('pet_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('descricao', sa.Text(), nullable=True),
+        sa.Column('tamanho', sa.Integer(), nullable=False),
+        sa.Column('tamanho_bloco', sa.Integer(), nullable=False),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_sessoes_criado_em'), 'upload_sessoes', ['criado_em'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_upload_sessoes_criado_em'), table_name='upload_sessoes')
+    op.drop_table('upload_sessoes')
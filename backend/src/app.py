@@ -1,22 +1,49 @@
 
-from flask import Flask, request, jsonify, send_from_directory, redirect, session, url_for
+from flask import Flask, Response, request, jsonify, send_from_directory, redirect, session, url_for, g
+from functools import wraps
 from services.AuthService import AuthService
 from services.GmailOAuthService import gmail_service
+from services.VaccinationService import vaccination_service
+from services.DashboardService import dashboard_service
+from services.ClinicCatalogService import clinic_catalog
+from services.VoteCounterService import vote_counter
+from services.LeaderboardService import leaderboard
+from services.ContestStreamService import contest_stream
+from services.PetImportService import pet_import_service
+from services.RecurrenceService import recurrence_service
+from services.SchedulerService import scheduler
+from services.OverdueCleanupService import overdue_cleanup
+from services.ServicoArchiveService import servico_archive
+from services.ImageVariantService import VARIANTES, image_variants, variant_filename
+from services.UploadStorageService import upload_storage
+from services.ResumableUploadService import resumable_uploads
 from flask_cors import CORS
 import os
 import secrets
-from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename
+from datetime import date, datetime, timedelta
 from models.Pet import Pet
 from models.User import User
 from models.PasswordReset import PasswordReset
 from models.Servico import Servico
+from models.ServicoArquivado import ServicoArquivado
 from models.Clinica import Clinica
 from models.Concurso import Concurso
+from models.ConcursoVoto import ConcursoVoto
+from models.AgendamentoRecorrente import AgendamentoRecorrente
+from models.UploadSessao import UploadSessao
 from config.database import SessionLocal, Base, engine
+from config.request_session import get_request_db, init_app as init_request_session
+from config.pagination import encode_cursor, keyset_page, page_args
+from config.streaming import ndjson_response, wants_ndjson
+from config.uploads import EXTENSOES_IMAGEM, init_app as init_uploads, send_upload
+from config.startup import init_app as init_startup
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager, joinedload, lazyload, raiseload
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 from openai import OpenAI
 from dotenv import load_dotenv
 import json
+import click
 
 # Load environment variables from parent directory (backend/.env)
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
@@ -35,13 +62,15 @@ else:
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'petcloud-secret-key-change-in-production')
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=['X-DB-Queries', 'X-DB-Time-Ms', 'X-DB-Rows'])  # Enable CORS for all routes
+init_request_session(app)  # Sessão do banco por requisição + métricas
 
 # Configurações de upload
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+ALLOWED_EXTENSIONS = EXTENSOES_IMAGEM
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+init_uploads(app)  # Imagens gravadas em fluxo, conferidas pelos bytes mágicos (MAX_IMAGE_SIZE)
 
 # Criar pasta de uploads se não existir
 if not os.path.exists(UPLOAD_FOLDER):
@@ -53,6 +82,58 @@ def allowed_file(filename):
 # Cria todas as tabelas (incluindo password_resets)
 Base.metadata.create_all(bind=engine)
 
+auth_service = AuthService(secret_key=app.secret_key)
+# Identificar o usuário pelo user_email da requisição, sem token (desligado por padrão)
+app.config['AUTH_LEGACY_USER_EMAIL'] = os.environ.get('AUTH_LEGACY_USER_EMAIL', '').lower() in ('1', 'true', 'yes')
+# Tarefas periódicas no próprio processo web (desligue e use 'flask run-scheduled-jobs' com vários workers)
+app.config['SCHEDULER_IN_WEB'] = os.environ.get('SCHEDULER_IN_WEB', 'true').lower() in ('1', 'true', 'yes')
+
+def with_current_user(view):
+    """
+    Resolve g.current_user a partir do token assinado emitido no login, sem consultar o banco.
+    O token vem do cabeçalho 'Authorization: Bearer <token>' ou do parâmetro 'token'.
+    Sem token, g.current_user fica None; token inválido ou expirado retorna 401.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = None
+        authorization = request.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):].strip()
+        token = token or request.args.get('token')
+        
+        g.current_user = auth_service.user_from_token(token) if token else None
+        if token and g.current_user is None:
+            return jsonify({
+                'success': False,
+                'message': 'Sessão expirada. Por favor, faça login novamente.'
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def _resolve_user(db, user_email):
+    """
+    Usuário do token (sem consulta). O user_email enviado pelo cliente só é aceito com
+    AUTH_LEGACY_USER_EMAIL ligado (clientes antigos, sem token): qualquer um pode mandar qualquer email.
+    """
+    if g.get('current_user') is not None:
+        return g.current_user
+    if user_email and app.config['AUTH_LEGACY_USER_EMAIL']:
+        return db.query(User).filter(User.email == user_email).first()
+    return None
+
+def _require_user(db, user_email):
+    """
+    Como _resolve_user, para rotas que só fazem sentido para um usuário (nunca caem para todos).
+    Returns: (user, None) ou (None, resposta 401 sem usuário identificado / 404 para email desconhecido)
+    """
+    user = _resolve_user(db, user_email)
+    if user:
+        return user, None
+    if user_email and app.config['AUTH_LEGACY_USER_EMAIL']:
+        return None, (jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404)
+    return None, (jsonify({'success': False, 'message': 'Faça login para continuar.'}), 401)
+
 # Obtém o diretório raiz do projeto
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -63,12 +144,25 @@ def home():
     return send_from_directory(ROOT_DIR, 'index.html')
 
 # Rota para servir arquivos de upload
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    """
+    Serve um upload (cache, Range e X-Sendfile/X-Accel-Redirect: ver send_upload).
+    Com ?variant=thumb|webp serve a variante gerada em segundo plano, ou o original
+    enquanto ela ainda não existe.
+    """
+    variante = request.args.get('variant')
+    if variante in VARIANTES:
+        arquivo_variante = variant_filename(filename, variante)
+        if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], arquivo_variante)):
+            return send_upload(arquivo_variante)
+        # Sem cache longo: quando a variante ficar pronta, esta mesma URL passa a servi-la
+        return send_upload(filename, imutavel=False)
+    return send_upload(filename)
 
 # Rota para cadastro de pet
 @app.route('/api/pets', methods=['POST'])
+@with_current_user
 def cadastrar_pet():
     # Verificar se é JSON ou FormData
     if request.content_type and 'multipart/form-data' in request.content_type:
@@ -80,6 +174,8 @@ def cadastrar_pet():
         descricao = request.form.get('descricao')
         user_email = request.form.get('user_email')  # Email do usuário logado
         
+        foto = None
+        
         # Processar tags de comportamento
         behavior_tags_str = request.form.get('behavior_tags', '[]')
         print(f"[DEBUG] behavior_tags recebido (string): {behavior_tags_str}")
@@ -90,19 +186,11 @@ def cadastrar_pet():
             print(f"[DEBUG] Erro ao parsear behavior_tags: {e}")
             behavior_tags = []
         
-        # Processar imagem se enviada
-        photo_url = None
+        # Imagem enviada: gravada só depois da validação dos campos
         if 'foto' in request.files:
             file = request.files['foto']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Adicionar timestamp para evitar conflitos
-                from datetime import datetime
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                photo_url = f"/uploads/{filename}"
+                foto = file
     else:
         # JSON tradicional
         data = request.get_json()
@@ -113,7 +201,7 @@ def cadastrar_pet():
         descricao = data.get('descricao')
         user_email = data.get('user_email')  # Email do usuário logado
         behavior_tags = data.get('behavior_tags', [])
-        photo_url = None
+        foto = None
 
     # Validação dos campos obrigatórios
     if not all([name, breed, birth_date]):
@@ -132,20 +220,23 @@ def cadastrar_pet():
             'message': 'Data de nascimento inválida. Use o formato YYYY-MM-DD.'
         }), 400
 
-    db = SessionLocal()
+    db = get_request_db()
     
-    # Buscar owner_id pelo email do usuário
+    # Dono do pet: usuário do token ou, em clientes antigos, busca pelo email
     owner_id = None
-    if user_email:
-        user = db.query(User).filter(User.email == user_email).first()
-        if user:
-            owner_id = user.id
-            print(f"[CADASTRO] Usuário encontrado: {user.name} (ID: {owner_id})")
-        else:
-            print(f"[CADASTRO] Usuário com email {user_email} não encontrado")
+    user = _resolve_user(db, user_email)
+    if user:
+        owner_id = user.id
+        print(f"[CADASTRO] Usuário encontrado: {user.name} (ID: {owner_id})")
+    elif user_email:
+        print(f"[CADASTRO] Usuário com email {user_email} não encontrado")
     else:
         print(f"[CADASTRO] Nenhum email de usuário fornecido")
     
+    # Foto gravada pelo conteúdo (fotos repetidas não ocupam disco de novo), depois de validar os campos
+    arquivo_foto = upload_storage.store(app.config['UPLOAD_FOLDER'], foto.stream) if foto else None
+    photo_url = arquivo_foto.url if arquivo_foto else None
+    
     pet = Pet(
         name=name, 
         breed=breed, 
@@ -160,10 +251,12 @@ def cadastrar_pet():
         pet.behavior_tags = json.dumps(behavior_tags)
     
     db.add(pet)
+    if arquivo_foto:
+        upload_storage.acquire(db, arquivo_foto)
     db.commit()
     db.refresh(pet)
+    image_variants.schedule_pet(app.config['UPLOAD_FOLDER'], pet.id, pet.photo_url)
     print(f"[CADASTRO] Pet cadastrado: id={pet.id}, nome={pet.name}, tipo={pet.type}, raca={pet.breed}, nascimento={pet.birth_date}, foto={pet.photo_url}, tags={behavior_tags}, owner_id={pet.owner_id}")
-    db.close()
     return jsonify({
         'success': True,
         'message': 'Pet cadastrado com sucesso!',
@@ -177,17 +270,74 @@ def cadastrar_pet():
         }
     }), 201
 
+@app.route('/api/pets/import', methods=['POST'])
+@with_current_user
+def importar_pets():
+    """
+    Importação de pets em lote (abrigos, clínicas).
+    Aceita um arquivo CSV ou NDJSON no campo 'arquivo' (multipart) ou no corpo da requisição
+    (Content-Type text/csv ou application/x-ndjson; ou ?format=csv|ndjson).
+    Campos por linha: nome, raca, birth_date (YYYY-MM-DD), especie, behavior_tags e owner_email.
+    Os pets ficam sempre com o usuário que fez a importação; linhas com owner_email de outra
+    pessoa são rejeitadas.
+    Retorna quantos pets foram importados e os erros de cada linha rejeitada.
+    """
+    db = get_request_db()
+    try:
+        arquivo = request.files.get('arquivo')
+        if arquivo:
+            stream, formato = arquivo.stream, pet_import_service.detect_format(arquivo.content_type, arquivo.filename)
+        else:
+            stream, formato = request.stream, pet_import_service.detect_format(request.content_type, None)
+        formato = (request.args.get('format') or formato or '').lower()
+        if formato not in pet_import_service.FORMATOS:
+            return jsonify({
+                'success': False,
+                'message': 'Formato não suportado. Envie um arquivo CSV ou NDJSON.'
+            }), 400
+        
+        # Dono: usuário do token ou, em clientes antigos, busca pelo email
+        user_email = request.args.get('user_email') or request.form.get('user_email')
+        dono = _resolve_user(db, user_email)
+        if not dono:
+            if user_email:
+                return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
+            return jsonify({'success': False, 'message': 'Faça login para importar pets.'}), 401
+        
+        relatorio = pet_import_service.import_pets(db, stream, formato, dono.id, dono.email)
+        
+        status = 201 if relatorio['importados'] else (422 if relatorio['rejeitados'] else 200)
+        return jsonify({'success': status != 422, **relatorio}), status
+        
+    except Exception as e:
+        db.rollback()
+        print(f"[ERRO] Erro ao importar pets: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao importar pets.'}), 500
+
+
 # Rota para listar todos os pets
 @app.route('/api/pets', methods=['GET'])
+@with_current_user
 def listar_pets():
-    db = SessionLocal()
+    """
+    Lista os pets do usuário (ou todos, sem user_email) ordenados por id.
+    Sem limit nem cursor, devolve todos (contrato das páginas listagem, concurso e dashboard).
+    Com limit (máximo 200) ou cursor (next_cursor da página anterior), pagina por keyset.
+    Com stream=ndjson, exporta todos os pets (um JSON por linha) sem paginar.
+    """
+    db = get_request_db()
     try:
         # Obter email do usuário dos parâmetros da query
         user_email = request.args.get('user_email')
-        
-        if user_email:
-            # Buscar o usuário pelo email
-            user = db.query(User).filter(User.email == user_email).first()
+        try:
+            limit, chave = page_args(request.args, (int,))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos.'}), 400
+        
+        query = db.query(Pet)
+        if g.current_user or user_email:
+            # Usuário do token ou, em clientes antigos, busca pelo email
+            user = _resolve_user(db, user_email)
             if not user:
                 print(f"[LISTAGEM] Usuário com email {user_email} não encontrado")
                 return jsonify({
@@ -196,28 +346,33 @@ def listar_pets():
                 }), 404
             
             # Filtrar pets pelo owner_id do usuário
-            pets = db.query(Pet).filter(Pet.owner_id == user.id).all()
-            print(f"[LISTAGEM] Retornando {len(pets)} pets do usuário {user.name} (ID: {user.id})")
+            query = query.filter(Pet.owner_id == user.id)
+            dono = f"do usuário {user.name} (ID: {user.id})"
         else:
-            # Se não passar email, retorna todos os pets (modo legado)
-            pets = db.query(Pet).all()
-            print(f"[LISTAGEM] Nenhum user_email fornecido. Retornando todos os {len(pets)} pets")
+            # Se não passar email, lista todos os pets (modo legado), também paginado
+            dono = "de todos os usuários (nenhum user_email fornecido)"
+        
+        if wants_ndjson():
+            # Exportação: só as colunas do resumo, lidas em lotes e enviadas conforme chegam
+            colunas = [getattr(Pet, coluna) for coluna in Pet.SUMMARY_COLUMNS]
+            exportacao = query.with_entities(*colunas).order_by(Pet.id)
+            print(f"[LISTAGEM] Exportando (ndjson) pets {dono}")
+            return ndjson_response(exportacao, Pet.summary_dict)
+        
+        if 'limit' in request.args or 'cursor' in request.args:
+            pets, next_cursor = keyset_page(query, (Pet.id,), chave, limit, lambda pet: (pet.id,))
+        else:
+            # Clientes que não paginam recebem a lista completa numa resposta só
+            pets, next_cursor, limit = query.order_by(Pet.id).all(), None, None
+        print(f"[LISTAGEM] Retornando {len(pets)} pets {dono}")
         
-        pets_list = []
-        for pet in pets:
-            pets_list.append({
-                'id': pet.id,
-                'name': pet.name,
-                'type': pet.type,
-                'breed': pet.breed,
-                'birth_date': pet.birth_date.strftime('%Y-%m-%d') if pet.birth_date else None,
-                'photo_url': pet.photo_url if hasattr(pet, 'photo_url') else None,
-                'owner_id': pet.owner_id if hasattr(pet, 'owner_id') else None
-            })
+        pets_list = [pet.to_summary_dict() for pet in pets]
         
         return jsonify({
             'success': True,
-            'pets': pets_list
+            'pets': pets_list,
+            'limit': limit,
+            'next_cursor': next_cursor
         }), 200
     except Exception as e:
         print(f"[ERRO] Erro ao listar pets: {e}")
@@ -225,21 +380,32 @@ def listar_pets():
             'success': False,
             'message': 'Erro ao listar pets'
         }), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/users', methods=['GET'])
 def listar_usuarios():
-    """Endpoint para listar usuários (com filtro opcional por email)"""
-    db = SessionLocal()
+    """
+    Endpoint para listar usuários (com filtro opcional por email) em páginas ordenadas por id.
+    Parâmetros: limit (padrão 50, máximo 200) e cursor (next_cursor da página anterior).
+    Com stream=ndjson, exporta todos os usuários (um JSON por linha) sem paginar.
+    """
+    db = get_request_db()
     try:
         email = request.args.get('email')
+        try:
+            limit, chave = page_args(request.args, (int,))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos.'}), 400
         
+        # Só as colunas expostas, sem montar objetos User
+        query = db.query(User.id, User.name, User.email)
         if email:
-            users = db.query(User).filter(User.email == email).all()
-        else:
-            users = db.query(User).all()
+            query = query.filter(User.email == email)
+        
+        if wants_ndjson():
+            return ndjson_response(query.order_by(User.id), lambda user: dict(user._mapping))
+        
+        users, next_cursor = keyset_page(query, (User.id,), chave, limit, lambda user: (user.id,))
         
         users_list = []
         for user in users:
@@ -251,7 +417,9 @@ def listar_usuarios():
         
         return jsonify({
             'success': True,
-            'users': users_list
+            'users': users_list,
+            'limit': limit,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -260,93 +428,54 @@ def listar_usuarios():
             'success': False,
             'message': 'Erro ao listar usuários'
         }), 500
-    finally:
-        db.close()
 
 
 # Rota para estatísticas do dashboard
 @app.route('/api/dashboard/stats', methods=['GET'])
+@with_current_user
 def dashboard_stats():
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Obter email do usuário dos parâmetros da query
         user_email = request.args.get('user_email')
         
-        if not user_email:
+        if not g.current_user and not user_email:
             return jsonify({
                 'success': False,
                 'message': 'Email do usuário não fornecido'
             }), 400
         
-        # Buscar o usuário pelo email
-        user = db.query(User).filter(User.email == user_email).first()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
         if not user:
             return jsonify({
                 'success': False,
                 'message': 'Usuário não encontrado'
             }), 404
         
-        # Total de pets registrados DO USUÁRIO
-        total_pets = db.query(Pet).filter(Pet.owner_id == user.id).count()
-        
-        # Calcular gastos do mês atual (dezembro/2025)
-        hoje = datetime.now()
-        primeiro_dia_mes_atual = hoje.replace(day=1)
-        ultimo_dia_mes_atual = (primeiro_dia_mes_atual.replace(month=primeiro_dia_mes_atual.month % 12 + 1, day=1) - timedelta(days=1)) if primeiro_dia_mes_atual.month < 12 else primeiro_dia_mes_atual.replace(day=31)
+        hoje = datetime.now().date()
         
-        # Buscar IDs dos pets do usuário
-        pet_ids = [pet.id for pet in db.query(Pet).filter(Pet.owner_id == user.id).all()]
+        # Status de vacinação de todos os pets DO USUÁRIO (uma única consulta agrupada)
+        status_pets = vaccination_service.status_for_pets(db, owner_id=user.id, hoje=hoje)
         
-        # Buscar serviços do mês atual (1 a 31 de dezembro) com preço DOS PETS DO USUÁRIO
+        # Buscar serviços do mês atual com preço DOS PETS DO USUÁRIO
+        primeiro_dia_mes_atual, ultimo_dia_mes_atual = dashboard_service.month_range(hoje)
+        pet_ids = [status['pet_id'] for status in status_pets]
         servicos_mes = db.query(Servico).filter(
             Servico.pet_id.in_(pet_ids),
             Servico.data_agendada >= primeiro_dia_mes_atual,
             Servico.data_agendada <= ultimo_dia_mes_atual,
             Servico.preco.isnot(None)
         ).all()
-        
-        total_gastos = sum(servico.preco for servico in servicos_mes if servico.preco)
-        
-        # Calcular vacinas vencidas
-        vacinas_vencidas = 0
-        data_limite = hoje - timedelta(days=365)  # 1 ano atrás
-        
-        # Buscar todos os pets DO USUÁRIO
-        todos_pets = db.query(Pet).filter(Pet.owner_id == user.id).all()
-        
-        for pet in todos_pets:
-            # Buscar todas as vacinações do pet (serviços do tipo 'vacinacao')
-            vacinacoes_pet = db.query(Servico).filter(
-                Servico.pet_id == pet.id,
-                Servico.tipo == 'vacinacao'
-            ).order_by(Servico.data_agendada.desc()).all()
-            
-            if not vacinacoes_pet:
-                # Pet sem nenhuma vacinação agendada = vacina vencida
-                vacinas_vencidas += 1
-                print(f"[DASHBOARD] Pet {pet.name} (ID: {pet.id}) sem vacinações - VENCIDA")
-            else:
-                # Verificar a última vacinação
-                ultima_vacinacao = vacinacoes_pet[0]
-                if ultima_vacinacao.data_agendada < data_limite.date():
-                    # Última vacinação há mais de 1 ano = vencida
-                    vacinas_vencidas += 1
-                    dias_vencida = (hoje.date() - ultima_vacinacao.data_agendada).days
-                    print(f"[DASHBOARD] Pet {pet.name} (ID: {pet.id}) - última vacinação há {dias_vencida} dias - VENCIDA")
-                else:
-                    dias_desde = (hoje.date() - ultima_vacinacao.data_agendada).days
-                    print(f"[DASHBOARD] Pet {pet.name} (ID: {pet.id}) - última vacinação há {dias_desde} dias - OK")
+        # Dias do mês que já passaram podem estar no histórico
+        servicos_mes += servico_archive.archived_between(db, pet_ids, primeiro_dia_mes_atual, ultimo_dia_mes_atual)
         
         print(f"[DASHBOARD] Usuário: {user.name} (ID: {user.id})")
-        print(f"[DASHBOARD] Total de pets: {total_pets}")
-        print(f"[DASHBOARD] Gastos do mês: R$ {total_gastos:.2f} ({len(servicos_mes)} serviços)")
-        print(f"[DASHBOARD] Vacinas vencidas: {vacinas_vencidas}")
+        stats = dashboard_service.stats(status_pets, servicos_mes, hoje)
         
         return jsonify({
             'success': True,
-            'total_pets': total_pets,
-            'gastos_mes': total_gastos,
-            'vacinas_vencidas': vacinas_vencidas
+            **stats
         }), 200
         
     except Exception as e:
@@ -355,75 +484,24 @@ def dashboard_stats():
             'success': False,
             'message': 'Erro ao buscar estatísticas'
         }), 500
-    finally:
-        db.close()
 
 # Rota para detalhes de vacinas vencidas
 @app.route('/api/dashboard/vacinas-vencidas', methods=['GET'])
+@with_current_user
 def vacinas_vencidas_detalhes():
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Obter email do usuário da query string
         user_email = request.args.get('user_email', '')
         
-        hoje = datetime.now()
-        data_limite = hoje - timedelta(days=365)  # 1 ano atrás
-        
-        vacinas_vencidas_lista = []
-        
-        # Buscar usuário pelo email
-        user = db.query(User).filter(User.email == user_email).first() if user_email else None
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user, erro = _require_user(db, user_email)
+        if erro:
+            return erro
         
-        # Buscar pets do usuário ou todos se não autenticado
-        if user:
-            todos_pets = db.query(Pet).filter(Pet.owner_id == user.id).all()
-        else:
-            todos_pets = db.query(Pet).all()
-        
-        for pet in todos_pets:
-            # Buscar todas as vacinações do pet (serviços do tipo 'vacinacao')
-            vacinacoes_pet = db.query(Servico).filter(
-                Servico.pet_id == pet.id,
-                Servico.tipo == 'vacinacao'
-            ).order_by(Servico.data_agendada.desc()).all()
-            
-            if not vacinacoes_pet:
-                # Pet sem nenhuma vacinação agendada - considera como muito atrasado
-                vacinas_vencidas_lista.append({
-                    'pet_id': pet.id,
-                    'pet_name': pet.name,
-                    'status': 'sem_vacinacao',
-                    'mensagem': 'Nenhuma vacinação cadastrada',
-                    'dias_apos_vencimento': 999  # Valor alto para indicar que nunca foi vacinado
-                })
-                print(f"[VACINAS VENCIDAS] Pet {pet.name} sem vacinação - adicionado à lista")
-            else:
-                # Verificar a última vacinação
-                ultima_vacinacao = vacinacoes_pet[0]
-                if ultima_vacinacao.data_agendada < data_limite.date():
-                    # Calcular total de dias desde a vacinação
-                    dias_desde_vacinacao = (hoje.date() - ultima_vacinacao.data_agendada).days
-                    # Calcular há quantos dias está vencida (após 1 ano do vencimento)
-                    dias_apos_vencimento = dias_desde_vacinacao - 365
-                    
-                    vacinas_vencidas_lista.append({
-                        'pet_id': pet.id,
-                        'pet_name': pet.name,
-                        'status': 'vencida',
-                        'ultima_vacinacao': ultima_vacinacao.data_agendada.isoformat(),
-                        'dias_desde_vacinacao': dias_desde_vacinacao,
-                        'dias_apos_vencimento': dias_apos_vencimento,
-                        'mensagem': f'Vencida há {dias_apos_vencimento} dias'
-                    })
-                    print(f"[VACINAS VENCIDAS] Pet {pet.name} com vacinação vencida há {dias_apos_vencimento} dias - adicionado à lista")
-                else:
-                    print(f"[VACINAS VENCIDAS] Pet {pet.name} com vacinação em dia - NÃO adicionado")
-        
-        print(f"[VACINAS VENCIDAS] Total: {len(vacinas_vencidas_lista)}")
-        if len(vacinas_vencidas_lista) > 0:
-            print(f"[VACINAS VENCIDAS] Pets encontrados:")
-            for v in vacinas_vencidas_lista:
-                print(f"  - {v['pet_name']} ({v['status']})")
+        # Pets do usuário com vacinação vencida (ou sem vacinação)
+        status_pets = vaccination_service.overdue_for_pets(db, owner_id=user.id)
+        vacinas_vencidas_lista = dashboard_service.overdue_vaccines(status_pets)
         
         return jsonify({
             'success': True,
@@ -439,76 +517,39 @@ def vacinas_vencidas_detalhes():
             'success': False,
             'message': 'Erro ao buscar vacinas vencidas'
         }), 500
-    finally:
-        db.close()
 
 # Rota para próximos agendamentos
 @app.route('/api/dashboard/proximos-agendamentos', methods=['GET'])
+@with_current_user
 def proximos_agendamentos():
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Obter email do usuário da query string
         user_email = request.args.get('user_email', '')
         
         hoje = datetime.now().date()
         # Buscar agendamentos futuros (próximo ano) e recentes atrasados (últimos 7 dias)
-        data_limite_futura = hoje + timedelta(days=365)
-        data_limite_passada = hoje - timedelta(days=7)
-        
-        # Buscar usuário pelo email
-        user = db.query(User).filter(User.email == user_email).first() if user_email else None
-        
-        # Filtrar agendamentos por usuário
-        if user:
-            # Buscar agendamentos dos pets do usuário (incluindo atrasados recentes)
-            agendamentos = db.query(Servico).join(Pet).filter(
-                Pet.owner_id == user.id,
-                Servico.data_agendada >= data_limite_passada,
-                Servico.data_agendada <= data_limite_futura
-            ).order_by(Servico.data_agendada.asc()).all()
-        else:
-            agendamentos = db.query(Servico).filter(
-                Servico.data_agendada >= data_limite_passada,
-                Servico.data_agendada <= data_limite_futura
-            ).order_by(Servico.data_agendada.asc()).all()
-        
-        agendamentos_lista = []
+        data_limite_passada, data_limite_futura = dashboard_service.upcoming_range(hoje)
+        
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user, erro = _require_user(db, user_email)
+        if erro:
+            return erro
+        
+        # Buscar agendamentos dos pets do usuário (incluindo atrasados recentes)
+        # O pet vem do próprio JOIN (sem consulta por serviço)
+        agendamentos = db.query(Servico).join(Pet).options(
+            contains_eager(Servico.pet).lazyload(Pet.owner)
+        ).filter(
+            Pet.owner_id == user.id,
+            Servico.data_agendada >= data_limite_passada,
+            Servico.data_agendada <= data_limite_futura
+        ).order_by(Servico.data_agendada.asc()).all()
         
-        for servico in agendamentos:
-            pet = db.query(Pet).filter(Pet.id == servico.pet_id).first()
-            
-            if pet:
-                dias_ate_agendamento = (servico.data_agendada - hoje).days
-                atrasado = dias_ate_agendamento < 0
-                
-                # Definir ícone e tipo baseado no serviço
-                if servico.tipo == 'vacinacao':
-                    icone = 'fa-syringe'
-                    tipo_label = 'Vacinação'
-                elif servico.tipo == 'banho':
-                    icone = 'fa-cut'
-                    tipo_label = 'Banho'
-                elif servico.tipo == 'consulta':
-                    icone = 'fa-notes-medical'
-                    tipo_label = 'Consulta'
-                else:
-                    icone = 'fa-calendar-check'
-                    tipo_label = servico.tipo.capitalize()
-                
-                agendamentos_lista.append({
-                    'pet_id': pet.id,
-                    'pet_name': pet.name,
-                    'tipo': servico.tipo,
-                    'tipo_label': tipo_label,
-                    'data_agendada': servico.data_agendada.isoformat(),
-                    'dias_ate': dias_ate_agendamento,
-                    'atrasado': atrasado,
-                    'clinica': servico.clinica,
-                    'veterinario': servico.veterinario,
-                    'icone': icone
-                })
-        
-        print(f"[AGENDAMENTOS] Total de próximos agendamentos: {len(agendamentos_lista)}")
+        agendamentos_lista = dashboard_service.upcoming_appointments(
+            ((servico, servico.pet) for servico in agendamentos),
+            hoje
+        )
         
         return jsonify({
             'success': True,
@@ -524,11 +565,113 @@ def proximos_agendamentos():
             'success': False,
             'message': 'Erro ao buscar próximos agendamentos'
         }), 500
-    finally:
-        db.close()
+
+# Rota que agrega todas as seções do dashboard em uma única requisição
+@app.route('/api/dashboard/bundle', methods=['GET', 'POST'])
+@with_current_user
+def dashboard_bundle():
+    """
+    Retorna as seções do dashboard resolvendo o usuário, os pets e os serviços uma única vez.
+    Parâmetros: user_email e sections (lista separada por vírgula; padrão: todas).
+    Somente leitura: a limpeza dos agendamentos atrasados roda no agendador.
+    """
+    db = get_request_db()
+    try:
+        params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        user_email = params.get('user_email')
+        
+        if not g.current_user and not user_email:
+            return jsonify({
+                'success': False,
+                'message': 'Email do usuário não fornecido'
+            }), 400
+        
+        secoes_param = params.get('sections')
+        if secoes_param:
+            secoes = secoes_param if isinstance(secoes_param, list) else secoes_param.split(',')
+            secoes = [secao.strip() for secao in secoes if secao.strip()]
+        else:
+            secoes = list(dashboard_service.SECOES)
+        
+        invalidas = [secao for secao in secoes if secao not in dashboard_service.SECOES]
+        if invalidas:
+            return jsonify({
+                'success': False,
+                'message': f"Seções inválidas: {', '.join(invalidas)}"
+            }), 400
+        
+        # Resolver o usuário uma única vez (pelo token, sem consulta)
+        user = _resolve_user(db, user_email)
+        if not user:
+            return jsonify({
+                'success': False,
+                'message': 'Usuário não encontrado'
+            }), 404
+        
+        resposta = {'success': True}
+        hoje = datetime.now().date()
+        
+        # Pets do usuário (uma consulta)
+        pets = db.query(Pet).filter(Pet.owner_id == user.id).all()
+        pets_por_id = {pet.id: pet for pet in pets}
+        
+        # Serviços dos pets cobrindo o mês atual e a janela de próximos agendamentos (uma consulta)
+        servicos = []
+        if pets and ('stats' in secoes or 'proximos_agendamentos' in secoes):
+            inicio_mes, fim_mes = dashboard_service.month_range(hoje)
+            inicio_agenda, fim_agenda = dashboard_service.upcoming_range(hoje)
+            servicos = db.query(Servico).filter(
+                Servico.pet_id.in_(list(pets_por_id)),
+                Servico.data_agendada >= min(inicio_mes, inicio_agenda),
+                Servico.data_agendada <= max(fim_mes, fim_agenda)
+            ).order_by(Servico.data_agendada.asc()).all()
+        
+        status_pets = []
+        if 'stats' in secoes or 'vacinas_vencidas' in secoes:
+            status_pets = vaccination_service.status_for_loaded_pets(db, pets, hoje=hoje)
+        
+        if 'stats' in secoes:
+            # Os dias do mês que já passaram podem estar no histórico
+            arquivados_mes = servico_archive.archived_between(db, pets_por_id, *dashboard_service.month_range(hoje))
+            resposta['stats'] = dashboard_service.stats(status_pets, servicos + arquivados_mes, hoje)
+        
+        if 'vacinas_vencidas' in secoes:
+            vacinas_vencidas_lista = dashboard_service.overdue_vaccines(status_pets)
+            resposta['vacinas_vencidas'] = {
+                'vacinas_vencidas': vacinas_vencidas_lista,
+                'total': len(vacinas_vencidas_lista)
+            }
+        
+        if 'proximos_agendamentos' in secoes:
+            agendamentos_lista = dashboard_service.upcoming_appointments(
+                ((servico, pets_por_id.get(servico.pet_id)) for servico in servicos),
+                hoje
+            )
+            resposta['proximos_agendamentos'] = {
+                'agendamentos': agendamentos_lista,
+                'total': len(agendamentos_lista)
+            }
+        
+        if 'pets' in secoes:
+            resposta['pets'] = [pet.to_summary_dict() for pet in pets]
+        
+        print(f"[DASHBOARD] Bundle para {user.name} (ID: {user.id}): {', '.join(secoes)}")
+        
+        return jsonify(resposta), 200
+        
+    except Exception as e:
+        db.rollback()
+        print(f"[ERRO] Erro ao montar dashboard: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao carregar dashboard'
+        }), 500
 
 # Rota para chatbot - agendar com OpenAI
 @app.route('/api/chatbot/agendar', methods=['POST'])
+@with_current_user
 def chatbot_agendar():
     """
     Endpoint para processar mensagens do chatbot usando OpenAI GPT.
@@ -543,7 +686,7 @@ def chatbot_agendar():
             'message': 'Chatbot não configurado. Configure a chave OPENAI_API_KEY no arquivo .env'
         }), 503
     
-    db = SessionLocal()
+    db = get_request_db()
     try:
         data = request.get_json()
         print(f"[CHATBOT] Dados recebidos: {data}")
@@ -557,8 +700,8 @@ def chatbot_agendar():
                 'message': 'Por favor, envie uma mensagem'
             }), 400
         
-        # Buscar usuário pelo email
-        user = db.query(User).filter(User.email == user_email).first()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
         if not user:
             return jsonify({
                 'success': False,
@@ -575,6 +718,7 @@ def chatbot_agendar():
         
         # Criar mapeamento nome -> pet para validação posterior (apenas pets deste usuário)
         pets_map = {pet.name.lower(): pet for pet in pets}
+        pets_por_id = {pet.id: pet for pet in pets}
         
         # Buscar serviços agendados futuros do usuário
         pet_ids = [pet.id for pet in pets]
@@ -587,7 +731,7 @@ def chatbot_agendar():
         servicos_context = []
         servicos_map = {}  # Mapeamento para encontrar serviço por ID
         for servico in servicos_futuros:
-            pet = next((p for p in pets if p.id == servico.pet_id), None)
+            pet = pets_por_id.get(servico.pet_id)
             if pet:
                 servico_info = {
                     "id": servico.id,
@@ -601,20 +745,14 @@ def chatbot_agendar():
         
         print(f"[CHATBOT] Serviços futuros do usuário: {len(servicos_context)}")
         
-        # Buscar clínicas disponíveis (agrupadas por tipo de serviço)
-        clinicas = db.query(Clinica).all()
+        # Clínicas disponíveis (agrupadas por tipo de serviço) vindas do catálogo em memória
         clinicas_por_servico = {}
-        clinicas_map = {}  # Mapeamento nome -> clinica para validação
-        
-        for c in clinicas:
-            if c.tipo_servico not in clinicas_por_servico:
-                clinicas_por_servico[c.tipo_servico] = []
-            clinicas_por_servico[c.tipo_servico].append({
+        for c in clinic_catalog.all(db):
+            clinicas_por_servico.setdefault(c.tipo_servico, []).append({
                 "nome": c.nome,
                 "preco": c.preco_servico,
                 "veterinario": c.veterinario
             })
-            clinicas_map[c.nome.lower()] = c
         
         # System prompt com instruções detalhadas
         system_prompt = f"""Você é um assistente de agendamento para o PetCloud, uma plataforma de gerenciamento de pets.
@@ -851,12 +989,14 @@ Data de hoje: {datetime.now().strftime('%Y-%m-%d')}"""
             try:
                 nova_data = datetime.strptime(nova_data_str, '%Y-%m-%d').date()
                 servico.data_agendada = nova_data
+                if servico.tipo == 'vacinacao':
+                    vaccination_service.refresh(db, [servico.pet_id])
                 db.commit()
                 
                 print(f"[CHATBOT] Serviço {servico_id} remarcado: {data_antiga} → {nova_data} (data antiga excluída/substituída)")
                 
                 data_formatada = nova_data.strftime('%d/%m/%Y')
-                pet = db.query(Pet).filter(Pet.id == servico.pet_id).first()
+                pet = pets_por_id[servico.pet_id]
                 tipo_texto = {
                     'vacinacao': 'vacinação',
                     'banho': 'banho',
@@ -888,7 +1028,7 @@ Data de hoje: {datetime.now().strftime('%Y-%m-%d')}"""
         
         # Validar e buscar clínica pelo nome
         clinica_nome = resposta_json.get('clinica_nome', '').strip()
-        clinica = clinicas_map.get(clinica_nome.lower())
+        clinica = clinic_catalog.by_name(db, clinica_nome)
         if not clinica:
             return jsonify({
                 'success': False,
@@ -897,22 +1037,19 @@ Data de hoje: {datetime.now().strftime('%Y-%m-%d')}"""
         
         print(f"[CHATBOT] Clínica encontrada: {clinica.nome} (ID: {clinica.id})")
         
-        # Buscar e remover agendamentos atrasados do mesmo tipo para o mesmo pet
+        # Mover agendamentos atrasados do mesmo tipo para o mesmo pet para o histórico
         # Isso evita que alertas de consultas atrasadas fiquem duplicados
         hoje = datetime.now().date()
         tipo_servico = resposta_json.get('tipo')
         
-        agendamentos_atrasados = db.query(Servico).filter(
+        arquivados = servico_archive.move(
+            db,
             Servico.pet_id == pet.id,
             Servico.tipo == tipo_servico,
             Servico.data_agendada < hoje
-        ).all()
-        
-        if agendamentos_atrasados:
-            print(f"[CHATBOT] Removendo {len(agendamentos_atrasados)} agendamento(s) atrasado(s) do tipo {tipo_servico} para {pet.name}")
-            for agendamento_antigo in agendamentos_atrasados:
-                print(f"[CHATBOT] - Removendo agendamento ID {agendamento_antigo.id} de {agendamento_antigo.data_agendada}")
-                db.delete(agendamento_antigo)
+        )
+        if arquivados:
+            print(f"[CHATBOT] {arquivados} agendamento(s) atrasado(s) do tipo {tipo_servico} de {pet.name} movido(s) para o histórico")
         
         # Criar serviço no banco de dados
         novo_servico = Servico(
@@ -927,6 +1064,8 @@ Data de hoje: {datetime.now().strftime('%Y-%m-%d')}"""
         print(f"[CHATBOT] Criando serviço: pet_id={pet.id}, clinica_id={clinica.id}, tipo={resposta_json.get('tipo')}, data={resposta_json.get('data')}")
         
         db.add(novo_servico)
+        if tipo_servico == 'vacinacao':
+            vaccination_service.refresh(db, [pet.id])
         db.commit()
         db.refresh(novo_servico)
         
@@ -980,13 +1119,11 @@ Data de hoje: {datetime.now().strftime('%Y-%m-%d')}"""
                 'success': False,
                 'message': 'Desculpe, ocorreu um erro ao processar sua solicitação. Tente novamente.'
             }), 500
-    finally:
-        db.close()
 
 # Rota para deletar pet
 @app.route('/api/pets/<int:pet_id>', methods=['DELETE'])
 def deletar_pet(pet_id):
-    db = SessionLocal()
+    db = get_request_db()
     try:
         pet = db.query(Pet).filter(Pet.id == pet_id).first()
         
@@ -1001,32 +1138,33 @@ def deletar_pet(pet_id):
         servicos = db.query(Servico).filter(Servico.pet_id == pet_id).all()
         for servico in servicos:
             db.delete(servico)
+        db.query(ServicoArquivado).filter(ServicoArquivado.pet_id == pet_id).delete(synchronize_session=False)
+        vaccination_service.refresh(db, [pet_id])
+        db.query(AgendamentoRecorrente).filter(AgendamentoRecorrente.pet_id == pet_id).delete(synchronize_session=False)
         print(f"[DELETE] {len(servicos)} serviço(s) relacionado(s) deletado(s)")
         
         # Deletar fotos do concurso relacionadas
         from models.Concurso import Concurso
         concursos = db.query(Concurso).filter(Concurso.pet_id == pet_id).all()
+        concurso_ids = [concurso.id for concurso in concursos]
+        if concurso_ids:
+            db.query(ConcursoVoto).filter(ConcursoVoto.concurso_id.in_(concurso_ids)).delete(synchronize_session=False)
         for concurso in concursos:
-            # Deletar arquivo físico da foto do concurso
-            if concurso.imagem_url:
-                concurso_photo_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(concurso.imagem_url))
-                if os.path.exists(concurso_photo_path):
-                    os.remove(concurso_photo_path)
-                    print(f"[DELETE] Arquivo do concurso deletado: {concurso_photo_path}")
+            # Arquivo da foto do concurso: apagado depois do commit se nenhuma outra foto o usar
+            upload_storage.release(db, app.config['UPLOAD_FOLDER'], concurso.imagem_url)
             db.delete(concurso)
         print(f"[DELETE] {len(concursos)} submissão(ões) de concurso deletada(s)")
         
-        # Deletar foto do perfil do pet se existir
-        if pet.photo_url:
-            photo_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(pet.photo_url))
-            if os.path.exists(photo_path):
-                os.remove(photo_path)
-                print(f"[DELETE] Foto do pet deletada: {photo_path}")
+        # Foto do perfil do pet: apagada depois do commit se nenhuma outra foto a usar
+        upload_storage.release(db, app.config['UPLOAD_FOLDER'], pet.photo_url)
         
         # Deletar o pet
         pet_name = pet.name
         db.delete(pet)
         db.commit()
+        for concurso_id in concurso_ids:
+            vote_counter.forget(concurso_id)
+            leaderboard.remove(concurso_id)
         
         print(f"[DELETE] Pet {pet_name} (ID: {pet_id}) deletado com sucesso")
         return jsonify({
@@ -1043,13 +1181,11 @@ def deletar_pet(pet_id):
             'success': False,
             'message': f'Erro ao deletar pet: {str(e)}'
         }), 500
-    finally:
-        db.close()
 
 # Rota para obter um pet por ID
 @app.route('/api/pets/<int:pet_id>', methods=['GET'])
 def obter_pet(pet_id):
-    db = SessionLocal()
+    db = get_request_db()
     try:
         pet = db.query(Pet).filter(Pet.id == pet_id).first()
         if not pet:
@@ -1059,16 +1195,7 @@ def obter_pet(pet_id):
         servicos = db.query(Servico).filter(Servico.pet_id == pet_id).order_by(Servico.data_agendada.desc()).all()
         
         pet_data = {
-            'id': pet.id,
-            'name': pet.name,
-            'type': pet.type,
-            'breed': pet.breed,
-            'birth_date': pet.birth_date.strftime('%Y-%m-%d') if pet.birth_date else None,
-            'photo_url': pet.photo_url if hasattr(pet, 'photo_url') else None,
-            'owner_id': pet.owner_id if hasattr(pet, 'owner_id') else None,
-            'behavior_tags': pet.get_behavior_tags() if hasattr(pet, 'behavior_tags') else [],
-            'health_records': pet.health_records if hasattr(pet, 'health_records') else None,
-            'feeding_schedule': pet.feeding_schedule if hasattr(pet, 'feeding_schedule') else None,
+            **pet.to_detail_dict(),
             'servicos': [servico.to_dict() for servico in servicos]
         }
         print(f"[OBTER] Pet encontrado: id={pet.id}, nome={pet.name}, serviços={len(servicos)}")
@@ -1076,13 +1203,11 @@ def obter_pet(pet_id):
     except Exception as e:
         print(f"[ERRO] Erro ao obter pet {pet_id}: {e}")
         return jsonify({'success': False, 'message': 'Erro ao buscar pet'}), 500
-    finally:
-        db.close()
 
 # Rota para atualizar um pet por ID
 @app.route('/api/pets/<int:pet_id>', methods=['PUT'])
 def atualizar_pet(pet_id):
-    db = SessionLocal()
+    db = get_request_db()
     try:
         pet = db.query(Pet).filter(Pet.id == pet_id).first()
         if not pet:
@@ -1106,6 +1231,7 @@ def atualizar_pet(pet_id):
 
         db.commit()
         db.refresh(pet)
+        leaderboard.rename_pet(pet.id, pet.name)
         
         print(f"[ATUALIZAR] Pet atualizado: id={pet.id}, nome={pet.name}, tipo={pet.type}, raca={pet.breed}")
         
@@ -1124,13 +1250,30 @@ def atualizar_pet(pet_id):
         db.rollback()
         print(f"[ERRO] Erro ao atualizar pet {pet_id}: {e}")
         return jsonify({'success': False, 'message': 'Erro ao atualizar pet'}), 500
-    finally:
-        db.close()
+
+def _trocar_foto_pet(db, pet, arquivo):
+    """Troca a foto do pet por um arquivo já gravado (upload direto ou retomável). Faz commit."""
+    # Atualizar photo_url no banco (as variantes da foto anterior deixam de valer)
+    upload_storage.acquire(db, arquivo)
+    upload_storage.release(db, app.config['UPLOAD_FOLDER'], pet.photo_url)
+    pet.photo_url = arquivo.url
+    pet.photo_variants = None
+    db.commit()
+    db.refresh(pet)
+    image_variants.schedule_pet(app.config['UPLOAD_FOLDER'], pet.id, pet.photo_url)
+    
+    print(f"[FOTO] Pet {pet.id} foto atualizada: {pet.photo_url}")
+    
+    return jsonify({
+        'success': True,
+        'message': 'Foto atualizada com sucesso!',
+        'photo_url': pet.photo_url
+    }), 200
 
 # Rota para atualizar foto do pet
 @app.route('/api/pets/<int:pet_id>/photo', methods=['PUT'])
 def atualizar_foto_pet(pet_id):
-    db = SessionLocal()
+    db = get_request_db()
     try:
         pet = db.query(Pet).filter(Pet.id == pet_id).first()
         if not pet:
@@ -1147,74 +1290,62 @@ def atualizar_foto_pet(pet_id):
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'message': 'Tipo de arquivo não permitido'}), 400
 
-        # Salvar arquivo
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Atualizar photo_url no banco
-        pet.photo_url = f"/uploads/{filename}"
-        db.commit()
-        db.refresh(pet)
-        
-        print(f"[FOTO] Pet {pet_id} foto atualizada: {pet.photo_url}")
-        
-        return jsonify({
-            'success': True,
-            'message': 'Foto atualizada com sucesso!',
-            'photo_url': pet.photo_url
-        }), 200
+        # Salvar arquivo (pelo conteúdo)
+        arquivo = upload_storage.store(app.config['UPLOAD_FOLDER'], file.stream)
+        return _trocar_foto_pet(db, pet, arquivo)
         
     except Exception as e:
         db.rollback()
         print(f"[ERRO] Erro ao atualizar foto do pet {pet_id}: {e}")
         return jsonify({'success': False, 'message': 'Erro ao atualizar foto'}), 500
-    finally:
-        db.close()
+
+def _veterinario_principal(db, pet_id):
+    """
+    Veterinário mais frequente nos serviços do pet (incluindo os arquivados), calculado com GROUP BY.
+    Returns: (veterinario, frequencia, total_servicos_com_veterinario) ou (None, 0, 0)
+    """
+    servicos = servico_archive.with_history(
+        'id', 'veterinario',
+        filtros_servicos=(Servico.pet_id == pet_id, Servico.veterinario.isnot(None), Servico.veterinario != ''),
+        filtros_arquivo=(ServicoArquivado.pet_id == pet_id, ServicoArquivado.veterinario.isnot(None),
+                         ServicoArquivado.veterinario != '')
+    )
+    frequencias = db.query(
+        servicos.c.veterinario,
+        func.count(servicos.c.id).label('frequencia')
+    ).group_by(servicos.c.veterinario).order_by(
+        func.count(servicos.c.id).desc(),
+        func.min(servicos.c.id).asc()  # Empate: o veterinário que aparece primeiro
+    ).all()
+    
+    if not frequencias:
+        return None, 0, 0
+    
+    veterinario, frequencia = frequencias[0]
+    return veterinario, frequencia, sum(f for _, f in frequencias)
+
 
 # Rota para obter o veterinário principal de um pet (baseado nos serviços)
 @app.route('/api/pets/<int:pet_id>/main-veterinarian', methods=['GET'])
 def obter_veterinario_principal(pet_id):
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Verifica se o pet existe
-        pet = db.query(Pet).filter(Pet.id == pet_id).first()
+        pet = db.query(Pet.id).filter(Pet.id == pet_id).first()
         if not pet:
             return jsonify({
                 'success': False,
                 'message': 'Pet não encontrado'
             }), 404
 
-        # Busca todos os serviços do pet que têm veterinário informado
-        servicos = db.query(Servico).filter(
-            Servico.pet_id == pet_id,
-            Servico.veterinario.isnot(None)
-        ).all()
+        veterinario_principal, frequencia, total_servicos = _veterinario_principal(db, pet_id)
         
-        if not servicos:
+        if not veterinario_principal:
             return jsonify({
                 'success': True,
                 'main_veterinarian': None,
                 'message': 'Nenhum serviço com veterinário cadastrado para este pet'
             }), 200
-
-        # Conta a frequência de cada veterinário
-        from collections import Counter
-        veterinarios = [s.veterinario for s in servicos if s.veterinario]
-        
-        if not veterinarios:
-            return jsonify({
-                'success': True,
-                'main_veterinarian': None,
-                'message': 'Nenhum veterinário informado nos serviços'
-            }), 200
-
-        # Pega o veterinário mais frequente
-        contador = Counter(veterinarios)
-        veterinario_principal = contador.most_common(1)[0][0]
-        frequencia = contador.most_common(1)[0][1]
         
         print(f"[VETERINARIO] Pet {pet_id} - Veterinário principal: {veterinario_principal} ({frequencia} serviços)")
         
@@ -1222,7 +1353,7 @@ def obter_veterinario_principal(pet_id):
             'success': True,
             'main_veterinarian': veterinario_principal,
             'frequency': frequencia,
-            'total_services': len(servicos)
+            'total_services': total_servicos
         }), 200
     except Exception as e:
         print(f"[ERRO] Erro ao obter veterinário principal do pet {pet_id}: {e}")
@@ -1230,8 +1361,79 @@ def obter_veterinario_principal(pet_id):
             'success': False,
             'message': 'Erro ao obter veterinário principal'
         }), 500
-    finally:
-        db.close()
+
+# Rota com todos os dados da página de detalhes do pet
+@app.route('/api/pets/<int:pet_id>/full', methods=['GET'])
+def obter_pet_completo(pet_id):
+    """
+    Pet, histórico de serviços paginado (com os arquivados), veterinário principal e clínicas dos tipos de serviço.
+    Parâmetros: page (padrão 1), per_page (padrão 20, máximo 100) e tipos (lista separada
+    por vírgula; padrão: tipos presentes nos serviços do pet).
+    Usa uma única sessão e um número fixo de consultas.
+    """
+    db = get_request_db()
+    try:
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos'}), 400
+        
+        pet = db.query(Pet).filter(Pet.id == pet_id).first()
+        if not pet:
+            return jsonify({'success': False, 'message': 'Pet não encontrado'}), 404
+        
+        # Histórico de serviços paginado (mais recentes primeiro), incluindo os arquivados
+        historico = servico_archive.with_history(
+            *servico_archive.COLUNAS,
+            filtros_servicos=(Servico.pet_id == pet_id,),
+            filtros_arquivo=(ServicoArquivado.pet_id == pet_id,)
+        )
+        total_servicos = db.query(func.count()).select_from(historico).scalar()
+        servicos = db.query(historico).order_by(
+            historico.c.data_agendada.desc(), historico.c.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page).all()
+        
+        veterinario_principal, frequencia, total_com_veterinario = _veterinario_principal(db, pet_id)
+        
+        # Clínicas (do catálogo em memória) dos tipos pedidos ou dos tipos de serviço que o pet já usou
+        tipos_param = request.args.get('tipos')
+        if tipos_param:
+            tipos = [tipo.strip() for tipo in tipos_param.split(',') if tipo.strip()]
+        else:
+            tipos = [tipo for (tipo,) in db.query(historico.c.tipo).distinct()]
+        clinicas_por_tipo = {}
+        for tipo in sorted(set(tipos)):
+            clinicas = clinic_catalog.by_tipo(db, tipo)
+            if clinicas:
+                clinicas_por_tipo[tipo] = [clinica.to_dict() for clinica in clinicas]
+        
+        servicos_lista = [servico_archive.history_dict(db, linha) for linha in servicos]
+        print(f"[OBTER] Pet completo: id={pet.id}, nome={pet.name}, serviços={len(servicos_lista)}/{total_servicos}")
+        
+        return jsonify({
+            'success': True,
+            'pet': {
+                **pet.to_detail_dict(),
+                'servicos': servicos_lista
+            },
+            'servicos': {
+                'items': servicos_lista,
+                'page': page,
+                'per_page': per_page,
+                'total': total_servicos,
+                'pages': (total_servicos + per_page - 1) // per_page
+            },
+            'main_veterinarian': {
+                'nome': veterinario_principal,
+                'frequency': frequencia,
+                'total_services': total_com_veterinario
+            } if veterinario_principal else None,
+            'clinicas': clinicas_por_tipo
+        }), 200
+    except Exception as e:
+        print(f"[ERRO] Erro ao obter dados completos do pet {pet_id}: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao buscar pet'}), 500
 
 # Rota para servir arquivos estáticos da raiz (css, imagens, etc)
 @app.route('/<path:filename>')
@@ -1275,8 +1477,6 @@ def detalhes_mimi_page():
 def concurso_page():
     return send_from_directory(os.path.join(ROOT_DIR, 'pages'), 'concurso.html')
 
-auth_service = AuthService()
-
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -1289,7 +1489,7 @@ def login():
             'message': 'Email e senha são obrigatórios'
         }), 400
     
-    success, message, user = auth_service.login(email, password)
+    success, message, user = auth_service.login(email, password, db=get_request_db())
     
     if not success:
         return jsonify({
@@ -1300,7 +1500,8 @@ def login():
     return jsonify({
         'success': True,
         'message': message,
-        'user': user.to_dict() if user else None
+        'user': user.to_dict() if user else None,
+        'token': auth_service.issue_token(user)
     })
 
 @app.route('/api/auth/register', methods=['POST'])
@@ -1316,7 +1517,7 @@ def register():
             'message': 'Nome, email e senha são obrigatórios'
         }), 400
     
-    success, message, user = auth_service.register(name, email, password)
+    success, message, user = auth_service.register(name, email, password, db=get_request_db())
     
     if not success:
         return jsonify({
@@ -1443,7 +1644,7 @@ def request_password_reset():
     if not email:
         return jsonify({'success': False, 'message': 'Email é obrigatório.'}), 400
     
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Busca o usuário
         user = db.query(User).filter(User.email == email).first()
@@ -1514,8 +1715,6 @@ Equipe PetCloud 🐾"""
         db.rollback()
         print(f'[ERRO] Erro ao criar token de reset: {e}')
         return jsonify({'success': False, 'message': 'Erro ao processar requisição'}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/auth/reset-password', methods=['POST'])
@@ -1531,7 +1730,7 @@ def reset_password():
             'message': 'Token e nova senha são obrigatórios.'
         }), 400
     
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Busca o token
         pr = db.query(PasswordReset).filter(PasswordReset.token == token).first()
@@ -1549,10 +1748,8 @@ def reset_password():
         if not user:
             return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
         
-        # Atualiza a senha (usa hash do AuthService)
-        auth = AuthService()
-        hashed = auth._hash_password(new_password)
-        user.password = hashed
+        # Atualiza a senha (sempre no formato de hash atual)
+        auth_service.set_password(user, new_password)
         
         # Remove o token
         db.delete(pr)
@@ -1569,8 +1766,6 @@ def reset_password():
         db.rollback()
         print(f'[ERRO] Erro ao redefinir senha: {e}')
         return jsonify({'success': False, 'message': 'Erro ao redefinir senha.'}), 500
-    finally:
-        db.close()
 
 
 # ===== ROTAS DE CLÍNICAS =====
@@ -1578,15 +1773,11 @@ def reset_password():
 @app.route('/api/clinicas', methods=['GET'])
 def get_clinicas():
     """Lista todas as clínicas cadastradas"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         tipo = request.args.get('tipo')  # Filtrar por tipo de serviço (opcional)
         
-        query = db.query(Clinica)
-        if tipo:
-            query = query.filter(Clinica.tipo_servico == tipo)
-        
-        clinicas = query.all()
+        clinicas = clinic_catalog.by_tipo(db, tipo) if tipo else clinic_catalog.all(db)
         
         return jsonify({
             'success': True,
@@ -1596,8 +1787,6 @@ def get_clinicas():
     except Exception as e:
         print(f'[ERRO] Erro ao listar clínicas: {e}')
         return jsonify({'success': False, 'message': 'Erro ao listar clínicas.'}), 500
-    finally:
-        db.close()
 
 
 # ===== ROTAS DE SERVIÇOS =====
@@ -1605,7 +1794,7 @@ def get_clinicas():
 @app.route('/api/servicos', methods=['POST'])
 def create_servico():
     """Cria um novo agendamento de serviço"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         data = request.json
         
@@ -1615,8 +1804,8 @@ def create_servico():
             if field not in data:
                 return jsonify({'success': False, 'message': f'Campo {field} é obrigatório.'}), 400
         
-        # Buscar clínica para pegar veterinário e preço
-        clinica = db.query(Clinica).filter(Clinica.id == data['clinica_id']).first()
+        # Buscar clínica (catálogo em memória) para pegar veterinário e preço
+        clinica = clinic_catalog.get(db, data['clinica_id'])
         if not clinica:
             return jsonify({'success': False, 'message': 'Clínica não encontrada.'}), 404
         
@@ -1625,27 +1814,24 @@ def create_servico():
         if not pet:
             return jsonify({'success': False, 'message': 'Pet não encontrado.'}), 404
         
-        # Buscar e remover agendamentos atrasados do mesmo tipo para o mesmo pet
+        # Mover agendamentos atrasados do mesmo tipo para o mesmo pet para o histórico
         # Isso evita que alertas de consultas atrasadas fiquem duplicados
         hoje = datetime.now().date()
         tipo_servico = data['tipo']
         
-        agendamentos_atrasados = db.query(Servico).filter(
+        arquivados = servico_archive.move(
+            db,
             Servico.pet_id == data['pet_id'],
             Servico.tipo == tipo_servico,
             Servico.data_agendada < hoje
-        ).all()
-        
-        if agendamentos_atrasados:
-            print(f"[SERVICO] Removendo {len(agendamentos_atrasados)} agendamento(s) atrasado(s) do tipo {tipo_servico} para {pet.name}")
-            for agendamento_antigo in agendamentos_atrasados:
-                print(f"[SERVICO] - Removendo agendamento ID {agendamento_antigo.id} de {agendamento_antigo.data_agendada}")
-                db.delete(agendamento_antigo)
+        )
+        if arquivados:
+            print(f"[SERVICO] {arquivados} agendamento(s) atrasado(s) do tipo {tipo_servico} de {pet.name} movido(s) para o histórico")
         
         # Criar serviço
         servico = Servico(
             pet_id=data['pet_id'],
-            clinica_id=data['clinica_id'],
+            clinica_id=clinica.id,
             tipo=data['tipo'],
             data_agendada=datetime.strptime(data['data_agendada'], '%Y-%m-%d').date(),
             preco=clinica.preco_servico,
@@ -1654,6 +1840,8 @@ def create_servico():
         )
         
         db.add(servico)
+        if tipo_servico == 'vacinacao':
+            vaccination_service.refresh(db, [servico.pet_id])
         db.commit()
         db.refresh(servico)
         
@@ -1670,13 +1858,11 @@ def create_servico():
     except Exception as e:
         print(f'[ERRO] Erro ao criar serviço: {e}')
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        db.close()
 
 @app.route('/api/servicos/<int:servico_id>', methods=['DELETE'])
 def deletar_servico(servico_id):
     """Deleta um serviço agendado"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         servico = db.query(Servico).filter(Servico.id == servico_id).first()
         
@@ -1688,6 +1874,8 @@ def deletar_servico(servico_id):
         pet_id = servico.pet_id
         
         db.delete(servico)
+        if tipo_servico == 'vacinacao':
+            vaccination_service.refresh(db, [pet_id])
         db.commit()
         
         print(f'[SERVICO] Agendamento deletado: ID={servico_id}, tipo={tipo_servico}, pet_id={pet_id}')
@@ -1701,64 +1889,132 @@ def deletar_servico(servico_id):
         db.rollback()
         print(f'[ERRO] Erro ao deletar serviço: {e}')
         return jsonify({'success': False, 'message': 'Erro ao deletar serviço.'}), 500
-    finally:
-        db.close()
 
 @app.route('/api/servicos', methods=['GET'])
+@with_current_user
 def listar_servicos():
-    """Lista todos os serviços agendados de um usuário (futuros e passados)"""
-    db = SessionLocal()
+    """
+    Lista os serviços agendados de um usuário (futuros e, com incluir_passados=true, passados)
+    em páginas ordenadas por data_agendada e id.
+    Parâmetros: limit (padrão 50, máximo 200) e cursor (next_cursor da página anterior).
+    """
+    db = get_request_db()
     try:
         user_email = request.args.get('user_email')
         incluir_passados = request.args.get('incluir_passados', 'false').lower() == 'true'
+        try:
+            limit, chave = page_args(request.args, (date.fromisoformat, int))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos.'}), 400
         
-        if not user_email:
+        if not g.current_user and not user_email:
             return jsonify({'success': False, 'message': 'Email do usuário é obrigatório.'}), 400
         
-        # Buscar usuário
-        user = db.query(User).filter(User.email == user_email).first()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
         if not user:
             return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
         
-        # Buscar pets do usuário
-        pets = db.query(Pet).filter(Pet.owner_id == user.id).all()
-        pet_ids = [pet.id for pet in pets]
-        
-        # Buscar serviços dos pets
-        query = db.query(Servico).filter(Servico.pet_id.in_(pet_ids))
+        # Buscar serviços dos pets do usuário com o nome do pet e a clínica na mesma consulta
+        query = db.query(Servico, Pet.name).join(Pet, Servico.pet_id == Pet.id).options(
+            raiseload(Servico.pet),
+            joinedload(Servico.clinica_rel)
+        ).filter(Pet.owner_id == user.id)
         
         # Filtrar apenas futuros se necessário
         if not incluir_passados:
             hoje = datetime.now().date()
             query = query.filter(Servico.data_agendada >= hoje)
         
-        servicos = query.order_by(Servico.data_agendada.asc()).all()
+        servicos, next_cursor = keyset_page(
+            query, (Servico.data_agendada, Servico.id), chave, limit,
+            lambda linha: (linha[0].data_agendada, linha[0].id)
+        )
         
         # Montar resposta com informações do pet
         servicos_lista = []
-        for servico in servicos:
-            pet = db.query(Pet).filter(Pet.id == servico.pet_id).first()
+        for servico, pet_nome in servicos:
             servico_dict = servico.to_dict()
-            servico_dict['pet_nome'] = pet.name if pet else 'Desconhecido'
+            servico_dict['pet_nome'] = pet_nome or 'Desconhecido'
             servicos_lista.append(servico_dict)
         
         print(f'[SERVICOS] Listados {len(servicos_lista)} serviços para usuário {user.name}')
         
         return jsonify({
             'success': True,
-            'servicos': servicos_lista
+            'servicos': servicos_lista,
+            'limit': limit,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
         print(f'[ERRO] Erro ao listar serviços: {e}')
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        db.close()
+
+def _pagina_historico(db, pet_ids):
+    """Uma página do histórico dos pets (mais recentes primeiro). Returns: resposta JSON"""
+    try:
+        limit, chave = page_args(request.args, (date.fromisoformat, int))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos.'}), 400
+    
+    query, historico = servico_archive.history_query(db, pet_ids)
+    linhas, next_cursor = keyset_page(
+        query, (historico.c.data_agendada, historico.c.id), chave, limit,
+        lambda linha: (linha.data_agendada, linha.id),
+        descendente=True
+    )
+    
+    return jsonify({
+        'success': True,
+        'servicos': [servico_archive.history_dict(db, linha) for linha in linhas],
+        'limit': limit,
+        'next_cursor': next_cursor
+    }), 200
+
+
+@app.route('/api/servicos/historico', methods=['GET'])
+@with_current_user
+def historico_servicos():
+    """
+    Histórico de serviços passados dos pets do usuário (arquivados ou não), do mais recente ao mais antigo.
+    Parâmetros: user_email, limit (padrão 50, máximo 200) e cursor (next_cursor da página anterior).
+    """
+    db = get_request_db()
+    try:
+        user_email = request.args.get('user_email')
+        if not g.current_user and not user_email:
+            return jsonify({'success': False, 'message': 'Email do usuário é obrigatório.'}), 400
+        
+        user = _resolve_user(db, user_email)
+        if not user:
+            return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
+        
+        return _pagina_historico(db, select(Pet.id).where(Pet.owner_id == user.id))
+        
+    except Exception as e:
+        print(f'[ERRO] Erro ao listar histórico de serviços: {e}')
+        return jsonify({'success': False, 'message': 'Erro ao listar histórico de serviços.'}), 500
+
+
+@app.route('/api/pets/<int:pet_id>/historico', methods=['GET'])
+def historico_pet(pet_id):
+    """Histórico de serviços passados de um pet, do mais recente ao mais antigo (mesma paginação)"""
+    db = get_request_db()
+    try:
+        if not db.query(Pet.id).filter(Pet.id == pet_id).first():
+            return jsonify({'success': False, 'message': 'Pet não encontrado.'}), 404
+        
+        return _pagina_historico(db, [pet_id])
+        
+    except Exception as e:
+        print(f'[ERRO] Erro ao listar histórico do pet {pet_id}: {e}')
+        return jsonify({'success': False, 'message': 'Erro ao listar histórico do pet.'}), 500
 
 @app.route('/api/servicos/<int:servico_id>', methods=['PUT'])
 def atualizar_servico(servico_id):
     """Atualiza/remarca um serviço agendado"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         data = request.json
         
@@ -1766,6 +2022,8 @@ def atualizar_servico(servico_id):
         if not servico:
             return jsonify({'success': False, 'message': 'Serviço não encontrado.'}), 404
         
+        tipo_anterior = servico.tipo
+        
         # Atualizar campos se fornecidos
         if 'data_agendada' in data:
             try:
@@ -1775,16 +2033,18 @@ def atualizar_servico(servico_id):
                 return jsonify({'success': False, 'message': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
         
         if 'clinica_id' in data:
-            clinica = db.query(Clinica).filter(Clinica.id == data['clinica_id']).first()
+            clinica = clinic_catalog.get(db, data['clinica_id'])
             if not clinica:
                 return jsonify({'success': False, 'message': 'Clínica não encontrada.'}), 404
-            servico.clinica_id = data['clinica_id']
+            servico.clinica_id = clinica.id
             servico.preco = clinica.preco_servico
             servico.veterinario = clinica.veterinario
         
         if 'tipo' in data:
             servico.tipo = data['tipo']
         
+        if 'vacinacao' in (tipo_anterior, servico.tipo):
+            vaccination_service.refresh(db, [servico.pet_id])
         db.commit()
         db.refresh(servico)
         
@@ -1799,16 +2059,215 @@ def atualizar_servico(servico_id):
     except Exception as e:
         print(f'[ERRO] Erro ao atualizar serviço: {e}')
         return jsonify({'success': False, 'message': str(e)}), 500
-    finally:
-        db.close()
+
+
+# ==================== AGENDAMENTOS RECORRENTES ====================
+
+def _parse_recorrencia(data, parcial=False):
+    """
+    Valida os campos de agenda de uma série recorrente.
+    Returns: (campos, mensagem de erro ou None). Com parcial=True, só valida os campos enviados.
+    """
+    campos = {}
+    try:
+        if not parcial or 'intervalo' in data:
+            campos['intervalo'] = int(data.get('intervalo', 0))
+            if campos['intervalo'] < 1:
+                return None, 'intervalo deve ser um inteiro positivo.'
+        if not parcial or 'unidade' in data:
+            campos['unidade'] = data.get('unidade')
+            if campos['unidade'] not in AgendamentoRecorrente.UNIDADES:
+                return None, f"unidade deve ser uma de: {', '.join(AgendamentoRecorrente.UNIDADES)}."
+        for campo in ('data_inicio', 'data_fim'):
+            if campo in data:
+                campos[campo] = datetime.strptime(data[campo], '%Y-%m-%d').date() if data[campo] else None
+        if not parcial and not campos.get('data_inicio'):
+            return None, 'Campo data_inicio é obrigatório.'
+        if 'max_ocorrencias' in data:
+            campos['max_ocorrencias'] = int(data['max_ocorrencias']) if data['max_ocorrencias'] else None
+            if campos['max_ocorrencias'] is not None and campos['max_ocorrencias'] < 1:
+                return None, 'max_ocorrencias deve ser um inteiro positivo.'
+    except (TypeError, ValueError):
+        return None, 'Valores inválidos. Datas no formato YYYY-MM-DD e números inteiros.'
+    return campos, None
+
+
+@app.route('/api/servicos/recorrentes', methods=['POST'])
+def criar_servico_recorrente():
+    """
+    Cria um agendamento recorrente: a cada 'intervalo' dias, semanas ou meses a partir de
+    data_inicio, até data_fim e/ou max_ocorrencias (opcionais).
+    As ocorrências dos próximos RECURRENCE_HORIZON_DAYS dias são criadas num único INSERT;
+    as seguintes são geradas pela tarefa periódica.
+    """
+    db = get_request_db()
+    try:
+        data = request.json or {}
+        for field in ('pet_id', 'tipo', 'clinica_id'):
+            if field not in data:
+                return jsonify({'success': False, 'message': f'Campo {field} é obrigatório.'}), 400
+        
+        agenda, erro = _parse_recorrencia(data)
+        if erro:
+            return jsonify({'success': False, 'message': erro}), 400
+        
+        clinica = clinic_catalog.get(db, data['clinica_id'])
+        if not clinica:
+            return jsonify({'success': False, 'message': 'Clínica não encontrada.'}), 404
+        
+        pet = db.query(Pet.id, Pet.name).filter(Pet.id == data['pet_id']).first()
+        if not pet:
+            return jsonify({'success': False, 'message': 'Pet não encontrado.'}), 404
+        
+        regra = recurrence_service.create(
+            db,
+            pet_id=pet.id,
+            tipo=data['tipo'],
+            clinica_id=clinica.id,
+            preco=clinica.preco_servico,
+            clinica=clinica.nome,
+            veterinario=clinica.veterinario,
+            **agenda
+        )
+        db.commit()
+        
+        print(f"[RECORRENCIA] Série criada: {regra.tipo} a cada {regra.intervalo} {regra.unidade} para {pet.name} "
+              f"({regra.ocorrencias_geradas} ocorrência(s) até {regra.gerado_ate})")
+        
+        return jsonify({
+            'success': True,
+            'message': 'Agendamento recorrente criado com sucesso!',
+            'recorrencia': regra.to_dict()
+        }), 201
+        
+    except Exception as e:
+        db.rollback()
+        print(f'[ERRO] Erro ao criar agendamento recorrente: {e}')
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/servicos/recorrentes/<int:recorrencia_id>', methods=['PUT'])
+def atualizar_servico_recorrente(recorrencia_id):
+    """
+    Altera uma série a partir de 'a_partir_de' (padrão: hoje), sem mexer nas ocorrências passadas.
+    clinica_id atualiza as ocorrências futuras com um único UPDATE; intervalo, unidade, data_inicio,
+    data_fim e max_ocorrencias removem as ocorrências futuras (um DELETE) e geram a nova agenda.
+    """
+    db = get_request_db()
+    try:
+        data = request.json or {}
+        regra = db.query(AgendamentoRecorrente).filter(AgendamentoRecorrente.id == recorrencia_id).first()
+        if not regra:
+            return jsonify({'success': False, 'message': 'Agendamento recorrente não encontrado.'}), 404
+        
+        mudancas, erro = _parse_recorrencia(data, parcial=True)
+        if erro:
+            return jsonify({'success': False, 'message': erro}), 400
+        a_partir_de = None
+        if data.get('a_partir_de'):
+            try:
+                a_partir_de = datetime.strptime(data['a_partir_de'], '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
+        
+        if 'clinica_id' in data:
+            clinica = clinic_catalog.get(db, data['clinica_id'])
+            if not clinica:
+                return jsonify({'success': False, 'message': 'Clínica não encontrada.'}), 404
+            mudancas.update(clinica_id=clinica.id, preco=clinica.preco_servico,
+                            clinica=clinica.nome, veterinario=clinica.veterinario)
+        
+        if not mudancas:
+            return jsonify({'success': False, 'message': 'Nenhuma alteração informada.'}), 400
+        
+        resultado = recurrence_service.update_series(db, regra, mudancas, a_partir_de)
+        db.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Agendamento recorrente atualizado com sucesso!',
+            'recorrencia': regra.to_dict(),
+            **resultado
+        }), 200
+        
+    except Exception as e:
+        db.rollback()
+        print(f'[ERRO] Erro ao atualizar agendamento recorrente: {e}')
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/servicos/recorrentes/<int:recorrencia_id>', methods=['DELETE'])
+def cancelar_servico_recorrente(recorrencia_id):
+    """Encerra uma série: remove as ocorrências a partir de hoje (um DELETE) e mantém o histórico"""
+    db = get_request_db()
+    try:
+        regra = db.query(AgendamentoRecorrente).filter(AgendamentoRecorrente.id == recorrencia_id).first()
+        if not regra:
+            return jsonify({'success': False, 'message': 'Agendamento recorrente não encontrado.'}), 404
+        
+        removidas = recurrence_service.cancel(db, regra)
+        db.commit()
+        
+        print(f'[RECORRENCIA] Série {recorrencia_id} encerrada: {removidas} ocorrência(s) futura(s) removida(s)')
+        return jsonify({
+            'success': True,
+            'message': 'Agendamento recorrente cancelado com sucesso!',
+            'removidas': removidas
+        }), 200
+        
+    except Exception as e:
+        db.rollback()
+        print(f'[ERRO] Erro ao cancelar agendamento recorrente: {e}')
+        return jsonify({'success': False, 'message': str(e)}), 500
 
 
 # ==================== ENDPOINTS DE CONCURSO ====================
 
+def _checar_envio_concurso(db, user, pet_id):
+    """Pet do usuário e ainda sem foto no concurso. Returns: (pet, None) ou (None, resposta de erro)"""
+    # Verificar se pet existe e pertence ao usuário
+    pet = db.query(Pet).filter(Pet.id == pet_id, Pet.owner_id == user.id).first()
+    if not pet:
+        return None, (jsonify({'success': False, 'message': 'Pet não encontrado ou não pertence a este usuário.'}), 404)
+    
+    # Verificar se o pet já tem foto no concurso
+    concurso_existente = db.query(Concurso).filter(Concurso.pet_id == pet_id).first()
+    if concurso_existente:
+        return None, (jsonify({'success': False, 'message': f'{pet.name} já tem uma foto enviada no concurso!'}), 400)
+    return pet, None
+
+
+def _criar_foto_concurso(db, user, pet, arquivo, descricao):
+    """Inscreve no concurso um arquivo já gravado (upload direto ou retomável). Faz commit."""
+    upload_storage.acquire(db, arquivo)
+    novo_concurso = Concurso(
+        pet_id=pet.id,
+        user_id=user.id,
+        imagem_url=arquivo.url,
+        descricao=descricao,
+        votos=0
+    )
+    
+    db.add(novo_concurso)
+    db.commit()
+    db.refresh(novo_concurso)
+    image_variants.schedule_concurso(app.config['UPLOAD_FOLDER'], novo_concurso.id, novo_concurso.imagem_url)
+    
+    leaderboard.add(novo_concurso, pet.name, user.name, user.email)
+    print(f'[CONCURSO] Foto enviada: Pet {pet.name} (ID: {pet.id}) - User: {user.name}')
+    
+    return jsonify({
+        'success': True,
+        'message': f'Foto de {pet.name} enviada com sucesso para o concurso!',
+        'concurso': novo_concurso.to_dict()
+    }), 201
+
+
 @app.route('/api/concurso/enviar', methods=['POST'])
+@with_current_user
 def enviar_foto_concurso():
     """Endpoint para enviar foto ao concurso"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Verificar se há arquivo na requisição
         if 'imagem' not in request.files:
@@ -1827,113 +2286,126 @@ def enviar_foto_concurso():
         user_email = request.form.get('user_email')
         descricao = request.form.get('descricao', '')
         
-        if not pet_id or not user_email:
+        if not pet_id or not (g.current_user or user_email):
             return jsonify({'success': False, 'message': 'Pet e usuário são obrigatórios.'}), 400
         
-        # Verificar se usuário existe
-        user = db.query(User).filter(User.email == user_email).first()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
         if not user:
             return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
         
-        # Verificar se pet existe e pertence ao usuário
-        pet = db.query(Pet).filter(Pet.id == pet_id, Pet.owner_id == user.id).first()
-        if not pet:
-            return jsonify({'success': False, 'message': 'Pet não encontrado ou não pertence a este usuário.'}), 404
-        
-        # Verificar se o pet já tem foto no concurso
-        concurso_existente = db.query(Concurso).filter(Concurso.pet_id == pet_id).first()
-        if concurso_existente:
-            return jsonify({'success': False, 'message': f'{pet.name} já tem uma foto enviada no concurso!'}), 400
-        
-        # Salvar arquivo com nome único
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f'{timestamp}_{secrets.token_hex(8)}_{filename}'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-        
-        # Criar registro no banco
-        novo_concurso = Concurso(
-            pet_id=pet_id,
-            user_id=user.id,
-            imagem_url=f'/uploads/{unique_filename}',
-            descricao=descricao,
-            votos=0
-        )
+        pet, erro = _checar_envio_concurso(db, user, pet_id)
+        if erro:
+            return erro
         
-        db.add(novo_concurso)
-        db.commit()
-        db.refresh(novo_concurso)
-        
-        print(f'[CONCURSO] Foto enviada: Pet {pet.name} (ID: {pet_id}) - User: {user.name}')
-        
-        return jsonify({
-            'success': True,
-            'message': f'Foto de {pet.name} enviada com sucesso para o concurso!',
-            'concurso': novo_concurso.to_dict()
-        }), 201
+        # Salvar arquivo pelo conteúdo (a mesma foto já enviada não é gravada de novo)
+        arquivo = upload_storage.store(app.config['UPLOAD_FOLDER'], file.stream)
+        return _criar_foto_concurso(db, user, pet, arquivo, descricao)
         
     except Exception as e:
         db.rollback()
         print(f'[ERRO] Erro ao enviar foto ao concurso: {e}')
         return jsonify({'success': False, 'message': 'Erro ao enviar foto.'}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/concurso/fotos', methods=['GET'])
 def listar_fotos_concurso():
-    """Endpoint para listar todas as fotos do concurso"""
-    db = SessionLocal()
+    """
+    Endpoint para listar as fotos do concurso em ordem de ranking (votos, data de envio).
+    Parâmetros opcionais: limit (padrão 50, máximo 200), cursor (next_cursor da página
+    anterior) ou offset. As páginas saem do ranking em memória, sem consultar o banco.
+    """
+    db = get_request_db()
     try:
-        fotos = db.query(Concurso).order_by(Concurso.votos.desc(), Concurso.data_envio.desc()).all()
+        try:
+            # Cursor = chave de ordenação do ranking (-votos, -data de envio, -id) da última foto
+            limit, chave = page_args(request.args, (int, float, int))
+            offset = max(int(request.args.get('offset', 0)), 0)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parâmetros de paginação inválidos.'}), 400
+        
+        fotos, total, ultima = leaderboard.page(db, limit=limit, offset=offset, after=chave)
         
         return jsonify({
             'success': True,
-            'total': len(fotos),
-            'fotos': [foto.to_dict() for foto in fotos]
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'next_cursor': encode_cursor(*ultima) if ultima else None,
+            'fotos': fotos
         }), 200
         
     except Exception as e:
         print(f'[ERRO] Erro ao listar fotos do concurso: {e}')
         return jsonify({'success': False, 'message': 'Erro ao carregar fotos.'}), 500
-    finally:
-        db.close()
+
+
+@app.route('/api/concurso/stream', methods=['GET'])
+def stream_votos_concurso():
+    """
+    Endpoint SSE (text/event-stream) com as contagens de votos em tempo real.
+    Envia eventos 'votos' com a lista [{id, votos}] das fotos que mudaram,
+    agrupando os votos de uma janela curta numa única mensagem.
+    """
+    return Response(
+        contest_stream.subscribe(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # evita buffer em proxies (nginx)
+        }
+    )
 
 
 @app.route('/api/concurso/votar/<int:concurso_id>', methods=['POST'])
+@with_current_user
 def votar_foto_concurso(concurso_id):
-    """Endpoint para votar em uma foto do concurso"""
-    db = SessionLocal()
+    """Endpoint para votar em uma foto do concurso (um voto por usuário em cada foto)"""
+    db = get_request_db()
     try:
-        foto = db.query(Concurso).filter(Concurso.id == concurso_id).first()
+        user_email = request.args.get('user_email') or (request.get_json(silent=True) or {}).get('user_email')
+        if not g.current_user and not user_email:
+            return jsonify({'success': False, 'message': 'Faça login para votar.'}), 401
         
-        if not foto:
-            return jsonify({'success': False, 'message': 'Foto não encontrada.'}), 404
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
+        if not user:
+            return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
         
-        foto.votos += 1
-        db.commit()
+        # O voto fica em memória e é gravado em lote (INSERT em concurso_votes + UPDATE votos = votos + n);
+        # votos repetidos são recusados pelo conjunto de votantes em memória, sem consultar o banco
+        resultado = vote_counter.record(db, concurso_id, user.id)
         
-        print(f'[CONCURSO] Voto registrado: Foto ID {concurso_id} - Total: {foto.votos} votos')
+        if resultado is None:
+            return jsonify({'success': False, 'message': 'Foto não encontrada.'}), 404
+        votos, aceito = resultado
+        if not aceito:
+            return jsonify({
+                'success': False,
+                'message': 'Você já votou nesta foto.',
+                'votos': votos
+            }), 409
+        leaderboard.increment(concurso_id)
+        contest_stream.publish(concurso_id, votos)
+        
+        print(f'[CONCURSO] Voto registrado: Foto ID {concurso_id} - Total aproximado: {votos} votos')
         
         return jsonify({
             'success': True,
             'message': 'Voto registrado com sucesso!',
-            'votos': foto.votos
+            'votos': votos
         }), 200
         
     except Exception as e:
-        db.rollback()
         print(f'[ERRO] Erro ao registrar voto: {e}')
         return jsonify({'success': False, 'message': 'Erro ao registrar voto.'}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/concurso/deletar/<int:concurso_id>', methods=['DELETE'])
+@with_current_user
 def deletar_foto_concurso(concurso_id):
     """Endpoint para deletar uma foto do concurso"""
-    db = SessionLocal()
+    db = get_request_db()
     try:
         # Obter dados do usuário
         user_email = request.args.get('user_email')
@@ -1942,11 +2414,11 @@ def deletar_foto_concurso(concurso_id):
         print(f"[CONCURSO DELETE] request.args: {request.args}")
         print(f"[CONCURSO DELETE] concurso_id: {concurso_id}")
         
-        if not user_email:
+        if not g.current_user and not user_email:
             return jsonify({'success': False, 'message': 'Email do usuário é obrigatório.'}), 400
         
-        # Verificar se usuário existe
-        user = db.query(User).filter(User.email == user_email).first()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user = _resolve_user(db, user_email)
         if not user:
             return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
         
@@ -1960,17 +2432,16 @@ def deletar_foto_concurso(concurso_id):
         if foto.user_id != user.id:
             return jsonify({'success': False, 'message': 'Você não tem permissão para deletar esta foto.'}), 403
         
-        # Deletar arquivo físico
-        if foto.imagem_url:
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(foto.imagem_url))
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                print(f'[CONCURSO] Arquivo deletado: {filepath}')
+        # Arquivo físico: apagado depois do commit se nenhuma outra foto o usar
+        upload_storage.release(db, app.config['UPLOAD_FOLDER'], foto.imagem_url)
         
-        # Deletar do banco
+        # Deletar do banco (votos da foto primeiro)
         pet_name = foto.pet.name if foto.pet else 'Unknown'
+        db.query(ConcursoVoto).filter(ConcursoVoto.concurso_id == concurso_id).delete(synchronize_session=False)
         db.delete(foto)
         db.commit()
+        vote_counter.forget(concurso_id)
+        leaderboard.remove(concurso_id)
         
         print(f'[CONCURSO] Foto deletada: ID {concurso_id} - Pet: {pet_name} - User: {user.name}')
         
@@ -1983,54 +2454,205 @@ def deletar_foto_concurso(concurso_id):
         db.rollback()
         print(f'[ERRO] Erro ao deletar foto: {e}')
         return jsonify({'success': False, 'message': 'Erro ao deletar foto.'}), 500
-    finally:
-        db.close()
+
+
+# ==================== UPLOADS RETOMÁVEIS ====================
+# Protocolo: POST /api/uploads abre a sessão; PUT /api/uploads/<id>/blocos/<n> envia cada bloco
+# (corpo cru, tamanho_bloco bytes; o último pode ser menor); GET /api/uploads/<id> mostra as faixas
+# recebidas e os blocos que faltam; POST /api/uploads/<id>/concluir junta os blocos e anexa a foto.
+
+@app.route('/api/uploads', methods=['POST'])
+@with_current_user
+def criar_upload():
+    """
+    Abre um upload retomável para a foto de um pet (destino 'pet') ou para o concurso
+    (destino 'concurso', com descricao). Corpo JSON: destino, pet_id, tamanho (bytes).
+    """
+    db = get_request_db()
+    try:
+        data = request.get_json(silent=True) or {}
+        destino = data.get('destino')
+        try:
+            pet_id = int(data.get('pet_id'))
+            tamanho = int(data.get('tamanho'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'pet_id e tamanho são obrigatórios.'}), 400
+        
+        limite = app.config.get('MAX_IMAGE_SIZE')
+        if limite is not None and tamanho > limite:
+            return jsonify({
+                'success': False,
+                'message': f'Imagem maior que o limite de {limite // (1024 * 1024)} MB.'
+            }), 413
+        
+        # Os mesmos erros do upload direto aparecem já aqui, antes de qualquer byte ser enviado
+        user = _resolve_user(db, data.get('user_email'))
+        if not user:
+            return jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404
+        if destino == 'concurso':
+            _pet, erro = _checar_envio_concurso(db, user, pet_id)
+            if erro:
+                return erro
+        elif destino == 'pet' and not db.query(Pet.id).filter(Pet.id == pet_id, Pet.owner_id == user.id).first():
+            return jsonify({'success': False, 'message': 'Pet não encontrado ou não pertence a este usuário.'}), 404
+        
+        try:
+            sessao = resumable_uploads.create(
+                db, destino, pet_id, tamanho,
+                user_id=user.id,
+                descricao=data.get('descricao', '')
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        db.commit()
+        
+        return jsonify({'success': True, 'upload': resumable_uploads.status(app.config['UPLOAD_FOLDER'], sessao)}), 201
+        
+    except Exception as e:
+        db.rollback()
+        print(f'[ERRO] Erro ao abrir upload: {e}')
+        return jsonify({'success': False, 'message': 'Erro ao abrir upload.'}), 500
+
+
+def _sessao_do_usuario(db, upload_id):
+    """
+    Sessão de upload aberta pelo usuário atual. Sessões de outra pessoa respondem como inexistentes.
+    Returns: (sessao, None) ou (None, resposta de erro)
+    """
+    sessao = db.get(UploadSessao, upload_id)
+    user = _resolve_user(db, request.args.get('user_email')) if sessao else None
+    if not sessao or not user or sessao.user_id != user.id:
+        return None, (jsonify({'success': False, 'message': 'Upload não encontrado ou expirado.'}), 404)
+    return sessao, None
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@with_current_user
+def status_upload(upload_id):
+    """Faixas de bytes já recebidas ([início, fim)) e blocos que faltam: o cliente reenvia só esses"""
+    db = get_request_db()
+    sessao, erro = _sessao_do_usuario(db, upload_id)
+    if erro:
+        return erro
+    return jsonify({'success': True, 'upload': resumable_uploads.status(app.config['UPLOAD_FOLDER'], sessao)}), 200
+
+
+@app.route('/api/uploads/<upload_id>/blocos/<int:indice>', methods=['PUT'])
+@with_current_user
+def enviar_bloco_upload(upload_id, indice):
+    """Recebe o bloco 'indice' no corpo da requisição; reenviar um bloco substitui o anterior"""
+    db = get_request_db()
+    try:
+        sessao, erro = _sessao_do_usuario(db, upload_id)
+        if erro:
+            return erro
+        
+        try:
+            resumable_uploads.write_chunk(app.config['UPLOAD_FOLDER'], sessao, indice, request.stream)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except UnsupportedMediaType as e:
+            return jsonify({'success': False, 'message': e.description}), e.code
+        
+        return jsonify({'success': True, 'upload': resumable_uploads.status(app.config['UPLOAD_FOLDER'], sessao)}), 200
+        
+    except Exception as e:
+        print(f'[ERRO] Erro ao receber bloco {indice} do upload {upload_id}: {e}')
+        return jsonify({'success': False, 'message': 'Erro ao receber bloco.'}), 500
+
+
+@app.route('/api/uploads/<upload_id>/concluir', methods=['POST'])
+@with_current_user
+def concluir_upload(upload_id):
+    """
+    Junta os blocos e anexa a foto como PUT /api/pets/<id>/photo ou POST /api/concurso/enviar
+    (mesma resposta). Com blocos faltando responde 409 com o estado do upload.
+    """
+    db = get_request_db()
+    pasta = app.config['UPLOAD_FOLDER']
+    try:
+        sessao, erro = _sessao_do_usuario(db, upload_id)
+        if erro:
+            return erro
+        
+        status = resumable_uploads.status(pasta, sessao)
+        if not status['completo']:
+            return jsonify({'success': False, 'message': 'Ainda faltam blocos deste upload.', 'upload': status}), 409
+        
+        # O pet pode ter mudado (ou trocado de dono) desde que a sessão foi aberta
+        user = db.get(User, sessao.user_id)
+        if not user:
+            pet, erro = None, (jsonify({'success': False, 'message': 'Usuário não encontrado.'}), 404)
+        elif sessao.destino == 'concurso':
+            pet, erro = _checar_envio_concurso(db, user, sessao.pet_id)
+        else:
+            pet = db.query(Pet).filter(Pet.id == sessao.pet_id, Pet.owner_id == user.id).first()
+            erro = None if pet else (jsonify({'success': False, 'message': 'Pet não encontrado ou não pertence a este usuário.'}), 404)
+        if erro:
+            resumable_uploads.discard(db, pasta, sessao)
+            db.commit()
+            return erro
+        
+        try:
+            spool = resumable_uploads.assemble(pasta, sessao, app.config.get('MAX_IMAGE_SIZE'))
+        except (UnsupportedMediaType, RequestEntityTooLarge) as e:
+            resumable_uploads.discard(db, pasta, sessao)
+            db.commit()
+            return jsonify({'success': False, 'message': e.description}), e.code
+        try:
+            arquivo = upload_storage.store(pasta, spool)
+            if sessao.destino == 'concurso':
+                resposta = _criar_foto_concurso(db, user, pet, arquivo, sessao.descricao)
+            else:
+                resposta = _trocar_foto_pet(db, pet, arquivo)
+        finally:
+            spool.close()  # temporário que não virou o arquivo final
+        
+        # Os blocos só são apagados depois de a foto estar salva: se algo falhar, o cliente conclui de novo
+        resumable_uploads.discard(db, pasta, sessao)
+        db.commit()
+        return resposta
+        
+    except Exception as e:
+        db.rollback()
+        print(f'[ERRO] Erro ao concluir upload {upload_id}: {e}')
+        return jsonify({'success': False, 'message': 'Erro ao concluir upload.'}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@with_current_user
+def cancelar_upload(upload_id):
+    """Desiste do upload e apaga os blocos recebidos"""
+    db = get_request_db()
+    sessao, erro = _sessao_do_usuario(db, upload_id)
+    if erro:
+        return erro
+    resumable_uploads.discard(db, app.config['UPLOAD_FOLDER'], sessao)
+    db.commit()
+    return jsonify({'success': True, 'message': 'Upload cancelado.'}), 200
 
 
 # Rota para limpar agendamentos atrasados (remove duplicatas antigas)
 @app.route('/api/servicos/limpar-atrasados', methods=['POST'])
+@with_current_user
 def limpar_agendamentos_atrasados():
-    """Remove agendamentos atrasados para evitar alertas duplicados"""
-    db = SessionLocal()
+    """Move os agendamentos atrasados para o histórico (servicos_archive) para evitar alertas duplicados"""
+    db = get_request_db()
     try:
         data = request.json or {}
         user_email = data.get('user_email', '')
         
-        hoje = datetime.now().date()
+        # Usuário do token ou, em clientes antigos, busca pelo email
+        user, erro = _require_user(db, user_email)
+        if erro:
+            return erro
         
-        # Buscar usuário pelo email
-        user = db.query(User).filter(User.email == user_email).first() if user_email else None
-        
-        if user:
-            # Buscar agendamentos atrasados dos pets do usuário
-            agendamentos_atrasados = db.query(Servico).join(Pet).filter(
-                Pet.owner_id == user.id,
-                Servico.data_agendada < hoje
-            ).all()
-        else:
-            # Se não tiver email, buscar todos os agendamentos atrasados (admin)
-            agendamentos_atrasados = db.query(Servico).filter(
-                Servico.data_agendada < hoje
-            ).all()
-        
-        total_removidos = len(agendamentos_atrasados)
-        
-        if total_removidos > 0:
-            print(f"[LIMPEZA] Removendo {total_removidos} agendamento(s) atrasado(s)...")
-            for agendamento in agendamentos_atrasados:
-                pet = db.query(Pet).filter(Pet.id == agendamento.pet_id).first()
-                pet_name = pet.name if pet else "Unknown"
-                print(f"[LIMPEZA] - Removendo {agendamento.tipo} de {pet_name} (ID: {agendamento.id}, Data: {agendamento.data_agendada})")
-                db.delete(agendamento)
-            
-            db.commit()
-            print(f"[LIMPEZA] {total_removidos} agendamento(s) atrasado(s) removido(s) com sucesso")
-        else:
-            print("[LIMPEZA] Nenhum agendamento atrasado encontrado")
+        # Move os atrasados do usuário para o histórico em lotes (a limpeza de todos roda pelo agendador)
+        total_removidos = overdue_cleanup.cleanup(db, owner_id=user.id)
         
         return jsonify({
             'success': True,
-            'message': f'{total_removidos} agendamento(s) atrasado(s) removido(s).',
+            'message': f'{total_removidos} agendamento(s) atrasado(s) movido(s) para o histórico.',
             'total_removidos': total_removidos
         }), 200
         
@@ -2043,10 +2665,82 @@ def limpar_agendamentos_atrasados():
             'success': False,
             'message': 'Erro ao limpar agendamentos atrasados.'
         }), 500
+
+
+# Métricas dos caches em memória
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'success': True,
+        'clinic_catalog': clinic_catalog.stats(),
+        'votos_pendentes': sum(vote_counter.pending().values()),
+        'agendador': scheduler.stats(),
+        'imagens': image_variants.stats()
+    }), 200
+
+
+@app.cli.command('rebuild-vaccination-status')
+def rebuild_vaccination_status():
+    """Reconstrói a tabela pet_vaccination_status a partir dos serviços existentes"""
+    db = SessionLocal()
+    try:
+        total = vaccination_service.rebuild(db)
+        print(f'[VACINACAO] Resumo de vacinação reconstruído: {total} pet(s) com vacinação registrada')
     finally:
         db.close()
 
 
-if __name__ == '__main__':
+def _registrar_tarefas():
+    """Registra as tarefas periódicas; a primeira execução de cada uma acontece depois de um intervalo"""
+    scheduler.every(recurrence_service.job_interval, 'recorrencias', recurrence_service.run_job)
+    scheduler.every(overdue_cleanup.job_interval, 'limpeza-atrasados', overdue_cleanup.run_job)
+    scheduler.every(resumable_uploads.job_interval, 'uploads-expirados',
+                    lambda: resumable_uploads.run_job(app.config['UPLOAD_FOLDER']))
+
+
+@app.cli.command('run-scheduled-jobs')
+@click.option('--once', is_flag=True, help='Executa cada tarefa uma vez e sai (para cron)')
+def run_scheduled_jobs(once):
+    """Roda as tarefas periódicas num processo dedicado (ou uma vez, com --once)"""
+    _registrar_tarefas()
+    if once:
+        for nome in scheduler.stats():
+            scheduler.run_job(nome)
+        return
+    print('[AGENDADOR] Processo dedicado às tarefas periódicas')
+    scheduler.run()
+
+
+def _iniciar_agendador():
+    """Tarefas periódicas no processo web, a menos que rodem em processo próprio (SCHEDULER_IN_WEB=false)"""
+    if not app.config['SCHEDULER_IN_WEB']:
+        return
+    _registrar_tarefas()
+    scheduler.start()
+
 
+def _aquecer_votos():
+    """Carrega quem já votou em cada foto (votos repetidos são recusados sem consultar o banco) e inicia a gravação"""
+    db = SessionLocal()
+    try:
+        vote_counter.warm(db)
+    finally:
+        db.close()
+    vote_counter.start()
+
+
+def _montar_ranking():
+    """Monta o ranking do concurso em memória: a primeira página não paga a reconstrução"""
+    db = SessionLocal()
+    try:
+        leaderboard.rebuild(db)
+    finally:
+        db.close()
+
+
+# Uma vez por processo, na primeira requisição (python app.py, flask run ou servidor WSGI)
+iniciar_processo = init_startup(app, _aquecer_votos, _montar_ranking, _iniciar_agendador, image_variants.start)
+
+
+if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
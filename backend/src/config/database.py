@@ -8,8 +8,8 @@ import os
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../'))
 DATABASE_PATH = os.path.join(BASE_DIR, 'petcloud_new.db')
 
-# Create database URL for SQLite
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+# Create database URL for SQLite (DATABASE_URL permite apontar para outro banco, ex.: nos testes)
+SQLALCHEMY_DATABASE_URL = os.environ.get('DATABASE_URL', f"sqlite:///{DATABASE_PATH}")
 
 # Create SQLAlchemy engine
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
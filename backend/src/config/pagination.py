@@ -0,0 +1,72 @@
+"""
+Paginação por chave (keyset) das listagens da API.
+
+O cliente recebe 'next_cursor' em cada página e o envia de volta como ?cursor=
+para pedir a próxima. O cursor é opaco (JSON em base64 url-safe) e guarda a
+chave de ordenação da última linha entregue; a próxima página é buscada com
+WHERE chave > cursor ORDER BY chave LIMIT n, então cada página custa o mesmo
+independente da posição (sem OFFSET e sem carregar a listagem inteira).
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(*valores):
+    """Cursor opaco com a chave de ordenação de uma linha"""
+    chave = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(chave, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, tipos):
+    """
+    Chave de ordenação guardada no cursor, convertida com 'tipos' (ex.: (date.fromisoformat, int)).
+    Levanta ValueError para cursores inválidos.
+    """
+    try:
+        chave = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(chave, list) or len(chave) != len(tipos):
+            raise ValueError('cursor com formato inesperado')
+        return tuple(tipo(valor) for tipo, valor in zip(tipos, chave))
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Cursor inválido: {cursor}') from e
+
+
+def page_args(args, tipos):
+    """
+    Lê ?limit= (padrão DEFAULT_LIMIT, máximo MAX_LIMIT) e ?cursor= da requisição.
+    Returns: (limit, chave do cursor ou None). Levanta ValueError para parâmetros inválidos.
+    """
+    limit = min(max(int(args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor, tipos) if cursor else None
+
+
+def after(colunas, chave, descendente=False):
+    """Condição 'linha vem depois da chave' para uma ordenação por 'colunas' (ascendente por padrão)"""
+    condicoes = []
+    for i, coluna in enumerate(colunas):
+        iguais = [c == v for c, v in zip(colunas[:i], chave[:i])]
+        condicoes.append(and_(*iguais, coluna < chave[i] if descendente else coluna > chave[i]))
+    return or_(*condicoes)
+
+
+def keyset_page(query, colunas, chave, limit, chave_da_linha, descendente=False):
+    """
+    Uma página de 'query' ordenada por 'colunas' (ascendente, ou descendente), a partir da chave do cursor.
+    chave_da_linha(linha) devolve a chave de ordenação de uma linha do resultado.
+    Returns: (linhas da página, next_cursor ou None se for a última página)
+    """
+    if chave is not None:
+        query = query.filter(after(colunas, chave, descendente))
+    ordem = [coluna.desc() for coluna in colunas] if descendente else colunas
+    linhas = query.order_by(*ordem).limit(limit + 1).all()
+    if len(linhas) <= limit:
+        return linhas, None
+    linhas = linhas[:limit]
+    return linhas, encode_cursor(*chave_da_linha(linhas[-1]))
@@ -0,0 +1,132 @@
+"""
+Sessão do SQLAlchemy por requisição e métricas de banco por requisição.
+
+get_request_db() abre a sessão na primeira chamada dentro de uma requisição e a
+guarda em flask.g; init_app(app) fecha a sessão no teardown (mesmo em retornos
+antecipados ou exceções) e publica as métricas da requisição no log e nos
+cabeçalhos X-DB-Queries, X-DB-Time-Ms e X-DB-Rows.
+"""
+import sqlite3
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.database import SessionLocal
+
+
+class RequestDbStats:
+    """
+    Consultas executadas, tempo total no banco e linhas de uma requisição: as lidas pelo
+    código (contadas a cada fetch, sem materializar resultados) e as alteradas (cursor.rowcount)
+    """
+
+    __slots__ = ('queries', 'db_time', 'rows')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+    def headers(self):
+        return {
+            'X-DB-Queries': str(self.queries),
+            'X-DB-Time-Ms': f'{self.db_time * 1000:.2f}',
+            'X-DB-Rows': str(self.rows),
+        }
+
+
+def get_request_db():
+    """Sessão da requisição atual (criada no primeiro uso, fechada no teardown)"""
+    if '_db' not in g:
+        g._db = SessionLocal()
+    return g._db
+
+
+def get_request_stats():
+    """Métricas da requisição atual, ou None fora de uma requisição"""
+    if not has_request_context():
+        return None
+    if '_db_stats' not in g:
+        g._db_stats = RequestDbStats()
+    return g._db_stats
+
+
+class _CountingCursor(sqlite3.Cursor):
+    """Cursor do SQLite que soma às métricas da requisição as linhas conforme são lidas"""
+
+    stats = None
+
+    def execute(self, *args):
+        self.stats = get_request_stats()
+        return super().execute(*args)
+
+    def fetchone(self):
+        linha = super().fetchone()
+        if linha is not None and self.stats is not None:
+            self.stats.rows += 1
+        return linha
+
+    def fetchmany(self, *args):
+        linhas = super().fetchmany(*args)
+        if self.stats is not None:
+            self.stats.rows += len(linhas)
+        return linhas
+
+    def fetchall(self):
+        linhas = super().fetchall()
+        if self.stats is not None:
+            self.stats.rows += len(linhas)
+        return linhas
+
+
+class _CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+
+@event.listens_for(Engine, 'do_connect')
+def _count_fetched_rows(dialect, conn_rec, cargs, cparams):
+    # O SQLite informa rowcount -1 para SELECT: as linhas lidas são contadas pelo próprio cursor
+    if dialect.name == 'sqlite':
+        cparams.setdefault('factory', _CountingConnection)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info['_query_start'].pop()
+    stats = get_request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - inicio
+        # Consultas com resultado no SQLite são contadas pelo _CountingCursor conforme as linhas são lidas
+        # (yield_per continua em streaming); nos demais casos vale o que o driver informa
+        if isinstance(cursor, _CountingCursor) and cursor.description is not None:
+            return
+        if cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+
+def init_app(app):
+    @app.after_request
+    def _add_db_stats(response):
+        stats = g.get('_db_stats')
+        if stats is not None and stats.queries:
+            response.headers.update(stats.headers())
+            print(f"[DB] {request.method} {request.path} - {stats.queries} consultas, "
+                  f"{stats.db_time * 1000:.2f} ms, {stats.rows} linhas")
+        return response
+
+    @app.teardown_appcontext
+    def _close_request_db(exception=None):
+        db = g.pop('_db', None)
+        if db is not None:
+            if exception is not None:
+                db.rollback()
+            db.close()
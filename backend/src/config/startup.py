@@ -0,0 +1,40 @@
+"""
+Inicialização por processo.
+
+init_app(app, *tarefas) roda as tarefas uma vez em cada processo que atende
+requisições, antes da primeira requisição dele: vale para python app.py, flask run
+e servidores WSGI (gunicorn, uWSGI), inclusive workers criados por fork depois do
+import (a verificação é pelo pid). Com app.testing nada roda: os testes chamam as
+tarefas diretamente.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+
+
+def init_app(app, *tarefas):
+    iniciado = {'pid': None}
+
+    def iniciar():
+        """Roda as tarefas neste processo, se ainda não rodaram. Returns: True se rodou agora"""
+        if iniciado['pid'] == os.getpid():
+            return False
+        with _lock:
+            if iniciado['pid'] == os.getpid():
+                return False
+            iniciado['pid'] = os.getpid()
+        for tarefa in tarefas:
+            try:
+                tarefa()
+            except Exception as e:
+                # Uma tarefa com erro não impede as demais nem derruba a requisição
+                print(f"[INICIALIZACAO] Erro em {getattr(tarefa, '__name__', tarefa)}: {e}")
+        return True
+
+    @app.before_request
+    def _iniciar_processo():
+        if not app.testing:
+            iniciar()
+
+    return iniciar
@@ -0,0 +1,44 @@
+"""
+Respostas NDJSON em streaming para exportar tabelas inteiras.
+
+A consulta é lida do banco em lotes (yield_per, cursor no servidor) e cada
+lote vira um bloco de linhas JSON enviado assim que fica pronto, então a
+memória do processo não cresce com o número de linhas.
+"""
+from itertools import islice
+import json
+
+from flask import Response, request, stream_with_context
+
+STREAM_BATCH_SIZE = 500
+
+
+def wants_ndjson():
+    """Verdadeiro quando a requisição pede ?stream=ndjson"""
+    return request.args.get('stream', '').lower() == 'ndjson'
+
+
+def ndjson_response(query, converter, batch_size=None):
+    """
+    Resposta application/x-ndjson com converter(linha) de cada linha de 'query'.
+    A sessão da requisição continua aberta até o fim do streaming (stream_with_context).
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+
+    def gerar():
+        total = 0
+        try:
+            linhas = iter(query.yield_per(batch_size))
+            while True:
+                lote = list(islice(linhas, batch_size))
+                if not lote:
+                    break
+                total += len(lote)
+                yield ''.join(json.dumps(converter(linha)) + '\n' for linha in lote)
+        except Exception as e:
+            # O status 200 já foi enviado: registra o erro e encerra o corpo
+            print(f"[ERRO] Erro no streaming de {request.path} após {total} linha(s): {e}")
+            return
+        print(f"[STREAM] {request.path} - {total} linha(s) enviadas")
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
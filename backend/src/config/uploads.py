@@ -0,0 +1,222 @@
+"""
+Leitura em fluxo dos uploads de imagem.
+
+UploadRequest troca a fábrica de streams do Werkzeug: cada arquivo de imagem do
+corpo multipart é gravado direto num temporário dentro da pasta de uploads, bloco
+a bloco, enquanto o sha256 é calculado (memória constante, sem cópia depois). O
+tipo é conferido pelos bytes mágicos do primeiro bloco e o tamanho a cada bloco;
+um arquivo inválido ou grande demais interrompe a leitura do corpo na hora
+(415/413). init_app(app) instala a classe, lê o formulário antes da view (para os
+erros não caírem no try/except das rotas) e responde esses erros em JSON.
+
+send_upload() serve os arquivos da pasta de uploads: os gravados pelo conteúdo com
+Cache-Control imutável, todos com ETag/Last-Modified e Range, e opcionalmente só
+com os cabeçalhos (UPLOAD_SENDFILE) para o servidor web na frente enviar os bytes.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from urllib.parse import quote
+
+from flask import current_app, jsonify, request
+from flask import Request
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.formparser import default_stream_factory
+from werkzeug.security import safe_join
+from werkzeug.utils import send_from_directory
+
+EXTENSOES_IMAGEM = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# Bytes mágicos suficientes para reconhecer os formatos aceitos
+TAMANHO_CABECALHO = 12
+
+# ab/cd/<sha256>.<ext> e as variantes ab/cd/<sha256>.<nome>.webp: o conteúdo de uma URL nunca muda
+_PELO_CONTEUDO = re.compile(r'[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64}(?:\.[a-z]+)?)\.[a-z0-9]+')
+CACHE_IMUTAVEL = 365 * 24 * 3600  # segundos
+
+MODOS_SENDFILE = ('x-sendfile', 'x-accel-redirect')
+
+
+def sniff_image(cabecalho):
+    """Extensão do formato da imagem pelos primeiros bytes, ou None se não for um formato aceito"""
+    if cabecalho.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if cabecalho.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if cabecalho[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class ImageSpool:
+    """
+    Arquivo temporário gravável e legível que valida uma imagem enquanto ela chega.
+    Depois de escrito: 'extensao' (pelo conteúdo), 'hash' (sha256) e 'tamanho'.
+    Fechado sem persist(), o temporário é apagado.
+    """
+
+    def __init__(self, pasta, limite=None):
+        temporarios = os.path.join(pasta, '.tmp')
+        os.makedirs(temporarios, exist_ok=True)
+        fd, self.caminho = tempfile.mkstemp(dir=temporarios, suffix='.upload')
+        self._arquivo = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self._cabecalho = b''
+        self.limite = limite
+        self.tamanho = 0
+        self.extensao = None
+        self.persistido = False
+
+    def write(self, bloco):
+        self.tamanho += len(bloco)
+        if self.limite is not None and self.tamanho > self.limite:
+            self.close()
+            raise RequestEntityTooLarge(f'Imagem maior que o limite de {self.limite // (1024 * 1024)} MB.')
+        if self.extensao is None:
+            self._cabecalho += bloco[:TAMANHO_CABECALHO]
+            if len(self._cabecalho) >= TAMANHO_CABECALHO:
+                self._check_type()
+        self._sha256.update(bloco)
+        return self._arquivo.write(bloco)
+
+    def _check_type(self):
+        self.extensao = sniff_image(self._cabecalho)
+        if self.extensao is None:
+            self.close()
+            raise UnsupportedMediaType('Arquivo não é uma imagem PNG, JPG, GIF ou WEBP.')
+
+    def finish(self):
+        """Confere arquivos menores que o cabeçalho. Returns: self"""
+        if self.extensao is None:
+            self._check_type()
+        self._arquivo.flush()
+        return self
+
+    @property
+    def hash(self):
+        return self._sha256.hexdigest()
+
+    def seek(self, *args):
+        return self._arquivo.seek(*args)
+
+    def tell(self):
+        return self._arquivo.tell()
+
+    def read(self, *args):
+        return self._arquivo.read(*args)
+
+    def readline(self, *args):
+        return self._arquivo.readline(*args)
+
+    def persist(self, destino):
+        """Move o temporário para 'destino' (rename atômico no mesmo sistema de arquivos)"""
+        self._arquivo.close()
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(self.caminho, destino)
+        self.persistido = True
+
+    def close(self):
+        self._arquivo.close()
+        if not self.persistido and os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+    @property
+    def closed(self):
+        return self._arquivo.closed
+
+
+class UploadRequest(Request):
+    """Request cujos arquivos de imagem do multipart são lidos por ImageSpool"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        extensao = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else None
+        if extensao not in EXTENSOES_IMAGEM:
+            return default_stream_factory(
+                total_content_length=total_content_length,
+                content_type=content_type,
+                filename=filename,
+                content_length=content_length,
+            )
+
+        limite = current_app.config.get('MAX_IMAGE_SIZE')
+        if limite is not None and content_length is not None and content_length > limite:
+            raise RequestEntityTooLarge(f'Imagem maior que o limite de {limite // (1024 * 1024)} MB.')
+        return ImageSpool(current_app.config['UPLOAD_FOLDER'], limite)
+
+
+def content_etag(filename):
+    """ETag de um upload gravado pelo conteúdo (o hash, mais o nome da variante), ou None para nomes antigos"""
+    nome = _PELO_CONTEUDO.fullmatch(filename)
+    return nome.group(1) if nome else None
+
+
+def send_upload(filename, imutavel=True):
+    """
+    Serve 'filename' da pasta de uploads. Respostas condicionais (304) por ETag e
+    Last-Modified e, sem UPLOAD_SENDFILE, Range (206). Arquivos gravados pelo conteúdo
+    recebem Cache-Control imutável de um ano (imutavel=False para URLs cujo conteúdo
+    ainda pode mudar); os demais são revalidados a cada uso.
+    Com UPLOAD_SENDFILE, a resposta sai sem corpo, com X-Sendfile (caminho absoluto) ou
+    X-Accel-Redirect (UPLOAD_ACCEL_PREFIX + caminho): o servidor web envia os bytes
+    (e trata o Range) sem ocupar um worker do Python.
+    """
+    pasta = current_app.config['UPLOAD_FOLDER']
+    etag = content_etag(filename) if imutavel else None
+    modo = current_app.config.get('UPLOAD_SENDFILE')
+
+    if not modo:
+        rv = send_from_directory(
+            pasta, filename, environ=request.environ, response_class=current_app.response_class,
+            etag=etag or True, max_age=CACHE_IMUTAVEL if etag else None,
+        )
+    else:
+        caminho = safe_join(pasta, filename)
+        if caminho is None or not os.path.isfile(caminho):
+            raise NotFound()
+        estado = os.stat(caminho)
+        rv = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if modo == 'x-accel-redirect':
+            rv.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/') + '/' + quote(filename)
+        else:
+            rv.headers['X-Sendfile'] = os.path.abspath(caminho)
+        rv.last_modified = estado.st_mtime
+        rv.set_etag(etag or f"{estado.st_mtime}-{estado.st_size}")
+        rv.cache_control.no_cache = None if etag else True
+        if etag:
+            rv.cache_control.public = True
+            rv.cache_control.max_age = CACHE_IMUTAVEL
+        rv = rv.make_conditional(request.environ)
+        if rv.status_code == 304:
+            # Alguns servidores ignoram o 304 e mandam o arquivo mesmo assim
+            rv.headers.pop('X-Accel-Redirect', None)
+            rv.headers.pop('X-Sendfile', None)
+
+    if etag:
+        rv.cache_control.immutable = True
+    return rv
+
+
+def init_app(app):
+    app.request_class = UploadRequest
+    app.config.setdefault('MAX_IMAGE_SIZE', app.config.get('MAX_CONTENT_LENGTH'))
+    app.config.setdefault('UPLOAD_SENDFILE', os.environ.get('UPLOAD_SENDFILE', '').lower() or None)
+    app.config.setdefault('UPLOAD_ACCEL_PREFIX', os.environ.get('UPLOAD_ACCEL_PREFIX', '/_uploads/'))
+    if app.config['UPLOAD_SENDFILE'] not in (None, *MODOS_SENDFILE):
+        raise ValueError(f"UPLOAD_SENDFILE deve ser um de {', '.join(MODOS_SENDFILE)}")
+
+    @app.before_request
+    def _read_uploads():
+        # Lê o corpo multipart antes da view: uploads recusados viram 413/415 aqui
+        if request.mimetype == 'multipart/form-data':
+            for _campo, arquivo in request.files.items(multi=True):
+                if isinstance(arquivo.stream, ImageSpool):
+                    arquivo.stream.finish()
+
+    @app.errorhandler(RequestEntityTooLarge)
+    @app.errorhandler(UnsupportedMediaType)
+    def _upload_error(e):
+        return jsonify({'success': False, 'message': e.description}), e.code
@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey
+from config.database import Base
+
+class AgendamentoRecorrente(Base):
+    """
+    Regra de um agendamento recorrente (a cada N dias, semanas ou meses).
+    As ocorrências são linhas de servicos com recorrencia_id, geradas por RecurrenceService
+    até um horizonte móvel; a regra guarda até onde a série já foi gerada.
+    """
+    __tablename__ = 'agendamentos_recorrentes'
+    
+    UNIDADES = ('dias', 'semanas', 'meses')
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False, index=True)
+    clinica_id = Column(Integer, ForeignKey('clinicas.id'), nullable=True)
+    tipo = Column(String(50), nullable=False)  # 'banho', 'vacinacao', 'consulta'
+    intervalo = Column(Integer, nullable=False)  # a cada N unidades
+    unidade = Column(String(10), nullable=False)  # 'dias', 'semanas', 'meses'
+    data_inicio = Column(Date, nullable=False)  # âncora: ocorrência k cai em data_inicio + k * intervalo
+    data_fim = Column(Date, nullable=True)  # última data possível (opcional)
+    max_ocorrencias = Column(Integer, nullable=True)  # total de ocorrências da série (opcional)
+    ocorrencias_geradas = Column(Integer, nullable=False, default=0)
+    passos_gerados = Column(Integer, nullable=False, default=0)  # ocorrências geradas desde a âncora atual
+    gerado_ate = Column(Date, nullable=True)  # data da última ocorrência gerada
+    preco = Column(Float, nullable=True)
+    clinica = Column(String(100), nullable=True)
+    veterinario = Column(String(100), nullable=True)
+    ativo = Column(Boolean, nullable=False, default=True, index=True)
+    criado_em = Column(DateTime, default=datetime.now)
+    versao = Column(Integer, nullable=False)
+    
+    # Controle otimista: duas transações que geram/alteram a mesma série não gravam as duas
+    __mapper_args__ = {'version_id_col': versao}
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pet_id': self.pet_id,
+            'clinica_id': self.clinica_id,
+            'tipo': self.tipo,
+            'intervalo': self.intervalo,
+            'unidade': self.unidade,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None,
+            'max_ocorrencias': self.max_ocorrencias,
+            'ocorrencias_geradas': self.ocorrencias_geradas,
+            'gerado_ate': self.gerado_ate.isoformat() if self.gerado_ate else None,
+            'preco': self.preco,
+            'clinica': self.clinica,
+            'veterinario': self.veterinario,
+            'ativo': self.ativo
+        }
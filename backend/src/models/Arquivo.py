@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from config.database import Base
+
+class Arquivo(Base):
+    """Upload armazenado pelo conteúdo (sha256), com o número de fotos que o usam"""
+    __tablename__ = 'arquivos'
+
+    caminho = Column(String(200), primary_key=True)  # relativo à pasta de uploads: ab/cd/<sha256>.<ext>
+    hash = Column(String(64), nullable=False, index=True)
+    tamanho = Column(Integer, nullable=False)
+    referencias = Column(Integer, nullable=False, default=0)  # Pet.photo_url + Concurso.imagem_url
+    criado_em = Column(DateTime, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            'caminho': self.caminho,
+            'hash': self.hash,
+            'tamanho': self.tamanho,
+            'referencias': self.referencias,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
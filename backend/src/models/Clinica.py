@@ -7,7 +7,7 @@ class Clinica(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String(100), nullable=False)
-    tipo_servico = Column(String(50), nullable=False)  # 'banho', 'vacinacao', 'consulta'
+    tipo_servico = Column(String(50), nullable=False, index=True)  # 'banho', 'vacinacao', 'consulta'
     preco_servico = Column(Float, nullable=True)
     veterinario = Column(String(100), nullable=True)
     
@@ -1,15 +1,21 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+import json
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from config.database import Base
 
 class Concurso(Base):
     __tablename__ = "concursos"
+    __table_args__ = (
+        # Ranking do concurso: ORDER BY votos DESC, data_envio DESC
+        Index('ix_concursos_votos_data_envio', 'votos', 'data_envio'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False)
+    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     imagem_url = Column(String(500), nullable=False)
+    imagem_variants = Column(String(1000), nullable=True)  # URLs das variantes (miniatura/WebP), em JSON
     descricao = Column(Text, nullable=True)
     votos = Column(Integer, default=0)
     data_envio = Column(DateTime, default=datetime.now)
@@ -24,6 +30,7 @@ class Concurso(Base):
             'pet_id': self.pet_id,
             'user_id': self.user_id,
             'imagem_url': self.imagem_url,
+            'imagem_variants': json.loads(self.imagem_variants) if self.imagem_variants else {},
             'descricao': self.descricao,
             'votos': self.votos,
             'data_envio': self.data_envio.isoformat() if self.data_envio else None,
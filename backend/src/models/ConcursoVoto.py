@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from config.database import Base
+
+class ConcursoVoto(Base):
+    """Um voto de um usuário em uma foto do concurso (no máximo um por usuário e foto)"""
+    __tablename__ = 'concurso_votes'
+    __table_args__ = (
+        UniqueConstraint('concurso_id', 'user_id', name='uq_concurso_votes_concurso_user'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    concurso_id = Column(Integer, ForeignKey('concursos.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    data_voto = Column(DateTime, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'concurso_id': self.concurso_id,
+            'user_id': self.user_id,
+            'data_voto': self.data_voto.isoformat() if self.data_voto else None
+        }
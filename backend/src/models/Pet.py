@@ -23,8 +23,9 @@ class Pet(Base):
     breed = Column(String, nullable=False)
     birth_date = Column(DateTime, nullable=False)  # Usado como idade
     type = Column(String, nullable=True)  # Espécie opcional
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     photo_url = Column(String, nullable=True)  # URL da foto do pet
+    photo_variants = Column(String, nullable=True)  # URLs das variantes (miniatura/WebP) da foto, em JSON
     behavior_tags = Column(String, default=json.dumps([]), nullable=True)  # Tags de comportamento
     health_records = Column(String, default=json.dumps([]), nullable=True)
     feeding_schedule = Column(String, default=json.dumps([]), nullable=True)
@@ -61,6 +62,10 @@ class Pet(Base):
         """Set behavior tags from a Python list"""
         self.behavior_tags = json.dumps(tags)
 
+    def get_photo_variants(self) -> Dict[str, str]:
+        """Get photo variant URLs as a Python dict"""
+        return json.loads(self.photo_variants) if self.photo_variants else {}
+
     def set_owner(self, user: Optional['User']) -> None:
         """Set the owner of the pet."""
         self.owner = user
@@ -134,6 +139,7 @@ class Pet(Base):
             'birth_date': self.birth_date.isoformat() if self.birth_date else None,
             'age': self.get_age() if hasattr(self, 'get_age') else None,
             'photo_url': self.photo_url if hasattr(self, 'photo_url') else None,
+            'photo_variants': self.get_photo_variants(),
             'behavior_tags': self.get_behavior_tags() if hasattr(self, 'behavior_tags') else [],
             'owner': {'id': self.owner.id, 'name': self.owner.name} if hasattr(self, 'owner') and self.owner else None,
             'health_records': self.health_records if hasattr(self, 'health_records') else [],
@@ -145,5 +151,35 @@ class Pet(Base):
             'updated_at': self.updated_at.isoformat() if hasattr(self, 'updated_at') and self.updated_at else None
         }
 
+    # Colunas do resumo: permitem listar pets sem montar objetos Pet (ver summary_dict)
+    SUMMARY_COLUMNS = ('id', 'name', 'type', 'breed', 'birth_date', 'photo_url', 'photo_variants', 'owner_id')
+
+    def to_summary_dict(self) -> Dict:
+        """Resumo do pet usado nas listagens."""
+        return Pet.summary_dict(self)
+
+    @staticmethod
+    def summary_dict(pet) -> Dict:
+        """Resumo de um Pet ou de uma linha consultada com as SUMMARY_COLUMNS."""
+        return {
+            'id': pet.id,
+            'name': pet.name,
+            'type': pet.type,
+            'breed': pet.breed,
+            'birth_date': pet.birth_date.strftime('%Y-%m-%d') if pet.birth_date else None,
+            'photo_url': pet.photo_url,
+            'photo_variants': json.loads(pet.photo_variants) if pet.photo_variants else {},
+            'owner_id': pet.owner_id
+        }
+
+    def to_detail_dict(self) -> Dict:
+        """Dados do pet exibidos na página de detalhes."""
+        return {
+            **self.to_summary_dict(),
+            'behavior_tags': self.get_behavior_tags(),
+            'health_records': self.health_records,
+            'feeding_schedule': self.feeding_schedule
+        }
+
     def __str__(self) -> str:
         return f"Pet(id={self.id}, name={self.name}, type={self.type}, breed={self.breed})"
\ No newline at end of file
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from config.database import Base
+
+class PetVaccinationStatus(Base):
+    """Resumo desnormalizado da última vacinação de cada pet (mantido por VaccinationService)"""
+    __tablename__ = 'pet_vaccination_status'
+    
+    pet_id = Column(Integer, ForeignKey('pets.id'), primary_key=True)
+    ultima_vacinacao = Column(Date, nullable=False)
+    proxima_vacinacao = Column(Date, nullable=False, index=True)  # ultima_vacinacao + validade
+    atualizado_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'pet_id': self.pet_id,
+            'ultima_vacinacao': self.ultima_vacinacao.isoformat() if self.ultima_vacinacao else None,
+            'proxima_vacinacao': self.proxima_vacinacao.isoformat() if self.proxima_vacinacao else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
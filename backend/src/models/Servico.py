@@ -1,18 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from config.database import Base
 
 class Servico(Base):
     __tablename__ = 'servicos'
+    __table_args__ = (
+        # Filtro das rotas quentes: serviços de um pet por tipo e data
+        Index('ix_servicos_pet_tipo_data', 'pet_id', 'tipo', 'data_agendada'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False)
     clinica_id = Column(Integer, ForeignKey('clinicas.id'), nullable=True)
     tipo = Column(String(50), nullable=False)  # 'banho', 'vacinacao', 'consulta'
-    data_agendada = Column(Date, nullable=False)
+    data_agendada = Column(Date, nullable=False, index=True)
     preco = Column(Float, nullable=True)
     clinica = Column(String(100), nullable=True)  # Deprecated - usar clinica_id
     veterinario = Column(String(100), nullable=True)
+    recorrencia_id = Column(Integer, ForeignKey('agendamentos_recorrentes.id'), nullable=True, index=True)  # série recorrente
     
     # Relacionamento com Pet
     pet = relationship("Pet", back_populates="servicos")
@@ -36,5 +41,6 @@ class Servico(Base):
             'data_agendada': self.data_agendada.isoformat() if self.data_agendada else None,
             'preco': self.preco,
             'clinica': clinica_nome,  # Nome da clínica obtido através do relacionamento ou campo antigo
-            'veterinario': self.veterinario
+            'veterinario': self.veterinario,
+            'recorrencia_id': self.recorrencia_id
         }
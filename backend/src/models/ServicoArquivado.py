@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
+from config.database import Base
+
+class ServicoArquivado(Base):
+    """Serviço passado movido de servicos (mantém o id original); lido pelas rotas de histórico"""
+    __tablename__ = 'servicos_archive'
+    __table_args__ = (
+        # Histórico de um pet em ordem de data e última vacinação (MAX por pet)
+        Index('ix_servicos_archive_pet_data', 'pet_id', 'data_agendada', 'id'),
+        Index('ix_servicos_archive_pet_tipo_data', 'pet_id', 'tipo', 'data_agendada'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    pet_id = Column(Integer, ForeignKey('pets.id'), nullable=False)
+    clinica_id = Column(Integer, ForeignKey('clinicas.id'), nullable=True)
+    tipo = Column(String(50), nullable=False)
+    data_agendada = Column(Date, nullable=False)
+    preco = Column(Float, nullable=True)
+    clinica = Column(String(100), nullable=True)
+    veterinario = Column(String(100), nullable=True)
+    recorrencia_id = Column(Integer, nullable=True)  # sem FK: a série pode ser removida depois
+    arquivado_em = Column(DateTime, default=datetime.now, nullable=False)
@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from config.database import Base
+
+class UploadSessao(Base):
+    """Upload retomável em andamento: os blocos recebidos ficam em uploads/.tmp/sessoes/<id>/"""
+    __tablename__ = 'upload_sessoes'
+
+    id = Column(String(64), primary_key=True)  # token aleatório: quem tem o id pode enviar os blocos
+    destino = Column(String(20), nullable=False)  # 'pet' (foto do pet) ou 'concurso'
+    pet_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)  # quem abriu a sessão (obrigatório para o concurso)
+    descricao = Column(Text, nullable=True)
+    tamanho = Column(Integer, nullable=False)  # bytes do arquivo completo
+    tamanho_bloco = Column(Integer, nullable=False)
+    criado_em = Column(DateTime, default=datetime.now, index=True)
+
+    @property
+    def total_blocos(self):
+        return -(-self.tamanho // self.tamanho_bloco)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'destino': self.destino,
+            'pet_id': self.pet_id,
+            'tamanho': self.tamanho,
+            'tamanho_bloco': self.tamanho_bloco,
+            'total_blocos': self.total_blocos,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
@@ -8,8 +8,14 @@ from .User import User
 from .Pet import Pet
 from .PasswordReset import PasswordReset
 from .Servico import Servico
+from .ServicoArquivado import ServicoArquivado
 from .Concurso import Concurso
+from .ConcursoVoto import ConcursoVoto
+from .AgendamentoRecorrente import AgendamentoRecorrente
 from .Clinica import Clinica
+from .PetVaccinationStatus import PetVaccinationStatus
+from .Arquivo import Arquivo
+from .UploadSessao import UploadSessao
 
 
 try:
@@ -26,4 +32,4 @@ if not TYPE_CHECKING:
     Clinica.servicos = relationship("Servico", back_populates="clinica_rel", lazy="select")
     Servico.clinica_rel = relationship("Clinica", back_populates="servicos", lazy="joined")
 
-__all__ = ['User', 'Pet', 'PasswordReset', 'Servico', 'Clinica', 'Base']
+__all__ = ['User', 'Pet', 'PasswordReset', 'Servico', 'ServicoArquivado', 'Clinica', 'PetVaccinationStatus', 'ConcursoVoto', 'AgendamentoRecorrente', 'Arquivo', 'UploadSessao', 'Base']
@@ -1,6 +1,12 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+import base64
 import hashlib
-from typing import Optional, Tuple
+import hmac
+from typing import Iterator, Optional, Tuple
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 import sys
@@ -10,74 +16,182 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.User import User
 from config.database import SessionLocal
 
+# Authenticated user as carried by a session token (no database access needed)
+TokenUser = namedtuple('TokenUser', ['id', 'email', 'name'])
+
+
 class AuthService:
-    def __init__(self):
-        self.db = SessionLocal()
+    """
+    Registration and login.
+
+    Thread-safe: holds no session of its own. Each call uses the session passed
+    in (e.g. the request session) or a short-lived one from SessionLocal.
+    Passwords are hashed with PBKDF2-SHA256 on a bounded worker pool; legacy
+    unsalted SHA-256 hashes are upgraded on the user's next successful login.
+    Successful logins get a signed, stateless token carrying the user id
+    (see issue_token / user_from_token).
+    """
+
+    HASH_ALGORITHM = 'pbkdf2_sha256'
+    DEFAULT_ITERATIONS = 600_000
+    SALT_BYTES = 16
+    TOKEN_SALT = 'petcloud-auth-token'
+    DEFAULT_TOKEN_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
+    def __init__(self, iterations: Optional[int] = None, max_workers: Optional[int] = None,
+                 secret_key: Optional[str] = None):
+        # Tunable through the environment (tests use a low iteration count)
+        self.iterations = iterations or int(os.environ.get('PASSWORD_HASH_ITERATIONS', self.DEFAULT_ITERATIONS))
+        # Caps how many hashes run at once so logins can't take over every CPU
+        self._hash_pool = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))),
+            thread_name_prefix='password-hash'
+        )
+        self._tokens = URLSafeTimedSerializer(
+            secret_key or os.environ.get('SECRET_KEY', 'petcloud-secret-key-change-in-production'),
+            salt=self.TOKEN_SALT
+        )
+        self.token_max_age = int(os.environ.get('AUTH_TOKEN_MAX_AGE', self.DEFAULT_TOKEN_MAX_AGE))
+
+    @contextmanager
+    def _session(self, db: Optional[Session]) -> Iterator[Session]:
+        """Use the given session, or open a short-lived one for this call"""
+        if db is not None:
+            yield db
+            return
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _pbkdf2(self, password: str, salt: bytes, iterations: int) -> bytes:
+        return self._hash_pool.submit(
+            hashlib.pbkdf2_hmac, 'sha256', password.encode(), salt, iterations
+        ).result()
 
     def _hash_password(self, password: str) -> str:
-        """Hash a password for secure storage"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash a password for secure storage: pbkdf2_sha256$<iterations>$<salt>$<hash>"""
+        salt = os.urandom(self.SALT_BYTES)
+        digest = self._pbkdf2(password, salt, self.iterations)
+        return '$'.join((
+            self.HASH_ALGORITHM,
+            str(self.iterations),
+            base64.b64encode(salt).decode(),
+            base64.b64encode(digest).decode()
+        ))
 
-    def register(self, name: str, email: str, password: str) -> Tuple[bool, str, Optional[User]]:
+    def _verify_password(self, password: str, stored: str) -> Tuple[bool, bool]:
         """
-        Register a new user
-        Returns: (success, message, user)
+        Check a password against a stored hash
+        Returns: (matches, needs_rehash)
+        """
+        if stored.startswith(self.HASH_ALGORITHM + '$'):
+            _, iterations, salt, expected = stored.split('$')
+            digest = self._pbkdf2(password, base64.b64decode(salt), int(iterations))
+            matches = hmac.compare_digest(digest, base64.b64decode(expected))
+            return matches, int(iterations) != self.iterations
+
+        # Legacy hash: unsalted SHA-256 hex digest
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy.encode(), stored.encode()), True
+
+    def set_password(self, user: User, new_password: str) -> None:
+        """
+        Store a new password for the user, always in the current hash format
+        (PBKDF2 with the configured iterations). Does not commit.
+        """
+        user.password = self._hash_password(new_password)
+
+    def issue_token(self, user: User) -> str:
+        """Signed session token with the user's id, email and name"""
+        return self._tokens.dumps({'uid': user.id, 'email': user.email, 'name': user.name})
+
+    def user_from_token(self, token: str) -> Optional[TokenUser]:
+        """
+        Validate a session token without touching the database
+        Returns: the token's user, or None if the token is invalid or expired
         """
         try:
-            hashed_password = self._hash_password(password)
-            new_user = User(
-                name=name,
-                email=email,
-                password=hashed_password
-            )
-            
-            self.db.add(new_user)
-            self.db.commit()
-            self.db.refresh(new_user)
-            
-            return True, "Usuário registrado com sucesso!", new_user
-            
-        except IntegrityError:
-            self.db.rollback()
-            return False, "Email já cadastrado.", None
-        except Exception as e:
-            self.db.rollback()
-            return False, f"Erro ao registrar usuário: {str(e)}", None
-
-    def login(self, email: str, password: str) -> Tuple[bool, str, Optional[User]]:
+            payload = self._tokens.loads(token, max_age=self.token_max_age)
+        except BadSignature:  # also covers SignatureExpired
+            return None
+        return TokenUser(payload['uid'], payload['email'], payload.get('name'))
+
+    def register(self, name: str, email: str, password: str,
+                 db: Optional[Session] = None) -> Tuple[bool, str, Optional[User]]:
         """
-        Authenticate a user
+        Register a new user
+        db: session to use (e.g. the request session); defaults to a short-lived one
         Returns: (success, message, user)
         """
-        try:
-            hashed_password = self._hash_password(password)
-            user = self.db.query(User).filter(User.email == email).first()
-            
-            if not user:
-                return False, "Usuário não encontrado.", None
+        with self._session(db) as db:
+            try:
+                hashed_password = self._hash_password(password)
+                new_user = User(
+                    name=name,
+                    email=email,
+                    password=hashed_password
+                )
                 
-            if user.password != hashed_password:
-                return False, "Senha incorreta.", None
+                db.add(new_user)
+                db.commit()
+                db.refresh(new_user)
                 
-            return True, "Login realizado com sucesso!", user
-            
-        except Exception as e:
-            return False, f"Erro ao autenticar: {str(e)}", None
+                return True, "Usuário registrado com sucesso!", new_user
+                
+            except IntegrityError:
+                db.rollback()
+                return False, "Email já cadastrado.", None
+            except Exception as e:
+                db.rollback()
+                return False, f"Erro ao registrar usuário: {str(e)}", None
+
+    def login(self, email: str, password: str,
+              db: Optional[Session] = None) -> Tuple[bool, str, Optional[User]]:
+        """
+        Authenticate a user, upgrading an outdated password hash on success
+        db: session to use (e.g. the request session); defaults to a short-lived one
+        Returns: (success, message, user); use issue_token(user) for the session token
+        """
+        with self._session(db) as db:
+            try:
+                user = db.query(User).filter(User.email == email).first()
+                
+                if not user:
+                    return False, "Usuário não encontrado.", None
+                
+                matches, needs_rehash = self._verify_password(password, user.password)
+                if not matches:
+                    return False, "Senha incorreta.", None
+                
+                if needs_rehash:
+                    self.set_password(user, password)
+                    db.commit()
+                    print(f"[AUTH] Hash de senha atualizado para o usuário id={user.id}")
+                    
+                return True, "Login realizado com sucesso!", user
+                
+            except Exception as e:
+                db.rollback()
+                return False, f"Erro ao autenticar: {str(e)}", None
 
-    def change_password(self, email: str, current_password: str, new_password: str) -> Tuple[bool, str]:
+    def change_password(self, email: str, current_password: str, new_password: str,
+                        db: Optional[Session] = None) -> Tuple[bool, str]:
         """Change user password"""
-        success, message, user = self.login(email, current_password)
-        
-        if not success:
-            return False, "Senha atual incorreta."
+        with self._session(db) as db:
+            success, message, user = self.login(email, current_password, db=db)
             
-        try:
-            user.password = self._hash_password(new_password)
-            self.db.commit()
-            return True, "Senha alterada com sucesso!"
-        except Exception as e:
-            self.db.rollback()
-            return False, f"Erro ao alterar senha: {str(e)}"
+            if not success:
+                return False, "Senha atual incorreta."
+                
+            try:
+                self.set_password(user, new_password)
+                db.commit()
+                return True, "Senha alterada com sucesso!"
+            except Exception as e:
+                db.rollback()
+                return False, f"Erro ao alterar senha: {str(e)}"
         # 1. Generate reset token
         # 2. Save token with expiration
         # 3. Send reset email
@@ -0,0 +1,117 @@
+from collections import namedtuple
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Clinica import Clinica
+
+
+class ClinicaInfo(namedtuple('ClinicaInfo', ['id', 'nome', 'tipo_servico', 'preco_servico', 'veterinario'])):
+    """Cópia imutável de uma clínica, independente de sessão"""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+class ClinicCatalogService:
+    """
+    Catálogo de clínicas em memória (read-through).
+
+    A tabela clinicas é pequena e quase nunca muda: o catálogo é carregado uma vez
+    e indexado por id, nome (minúsculo) e tipo_servico. Qualquer INSERT/UPDATE/DELETE
+    em clinicas, por qualquer sessão, invalida o catálogo; a próxima leitura recarrega.
+    """
+
+    _DML_CLINICAS = re.compile(r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?clinicas"?\b', re.IGNORECASE)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Tuple[Dict, Dict, Dict]] = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _indexes(self, db: Session) -> Tuple[Dict, Dict, Dict]:
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            generation = self._generation
+
+        clinicas = [
+            ClinicaInfo(c.id, c.nome, c.tipo_servico, c.preco_servico, c.veterinario)
+            for c in db.query(Clinica).order_by(Clinica.id).all()
+        ]
+        por_id = {c.id: c for c in clinicas}
+        por_nome = {c.nome.lower(): c for c in clinicas}
+        por_tipo: Dict[str, List[ClinicaInfo]] = {}
+        for c in clinicas:
+            por_tipo.setdefault(c.tipo_servico, []).append(c)
+        snapshot = (por_id, por_nome, por_tipo)
+
+        with self._lock:
+            # Só publica se ninguém invalidou o catálogo durante a carga
+            if generation == self._generation:
+                self._snapshot = snapshot
+        print(f"[CLINICAS] Catálogo carregado: {len(clinicas)} clínica(s)")
+        return snapshot
+
+    def get(self, db: Session, clinica_id) -> Optional[ClinicaInfo]:
+        try:
+            clinica_id = int(clinica_id)
+        except (TypeError, ValueError):
+            return None
+        return self._indexes(db)[0].get(clinica_id)
+
+    def by_name(self, db: Session, nome: str) -> Optional[ClinicaInfo]:
+        return self._indexes(db)[1].get((nome or '').strip().lower())
+
+    def by_tipo(self, db: Session, tipo: str) -> List[ClinicaInfo]:
+        return list(self._indexes(db)[2].get(tipo, []))
+
+    def all(self, db: Session) -> List[ClinicaInfo]:
+        return list(self._indexes(db)[0].values())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses, carregado = self.hits, self.misses, self._snapshot is not None
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+            'carregado': carregado
+        }
+
+
+clinic_catalog = ClinicCatalogService()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _invalidate_on_write(conn, cursor, statement, parameters, context, executemany):
+    if ClinicCatalogService._DML_CLINICAS.match(statement):
+        clinic_catalog.invalidate()
+        conn.info['clinicas_alteradas'] = True
+
+
+@event.listens_for(Engine, 'commit')
+@event.listens_for(Engine, 'rollback')
+def _invalidate_on_transaction_end(conn):
+    # Invalida de novo no fim da transação: uma carga feita antes do commit leu os dados antigos
+    if conn.info.pop('clinicas_alteradas', False):
+        clinic_catalog.invalidate()
@@ -0,0 +1,123 @@
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterator, Optional, Set
+import os
+
+
+class ContestStreamService:
+    """
+    Transmissão (Server-Sent Events) das contagens de votos do concurso.
+
+    Cada voto só registra a contagem mais recente da foto. Uma thread junta as
+    mudanças de uma janela de COALESCE_WINDOW segundos e monta UMA mensagem
+    'votos' com a lista compacta [{id, votos}], entregue igual a todos os
+    espectadores conectados. Espectadores lentos (fila cheia) são desconectados.
+    """
+
+    DEFAULT_COALESCE_WINDOW = 0.5  # segundos
+    KEEPALIVE_INTERVAL = 15.0  # segundos sem mensagens até enviar um comentário de keepalive
+    MAX_QUEUED_MESSAGES = 100
+    RETRY_MS = 3000  # reconexão automática do EventSource
+
+    def __init__(self, coalesce_window: Optional[float] = None):
+        self.coalesce_window = coalesce_window or float(
+            os.environ.get('CONTEST_STREAM_WINDOW', self.DEFAULT_COALESCE_WINDOW)
+        )
+        self._lock = threading.Lock()
+        self._dirty: Dict[int, int] = {}
+        self._subscribers: Set[queue.Queue] = set()
+        self._changed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.broadcasts = 0
+
+    def publish(self, concurso_id: int, votos: int) -> None:
+        """Registra a contagem atual de uma foto para a próxima transmissão"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._dirty[concurso_id] = votos
+        self._changed.set()
+
+    @staticmethod
+    def format_event(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    def broadcast_pending(self) -> int:
+        """
+        Envia as mudanças acumuladas numa única mensagem para todos os espectadores.
+        Returns: número de espectadores que receberam a mensagem
+        """
+        with self._lock:
+            mudancas, self._dirty = self._dirty, {}
+            subscribers = list(self._subscribers)
+        if not mudancas:
+            return 0
+
+        mensagem = self.format_event('votos', [
+            {'id': concurso_id, 'votos': votos} for concurso_id, votos in sorted(mudancas.items())
+        ])
+        entregues = 0
+        for fila in subscribers:
+            try:
+                fila.put_nowait(mensagem)
+                entregues += 1
+            except queue.Full:
+                # Espectador não está consumindo: encerra a conexão dele
+                self._unsubscribe(fila)
+                fila.queue.clear()
+                fila.put_nowait(None)
+        self.broadcasts += 1
+        return entregues
+
+    def subscribe(self) -> Iterator[str]:
+        """Gerador de mensagens SSE para um espectador (corpo da resposta text/event-stream)"""
+        fila: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUED_MESSAGES)
+        with self._lock:
+            self._subscribers.add(fila)
+        self._ensure_started()
+        print(f"[CONCURSO STREAM] Espectador conectado ({self.subscriber_count()} no total)")
+
+        def eventos():
+            try:
+                yield f"retry: {self.RETRY_MS}\n\n"
+                while True:
+                    try:
+                        mensagem = fila.get(timeout=self.KEEPALIVE_INTERVAL)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    if mensagem is None:
+                        return
+                    yield mensagem
+            finally:
+                self._unsubscribe(fila)
+                print(f"[CONCURSO STREAM] Espectador desconectado ({self.subscriber_count()} no total)")
+
+        return eventos()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _unsubscribe(self, fila: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(fila)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='contest-stream', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._changed.wait()
+            # Janela de agrupamento: votos que chegarem nesse intervalo vão na mesma mensagem
+            time.sleep(self.coalesce_window)
+            self._changed.clear()
+            self.broadcast_pending()
+
+
+contest_stream = ContestStreamService()
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Pet import Pet
+from models.Servico import Servico
+
+
+class DashboardService:
+    """
+    Monta as seções do dashboard a partir de dados já carregados.
+    Não faz consultas: as rotas carregam pets/serviços uma vez e reutilizam as seções.
+    """
+
+    SECOES = ('stats', 'vacinas_vencidas', 'proximos_agendamentos', 'pets')
+
+    # Janela de agendamentos exibidos: atrasados recentes e próximos 12 meses
+    DIAS_ATRASO_EXIBIDOS = 7
+    DIAS_FUTURO_EXIBIDOS = 365
+
+    ICONES_SERVICO = {
+        'vacinacao': ('fa-syringe', 'Vacinação'),
+        'banho': ('fa-cut', 'Banho'),
+        'consulta': ('fa-notes-medical', 'Consulta'),
+    }
+
+    def month_range(self, hoje: date) -> Tuple[date, date]:
+        """Primeiro e último dia do mês de 'hoje'"""
+        primeiro_dia = hoje.replace(day=1)
+        proximo_mes = (primeiro_dia + timedelta(days=32)).replace(day=1)
+        return primeiro_dia, proximo_mes - timedelta(days=1)
+
+    def upcoming_range(self, hoje: date) -> Tuple[date, date]:
+        """Intervalo de datas da seção de próximos agendamentos"""
+        return hoje - timedelta(days=self.DIAS_ATRASO_EXIBIDOS), hoje + timedelta(days=self.DIAS_FUTURO_EXIBIDOS)
+
+    def stats(self, status_pets: List[Dict], servicos: Iterable[Servico], hoje: date) -> Dict:
+        """total_pets, gastos_mes (serviços com preço no mês atual) e vacinas_vencidas"""
+        primeiro_dia, ultimo_dia = self.month_range(hoje)
+        servicos_mes = [
+            servico for servico in servicos
+            if primeiro_dia <= servico.data_agendada <= ultimo_dia and servico.preco is not None
+        ]
+        total_gastos = sum(servico.preco for servico in servicos_mes if servico.preco)
+
+        vacinas_vencidas = 0
+        for status in status_pets:
+            if status['ultima_vacinacao'] is None:
+                # Pet sem nenhuma vacinação agendada = vacina vencida
+                vacinas_vencidas += 1
+                print(f"[DASHBOARD] Pet {status['pet_name']} (ID: {status['pet_id']}) sem vacinações - VENCIDA")
+            elif status['vencida']:
+                # Última vacinação há mais de 1 ano = vencida
+                vacinas_vencidas += 1
+                print(f"[DASHBOARD] Pet {status['pet_name']} (ID: {status['pet_id']}) - última vacinação há {status['dias_desde_vacinacao']} dias - VENCIDA")
+            else:
+                print(f"[DASHBOARD] Pet {status['pet_name']} (ID: {status['pet_id']}) - última vacinação há {status['dias_desde_vacinacao']} dias - OK")
+
+        print(f"[DASHBOARD] Total de pets: {len(status_pets)}")
+        print(f"[DASHBOARD] Gastos do mês: R$ {total_gastos:.2f} ({len(servicos_mes)} serviços)")
+        print(f"[DASHBOARD] Vacinas vencidas: {vacinas_vencidas}")
+
+        return {
+            'total_pets': len(status_pets),
+            'gastos_mes': total_gastos,
+            'vacinas_vencidas': vacinas_vencidas
+        }
+
+    def overdue_vaccines(self, status_pets: List[Dict]) -> List[Dict]:
+        """Lista de alertas de vacina vencida (ignora pets com vacinação em dia)"""
+        vacinas_vencidas_lista = []
+
+        for status in status_pets:
+            if status['ultima_vacinacao'] is None:
+                # Pet sem nenhuma vacinação agendada - considera como muito atrasado
+                vacinas_vencidas_lista.append({
+                    'pet_id': status['pet_id'],
+                    'pet_name': status['pet_name'],
+                    'status': 'sem_vacinacao',
+                    'mensagem': 'Nenhuma vacinação cadastrada',
+                    'dias_apos_vencimento': 999  # Valor alto para indicar que nunca foi vacinado
+                })
+            elif status['vencida']:
+                # Há quantos dias está vencida (após 1 ano do vencimento)
+                dias_apos_vencimento = status['dias_apos_vencimento']
+
+                vacinas_vencidas_lista.append({
+                    'pet_id': status['pet_id'],
+                    'pet_name': status['pet_name'],
+                    'status': 'vencida',
+                    'ultima_vacinacao': status['ultima_vacinacao'].isoformat(),
+                    'dias_desde_vacinacao': status['dias_desde_vacinacao'],
+                    'dias_apos_vencimento': dias_apos_vencimento,
+                    'mensagem': f'Vencida há {dias_apos_vencimento} dias'
+                })
+
+        print(f"[VACINAS VENCIDAS] Total: {len(vacinas_vencidas_lista)}")
+        return vacinas_vencidas_lista
+
+    def upcoming_appointments(self, servicos_com_pet: Iterable[Tuple[Servico, Optional[Pet]]], hoje: date) -> List[Dict]:
+        """
+        Próximos agendamentos (e atrasados recentes) em ordem de data.
+        servicos_com_pet: pares (servico, pet) já filtrados e ordenados.
+        """
+        inicio, fim = self.upcoming_range(hoje)
+        agendamentos_lista = []
+
+        for servico, pet in servicos_com_pet:
+            if not pet or not (inicio <= servico.data_agendada <= fim):
+                continue
+
+            dias_ate_agendamento = (servico.data_agendada - hoje).days
+            icone, tipo_label = self.ICONES_SERVICO.get(
+                servico.tipo, ('fa-calendar-check', servico.tipo.capitalize())
+            )
+
+            agendamentos_lista.append({
+                'pet_id': pet.id,
+                'pet_name': pet.name,
+                'tipo': servico.tipo,
+                'tipo_label': tipo_label,
+                'data_agendada': servico.data_agendada.isoformat(),
+                'dias_ate': dias_ate_agendamento,
+                'atrasado': dias_ate_agendamento < 0,
+                'clinica': servico.clinica,
+                'veterinario': servico.veterinario,
+                'icone': icone
+            })
+
+        print(f"[AGENDAMENTOS] Total de próximos agendamentos: {len(agendamentos_lista)}")
+        return agendamentos_lista
+
+
+dashboard_service = DashboardService()
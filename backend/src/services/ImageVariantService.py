@@ -0,0 +1,177 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import threading
+from typing import Dict, Optional
+from sqlalchemy import update
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Pet import Pet
+from models.Concurso import Concurso
+from services.LeaderboardService import leaderboard
+from config.database import SessionLocal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele as fotos são servidas só no tamanho original
+    Image = ImageOps = None
+
+
+# Variantes geradas para cada upload: nome -> (maior lado em pixels, qualidade WebP)
+VARIANTES = {
+    'thumb': (320, 75),   # cards da listagem, dashboard e concurso
+    'webp': (1280, 82),   # página de detalhes
+}
+
+
+def variant_filename(filename: str, nome: str) -> str:
+    """Nome do arquivo da variante 'nome' de um upload (mesma pasta do original)"""
+    return f"{os.path.splitext(filename)[0]}.{nome}.webp"
+
+
+def render_variants(pasta: str, filename: str) -> Dict[str, str]:
+    """
+    Gera as variantes WebP de um upload (roda num processo do pool).
+    Cada variante é gravada num arquivo temporário e renomeada no lugar.
+    Returns: nome da variante -> nome do arquivo gerado
+    """
+    geradas = {}
+    with Image.open(os.path.join(pasta, filename)) as original:
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode not in ('RGB', 'RGBA'):
+            imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() else 'RGB')
+        for nome, (lado, qualidade) in VARIANTES.items():
+            variante = imagem.copy()
+            variante.thumbnail((lado, lado))
+            destino = variant_filename(filename, nome)
+            temporario = os.path.join(pasta, os.path.dirname(destino), f".{os.path.basename(destino)}.tmp")
+            variante.save(temporario, 'WEBP', quality=qualidade, method=4)
+            os.replace(temporario, os.path.join(pasta, destino))
+            geradas[nome] = destino
+    return geradas
+
+
+class ImageVariantService:
+    """
+    Miniaturas e versões WebP das fotos enviadas.
+
+    Depois do upload, a geração vai para um pool de processos (não ocupa a
+    requisição nem o GIL); quando termina, as URLs das variantes são gravadas em
+    Pet.photo_variants / Concurso.imagem_variants, desde que a foto não tenha
+    mudado nesse meio tempo. Sem Pillow (ou com IMAGE_VARIANT_WORKERS=0) nada é
+    gerado e as páginas usam a foto original.
+    """
+
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers if workers is not None else int(
+            os.environ.get('IMAGE_VARIANT_WORKERS', self.DEFAULT_WORKERS)
+        )
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pendentes = 0
+        self.geradas = 0
+        self.erros = 0
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None and self.workers > 0
+
+    def start(self) -> None:
+        """Cria o pool na inicialização do processo (se a geração estiver ligada)"""
+        if self.enabled:
+            self._pool()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Os processos do pool partem de um interpretador limpo, e não de um fork do servidor
+                # (com threads, locks e conexões de banco abertas)
+                metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(metodo)
+                )
+            return self._executor
+
+    def _submit(self, pasta: str, url: str, ao_concluir) -> bool:
+        if not self.enabled or not url or not url.startswith('/uploads/'):
+            return False
+        filename = url[len('/uploads/'):]
+        existentes = {nome: variant_filename(filename, nome) for nome in VARIANTES}
+        if all(os.path.exists(os.path.join(pasta, arquivo)) for arquivo in existentes.values()):
+            # Mesmo conteúdo de um upload anterior: as variantes já existem
+            ao_concluir(url, {nome: f"/uploads/{arquivo}" for nome, arquivo in existentes.items()})
+            return True
+        with self._lock:
+            self.pendentes += 1
+        future = self._pool().submit(render_variants, pasta, filename)
+
+        def concluir(future):
+            with self._lock:
+                self.pendentes -= 1
+            try:
+                geradas = future.result()
+                ao_concluir(url, {nome: f"/uploads/{arquivo}" for nome, arquivo in geradas.items()})
+                with self._lock:
+                    self.geradas += 1
+            except Exception as e:
+                with self._lock:
+                    self.erros += 1
+                print(f"[IMAGENS] Erro ao gerar variantes de {filename}: {e}")
+
+        future.add_done_callback(concluir)
+        return True
+
+    def schedule_pet(self, pasta: str, pet_id: int, photo_url: str) -> bool:
+        """Agenda as variantes da foto do pet. Returns: False se a geração estiver desligada"""
+        return self._submit(pasta, photo_url, lambda url, variantes: self.record_pet(pet_id, url, variantes))
+
+    def schedule_concurso(self, pasta: str, concurso_id: int, imagem_url: str) -> bool:
+        """Agenda as variantes de uma foto do concurso. Returns: False se a geração estiver desligada"""
+        return self._submit(pasta, imagem_url, lambda url, variantes: self.record_concurso(concurso_id, url, variantes))
+
+    def record_pet(self, pet_id: int, photo_url: str, variantes: Dict[str, str]) -> bool:
+        """Grava as URLs das variantes se o pet ainda tiver a mesma foto. Returns: True se gravou"""
+        return self._record(Pet, Pet.photo_url, Pet.photo_variants, pet_id, photo_url, variantes)
+
+    def record_concurso(self, concurso_id: int, imagem_url: str, variantes: Dict[str, str]) -> bool:
+        """Mesmo que record_pet para uma foto do concurso (e atualiza o ranking em memória)"""
+        gravou = self._record(Concurso, Concurso.imagem_url, Concurso.imagem_variants, concurso_id, imagem_url, variantes)
+        if gravou:
+            leaderboard.set_variants(concurso_id, variantes)
+        return gravou
+
+    def _record(self, modelo, coluna_url, coluna_variantes, id_: int, url: str, variantes: Dict[str, str]) -> bool:
+        db = SessionLocal()
+        try:
+            resultado = db.execute(
+                update(modelo).where(modelo.id == id_, coluna_url == url)
+                .values({coluna_variantes: json.dumps(variantes)})
+            )
+            db.commit()
+            return resultado.rowcount > 0
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'habilitado': self.enabled,
+                'pendentes': self.pendentes,
+                'geradas': self.geradas,
+                'erros': self.erros,
+            }
+
+
+image_variants = ImageVariantService()
+atexit.register(image_variants.shutdown)
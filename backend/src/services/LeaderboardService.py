@@ -0,0 +1,153 @@
+import bisect
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, raiseload
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Concurso import Concurso
+from models.Pet import Pet
+from models.User import User
+from services.VoteCounterService import vote_counter
+
+
+class LeaderboardService:
+    """
+    Ranking do concurso mantido em memória.
+
+    As fotos ficam numa lista ordenada por (votos desc, data_envio desc, id desc),
+    mantida com bisect a cada voto, envio ou remoção. Uma página top-N custa
+    O(log n + k) e não consulta o banco. O ranking é montado a partir da tabela
+    concursos na primeira leitura (e depois de invalidate()).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: List[Tuple] = []  # chaves de ordenação, sempre ordenadas
+        self._entries: Dict[int, Dict] = {}  # concurso_id -> dados da foto
+        self._loaded = False
+
+    @staticmethod
+    def _key(entry: Dict) -> Tuple:
+        envio = entry['_data_envio']
+        return (-(entry['votos'] or 0), -(envio.timestamp() if envio else 0), -entry['id'])
+
+    @staticmethod
+    def _entry(concurso: Concurso, pet_name: Optional[str], user_name: Optional[str],
+               user_email: Optional[str]) -> Dict:
+        """Mesmos campos de Concurso.to_dict(), sem carregar pet e user"""
+        return {
+            'id': concurso.id,
+            'pet_id': concurso.pet_id,
+            'user_id': concurso.user_id,
+            'imagem_url': concurso.imagem_url,
+            'imagem_variants': json.loads(concurso.imagem_variants) if concurso.imagem_variants else {},
+            'descricao': concurso.descricao,
+            'votos': concurso.votos or 0,
+            'data_envio': concurso.data_envio.isoformat() if concurso.data_envio else None,
+            'pet_name': pet_name,
+            'user_name': user_name,
+            'user_email': user_email,
+            '_data_envio': concurso.data_envio,
+        }
+
+    def rebuild(self, db: Session) -> int:
+        """Remonta o ranking a partir da tabela (uma consulta). Returns: número de fotos"""
+        linhas = db.query(Concurso, Pet.name, User.name, User.email).options(
+            raiseload(Concurso.pet), raiseload(Concurso.user)
+        ).outerjoin(Pet, Concurso.pet_id == Pet.id).outerjoin(User, Concurso.user_id == User.id).all()
+
+        pendentes = vote_counter.pending()
+        entries = {}
+        for concurso, pet_name, user_name, user_email in linhas:
+            entry = self._entry(concurso, pet_name, user_name, user_email)
+            # Votos registrados mas ainda não gravados pelo contador write-behind
+            entry['votos'] += pendentes.get(concurso.id, 0)
+            entries[concurso.id] = entry
+
+        with self._lock:
+            self._entries = entries
+            self._keys = sorted(self._key(entry) for entry in entries.values())
+            self._loaded = True
+        print(f"[RANKING] Ranking do concurso montado: {len(entries)} foto(s)")
+        return len(entries)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._entries = {}
+            self._keys = []
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild(db)
+
+    def page(self, db: Session, limit: Optional[int] = None, offset: int = 0,
+             after: Optional[Tuple] = None) -> Tuple[List[Dict], int, Optional[Tuple]]:
+        """
+        Fotos do ranking a partir da posição 'offset' ou, com 'after', logo depois dessa
+        chave de ordenação (paginação por cursor, O(log n)). limit=None: até o fim.
+        Returns: (fotos, total de fotos no concurso, chave da última foto se houver mais)
+        """
+        self._ensure_loaded(db)
+        with self._lock:
+            inicio = offset if after is None else bisect.bisect_right(self._keys, tuple(after))
+            fim = len(self._keys) if limit is None else min(inicio + limit, len(self._keys))
+            keys = self._keys[inicio:fim]
+            fotos = [
+                {k: v for k, v in self._entries[-key[2]].items() if not k.startswith('_')}
+                for key in keys
+            ]
+            proxima = keys[-1] if keys and fim < len(self._keys) else None
+            return fotos, len(self._keys), proxima
+
+    def add(self, concurso: Concurso, pet_name: Optional[str], user_name: Optional[str],
+            user_email: Optional[str]) -> None:
+        """Inclui uma foto recém-enviada"""
+        with self._lock:
+            if not self._loaded:
+                return  # entra no ranking na próxima montagem
+            self.remove(concurso.id)
+            entry = self._entry(concurso, pet_name, user_name, user_email)
+            self._entries[concurso.id] = entry
+            bisect.insort(self._keys, self._key(entry))
+
+    def remove(self, concurso_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(concurso_id, None)
+            if entry is None:
+                return
+            posicao = bisect.bisect_left(self._keys, self._key(entry))
+            del self._keys[posicao]
+
+    def increment(self, concurso_id: int, n: int = 1) -> None:
+        """Move a foto no ranking depois de n votos"""
+        with self._lock:
+            entry = self._entries.get(concurso_id)
+            if entry is None:
+                return
+            posicao = bisect.bisect_left(self._keys, self._key(entry))
+            del self._keys[posicao]
+            entry['votos'] += n
+            bisect.insort(self._keys, self._key(entry))
+
+    def set_variants(self, concurso_id: int, variantes: Dict[str, str]) -> None:
+        """URLs das variantes geradas depois do envio (não muda a ordem)"""
+        with self._lock:
+            entry = self._entries.get(concurso_id)
+            if entry is not None:
+                entry['imagem_variants'] = dict(variantes)
+
+    def rename_pet(self, pet_id: int, pet_name: str) -> None:
+        """Atualiza o nome exibido nas fotos de um pet (não muda a ordem)"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry['pet_id'] == pet_id:
+                    entry['pet_name'] = pet_name
+
+
+leaderboard = LeaderboardService()
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Pet import Pet
+from models.Servico import Servico
+from services.ServicoArchiveService import servico_archive
+from config.database import SessionLocal
+
+
+class OverdueCleanupService:
+    """
+    Tira os agendamentos atrasados (data_agendada < hoje) da tabela servicos.
+
+    As linhas são movidas para servicos_archive em lotes (ver ServicoArchiveService),
+    filtradas pelos pets do dono com uma subconsulta quando for por usuário; nenhuma
+    linha é carregada na sessão. Roda como tarefa periódica do agendador, fora das
+    requisições do dashboard. O resumo de vacinação não muda: ele também lê o arquivo.
+    """
+
+    DEFAULT_JOB_INTERVAL = 3600  # segundos
+
+    def __init__(self, job_interval: Optional[float] = None):
+        self.job_interval = job_interval or float(
+            os.environ.get('OVERDUE_CLEANUP_INTERVAL', self.DEFAULT_JOB_INTERVAL)
+        )
+
+    def cleanup(self, db: Session, owner_id: Optional[int] = None, hoje: Optional[date] = None) -> int:
+        """
+        Arquiva os agendamentos atrasados dos pets de owner_id (ou de todos, se None), com commit por lote.
+        Returns: total arquivado
+        """
+        hoje = hoje or datetime.now().date()
+        filtros = [Servico.data_agendada < hoje]
+        if owner_id is not None:
+            filtros.append(Servico.pet_id.in_(select(Pet.id).where(Pet.owner_id == owner_id)))
+
+        total = servico_archive.archive(db, *filtros)
+        if total:
+            print(f"[LIMPEZA] {total} agendamento(s) atrasado(s) arquivado(s) (anteriores a {hoje})")
+        return total
+
+    def run_job(self) -> str:
+        """Tarefa periódica do agendador: arquiva os atrasados de todos os usuários com a própria sessão"""
+        db = SessionLocal()
+        try:
+            return f"{self.cleanup(db)} agendamento(s) atrasado(s) arquivado(s)"
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+overdue_cleanup = OverdueCleanupService()
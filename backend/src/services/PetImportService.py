@@ -0,0 +1,171 @@
+import codecs
+import csv
+from datetime import datetime
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Pet import Pet
+
+
+class PetImportService:
+    """
+    Importação de pets em lote (CSV ou NDJSON).
+
+    As linhas são lidas e validadas numa única passada e os pets válidos são
+    inseridos com INSERT em lote (executemany), um commit a cada BATCH_SIZE
+    linhas. Todos os pets ficam com o usuário que importa. O resultado traz um
+    relatório de erros por linha.
+    """
+
+    FORMATOS = ('csv', 'ndjson')
+    BATCH_SIZE = 1000
+    MAX_ROWS = 100_000
+    MAX_ERRORS_REPORTED = 500
+
+    # Nomes aceitos para cada campo (os mesmos do cadastro individual, em português, ou em inglês)
+    CAMPOS = {
+        'nome': 'name', 'name': 'name',
+        'raca': 'breed', 'breed': 'breed',
+        'birth_date': 'birth_date', 'data_nascimento': 'birth_date',
+        'especie': 'type', 'type': 'type',
+        'behavior_tags': 'behavior_tags', 'tags': 'behavior_tags',
+        'owner_email': 'owner_email', 'user_email': 'owner_email',
+    }
+
+    def detect_format(self, content_type: Optional[str], filename: Optional[str]) -> Optional[str]:
+        """Formato pelo nome do arquivo (.csv, .ndjson/.jsonl) ou pelo Content-Type"""
+        extensao = os.path.splitext(filename or '')[1].lower()
+        if extensao == '.csv':
+            return 'csv'
+        if extensao in ('.ndjson', '.jsonl'):
+            return 'ndjson'
+        content_type = (content_type or '').lower()
+        if 'csv' in content_type:
+            return 'csv'
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'ndjson'
+        return None
+
+    def _rows(self, stream, formato: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+        """(número da linha, campos ou None, erro de leitura ou None) de cada registro do arquivo"""
+        texto = codecs.getreader('utf-8-sig')(stream)
+        if formato == 'csv':
+            leitor = csv.DictReader(texto)
+            for campos in leitor:
+                yield leitor.line_num, campos, None
+            return
+
+        for numero, linha in enumerate(texto, start=1):
+            if not linha.strip():
+                continue
+            try:
+                campos = json.loads(linha)
+            except ValueError:
+                yield numero, None, 'JSON inválido'
+                continue
+            if not isinstance(campos, dict):
+                yield numero, None, 'Cada linha deve ser um objeto JSON'
+                continue
+            yield numero, campos, None
+
+    def _validate(self, campos: Dict) -> Tuple[Optional[Dict], List[str]]:
+        """Normaliza os campos de uma linha. Returns: (pet, erros)"""
+        pet = {}
+        for chave, valor in campos.items():
+            destino = self.CAMPOS.get((chave or '').strip().lower())
+            if destino and valor not in (None, ''):
+                pet[destino] = valor.strip() if isinstance(valor, str) else valor
+
+        erros = []
+        for campo, nome in (('name', 'nome'), ('breed', 'raca'), ('birth_date', 'birth_date')):
+            if not pet.get(campo):
+                erros.append(f'{nome} é obrigatório')
+
+        if pet.get('birth_date'):
+            try:
+                pet['birth_date'] = datetime.strptime(str(pet['birth_date']), '%Y-%m-%d')
+                if pet['birth_date'] > datetime.now():
+                    erros.append('birth_date no futuro')
+            except ValueError:
+                erros.append('birth_date inválida (use YYYY-MM-DD)')
+
+        tags = pet.get('behavior_tags', [])
+        if isinstance(tags, str):
+            # CSV: lista JSON ou tags separadas por ';'
+            try:
+                tags = json.loads(tags) if tags.startswith('[') else [t.strip() for t in tags.split(';') if t.strip()]
+            except ValueError:
+                tags = None
+        if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+            erros.append('behavior_tags deve ser uma lista de textos')
+        else:
+            pet['behavior_tags'] = tags
+
+        return (None if erros else pet), erros
+
+    def import_pets(self, db: Session, stream, formato: str, owner_id: int, owner_email: str) -> Dict:
+        """
+        Importa os pets de um arquivo CSV ou NDJSON para o usuário owner_id.
+        Linhas com owner_email diferente do email desse usuário são rejeitadas.
+        Returns: relatório {importados, rejeitados, erros: [{linha, erros}], erros_omitidos}
+        """
+        inicio = datetime.now()
+        erros: List[Dict] = []
+        linhas = []
+        rejeitados = 0
+        agora = datetime.now()
+
+        for numero, campos, erro in self._rows(stream, formato):
+            if len(linhas) + rejeitados >= self.MAX_ROWS:
+                erros.append({'linha': numero, 'erros': [f'Limite de {self.MAX_ROWS} linhas por importação']})
+                break
+            problemas = [erro] if erro else None
+            if not problemas:
+                pet, problemas = self._validate(campos)
+            if not problemas and pet.get('owner_email') and str(pet['owner_email']).lower() != owner_email.lower():
+                problemas = ['owner_email deve ser o do usuário que faz a importação']
+            if problemas:
+                erros.append({'linha': numero, 'erros': problemas})
+                rejeitados += 1
+                continue
+            linhas.append({
+                'name': str(pet['name']),
+                'breed': str(pet['breed']),
+                'birth_date': pet['birth_date'],
+                'type': str(pet['type']) if pet.get('type') else None,
+                'owner_id': owner_id,
+                'behavior_tags': json.dumps(pet['behavior_tags']),
+                'created_at': agora,
+                'updated_at': agora,
+            })
+
+        importados = 0
+        for inicio_lote in range(0, len(linhas), self.BATCH_SIZE):
+            lote = linhas[inicio_lote:inicio_lote + self.BATCH_SIZE]
+            try:
+                db.execute(insert(Pet.__table__), lote)
+                db.commit()
+                importados += len(lote)
+            except Exception as e:
+                db.rollback()
+                rejeitados += len(lote)
+                print(f"[IMPORTACAO] Erro ao gravar lote de {len(lote)} pet(s): {e}")
+                erros.append({'linha': None, 'erros': [f'Falha ao gravar {len(lote)} pet(s) do lote {inicio_lote // self.BATCH_SIZE + 1}']})
+
+        erros.sort(key=lambda erro: erro['linha'] or 0)
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"[IMPORTACAO] {importados} pet(s) importado(s), {rejeitados} linha(s) rejeitada(s) em {duracao:.2f}s")
+        return {
+            'importados': importados,
+            'rejeitados': rejeitados,
+            'erros': erros[:self.MAX_ERRORS_REPORTED],
+            'erros_omitidos': max(len(erros) - self.MAX_ERRORS_REPORTED, 0)
+        }
+
+
+pet_import_service = PetImportService()
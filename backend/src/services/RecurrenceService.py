@@ -0,0 +1,207 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Servico import Servico
+from models.AgendamentoRecorrente import AgendamentoRecorrente
+from services.VaccinationService import vaccination_service
+from config.database import SessionLocal
+
+
+class RecurrenceService:
+    """
+    Agendamentos recorrentes (banho a cada 15 dias, consulta a cada 6 meses...).
+
+    A série é guardada como regra em agendamentos_recorrentes; as ocorrências são
+    linhas comuns de servicos (com recorrencia_id) geradas só até HORIZON_DAYS à
+    frente, todas as regras num único INSERT em lote. A tarefa periódica
+    extend_all() estende o horizonte; alterações na série viram UPDATE/DELETE
+    por recorrencia_id, sem carregar as ocorrências.
+    """
+
+    DEFAULT_HORIZON_DAYS = 90
+    DEFAULT_JOB_INTERVAL = 6 * 3600  # segundos
+    # Campos copiados da regra para as ocorrências futuras quando a clínica muda
+    CAMPOS_CLINICA = ('clinica_id', 'preco', 'clinica', 'veterinario')
+
+    def __init__(self, horizon_days: Optional[int] = None, job_interval: Optional[float] = None):
+        self.horizon_days = horizon_days or int(
+            os.environ.get('RECURRENCE_HORIZON_DAYS', self.DEFAULT_HORIZON_DAYS)
+        )
+        self.job_interval = job_interval or float(
+            os.environ.get('RECURRENCE_JOB_INTERVAL', self.DEFAULT_JOB_INTERVAL)
+        )
+
+    @staticmethod
+    def occurrence_date(regra: AgendamentoRecorrente, passo: int) -> date:
+        """Data da ocorrência 'passo' contada a partir da âncora (data_inicio) da regra"""
+        if regra.unidade == 'meses':
+            # Sempre a partir da âncora: 31/01 -> 28/02 -> 31/03, sem acumular o ajuste de fim de mês
+            return regra.data_inicio + relativedelta(months=passo * regra.intervalo)
+        dias = regra.intervalo * (7 if regra.unidade == 'semanas' else 1)
+        return regra.data_inicio + timedelta(days=passo * dias)
+
+    def first_step_from(self, regra: AgendamentoRecorrente, data: date) -> int:
+        """Primeiro passo da série cuja data é >= 'data'"""
+        if data <= regra.data_inicio:
+            return 0
+        if regra.unidade == 'meses':
+            passo = max(((data.year - regra.data_inicio.year) * 12 + data.month - regra.data_inicio.month)
+                        // regra.intervalo - 1, 0)
+        else:
+            dias = regra.intervalo * (7 if regra.unidade == 'semanas' else 1)
+            passo = (data - regra.data_inicio).days // dias
+        while self.occurrence_date(regra, passo) < data:
+            passo += 1
+        return passo
+
+    def horizon(self, hoje: Optional[date] = None) -> date:
+        return (hoje or datetime.now().date()) + timedelta(days=self.horizon_days)
+
+    def generate(self, db: Session, regras: Iterable[AgendamentoRecorrente], ate: Optional[date] = None) -> int:
+        """
+        Gera as ocorrências que faltam até a data 'ate' (padrão: o horizonte) para as regras
+        informadas, num único INSERT em lote. Não faz commit; se outra transação alterou
+        a mesma regra nesse meio tempo, o commit falha (versao) e nada é gravado.
+        Returns: número de ocorrências criadas
+        """
+        ate = ate or self.horizon()
+        linhas: List[Dict] = []
+        pets_vacinacao = set()
+        for regra in regras:
+            if not regra.ativo:
+                continue
+            while regra.max_ocorrencias is None or regra.ocorrencias_geradas < regra.max_ocorrencias:
+                data = self.occurrence_date(regra, regra.passos_gerados)
+                if data > ate:
+                    break
+                if regra.data_fim is not None and data > regra.data_fim:
+                    regra.ativo = False  # série encerrada
+                    break
+                linhas.append({
+                    'pet_id': regra.pet_id,
+                    'clinica_id': regra.clinica_id,
+                    'tipo': regra.tipo,
+                    'data_agendada': data,
+                    'preco': regra.preco,
+                    'clinica': regra.clinica,
+                    'veterinario': regra.veterinario,
+                    'recorrencia_id': regra.id,
+                })
+                regra.passos_gerados += 1
+                regra.ocorrencias_geradas += 1
+                regra.gerado_ate = data
+            else:
+                regra.ativo = False  # todas as ocorrências da série já foram geradas
+
+            if regra.tipo == 'vacinacao':
+                pets_vacinacao.add(regra.pet_id)
+
+        if linhas:
+            db.execute(insert(Servico.__table__), linhas)
+        if pets_vacinacao and linhas:
+            vaccination_service.refresh(db, pets_vacinacao)
+        return len(linhas)
+
+    def create(self, db: Session, **campos) -> AgendamentoRecorrente:
+        """Cria a regra e gera as ocorrências do horizonte. Não faz commit."""
+        regra = AgendamentoRecorrente(ocorrencias_geradas=0, ativo=True, **campos)
+        # Início no passado: a série começa na primeira data a partir de hoje
+        regra.passos_gerados = self.first_step_from(regra, datetime.now().date())
+        db.add(regra)
+        db.flush()  # id da regra para as ocorrências
+        self.generate(db, [regra])
+        return regra
+
+    def _future_occurrences(self, db: Session, regra: AgendamentoRecorrente, a_partir_de: date):
+        return db.query(Servico).filter(
+            Servico.recorrencia_id == regra.id,
+            Servico.data_agendada >= a_partir_de
+        )
+
+    def update_series(self, db: Session, regra: AgendamentoRecorrente, mudancas: Dict,
+                      a_partir_de: Optional[date] = None) -> Dict:
+        """
+        Aplica mudanças à série a partir de 'a_partir_de' (padrão: hoje). Não faz commit.
+        - clínica (clinica_id, preco, clinica, veterinario): um UPDATE nas ocorrências futuras;
+        - agenda (intervalo, unidade, data_inicio, data_fim, max_ocorrencias): um DELETE nas
+          ocorrências futuras e nova geração a partir da nova âncora.
+        Returns: {'atualizadas': n, 'removidas': n, 'criadas': n}
+        """
+        a_partir_de = a_partir_de or datetime.now().date()
+        resultado = {'atualizadas': 0, 'removidas': 0, 'criadas': 0}
+
+        clinica = {campo: mudancas[campo] for campo in self.CAMPOS_CLINICA if campo in mudancas}
+        if clinica:
+            for campo, valor in clinica.items():
+                setattr(regra, campo, valor)
+            resultado['atualizadas'] = self._future_occurrences(db, regra, a_partir_de).update(
+                clinica, synchronize_session=False
+            )
+
+        agenda = {campo: mudancas[campo] for campo in ('intervalo', 'unidade', 'data_inicio', 'data_fim', 'max_ocorrencias')
+                  if campo in mudancas}
+        if agenda:
+            # Próxima data da série atual: continua sendo a âncora se a data de início não mudar
+            proxima = self.occurrence_date(regra, self.first_step_from(regra, a_partir_de))
+            removidas = self._future_occurrences(db, regra, a_partir_de).delete(synchronize_session=False)
+            for campo, valor in agenda.items():
+                setattr(regra, campo, valor)
+            if 'data_inicio' not in agenda:
+                regra.data_inicio = proxima
+            regra.passos_gerados = self.first_step_from(regra, a_partir_de)
+            regra.ocorrencias_geradas -= removidas
+            regra.gerado_ate = None
+            regra.ativo = True
+            resultado['removidas'] = removidas
+            resultado['criadas'] = self.generate(db, [regra])
+            if regra.tipo == 'vacinacao' and not resultado['criadas']:
+                vaccination_service.refresh(db, [regra.pet_id])
+
+        print(f"[RECORRENCIA] Série {regra.id} alterada a partir de {a_partir_de}: {resultado}")
+        return resultado
+
+    def cancel(self, db: Session, regra: AgendamentoRecorrente, a_partir_de: Optional[date] = None) -> int:
+        """Encerra a série: remove as ocorrências futuras (um DELETE). Não faz commit. Returns: removidas"""
+        a_partir_de = a_partir_de or datetime.now().date()
+        removidas = self._future_occurrences(db, regra, a_partir_de).delete(synchronize_session=False)
+        regra.ativo = False
+        regra.data_fim = a_partir_de - timedelta(days=1)
+        regra.ocorrencias_geradas -= removidas
+        if regra.tipo == 'vacinacao':
+            vaccination_service.refresh(db, [regra.pet_id])
+        return removidas
+
+    def extend_all(self, db: Session, hoje: Optional[date] = None) -> int:
+        """
+        Estende todas as séries ativas até o horizonte (uma consulta + um INSERT em lote).
+        Returns: número de ocorrências criadas
+        """
+        ate = self.horizon(hoje)
+        regras = db.query(AgendamentoRecorrente).filter(
+            AgendamentoRecorrente.ativo.is_(True),
+            or_(AgendamentoRecorrente.gerado_ate.is_(None), AgendamentoRecorrente.gerado_ate < ate)
+        ).all()
+        criadas = self.generate(db, regras, ate=ate)
+        db.commit()
+        return criadas
+
+    def run_job(self) -> str:
+        """Tarefa periódica do agendador: estende as séries com a própria sessão"""
+        db = SessionLocal()
+        try:
+            criadas = self.extend_all(db)
+            return f"{criadas} ocorrência(s) recorrente(s) gerada(s)"
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+recurrence_service = RecurrenceService()
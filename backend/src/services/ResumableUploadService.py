@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta
+import secrets
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import UnsupportedMediaType
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.UploadSessao import UploadSessao
+from config.uploads import ImageSpool, TAMANHO_CABECALHO, sniff_image
+from config.database import SessionLocal
+
+
+class ResumableUploadService:
+    """
+    Uploads de foto retomáveis, para conexões que caem no meio do envio.
+
+    O cliente abre uma sessão com o tamanho do arquivo, envia os blocos numerados
+    (em qualquer ordem, repetindo os que falharam), consulta quais faixas já chegaram
+    e conclui. Cada bloco é gravado num temporário e renomeado para
+    uploads/.tmp/sessoes/<id>/<n>.part, então um bloco interrompido nunca conta como
+    recebido e blocos simultâneos não disputam a mesma linha no banco. Na conclusão
+    os blocos são juntados num ImageSpool (mesma validação do upload direto) e o
+    arquivo segue para o armazenamento pelo conteúdo. Sessões abandonadas são
+    apagadas pela tarefa periódica depois de UPLOAD_SESSION_TTL segundos.
+    """
+
+    DESTINOS = ('pet', 'concurso')
+    DEFAULT_CHUNK_SIZE = 1024 * 1024
+    DEFAULT_TTL = 24 * 3600  # segundos
+    DEFAULT_JOB_INTERVAL = 3600  # segundos
+    COPY_SIZE = 64 * 1024
+
+    def __init__(self, tamanho_bloco: Optional[int] = None, ttl: Optional[float] = None,
+                 job_interval: Optional[float] = None):
+        self.tamanho_bloco = tamanho_bloco or int(os.environ.get('UPLOAD_CHUNK_SIZE', self.DEFAULT_CHUNK_SIZE))
+        self.ttl = ttl or float(os.environ.get('UPLOAD_SESSION_TTL', self.DEFAULT_TTL))
+        self.job_interval = job_interval or float(
+            os.environ.get('UPLOAD_CLEANUP_INTERVAL', self.DEFAULT_JOB_INTERVAL)
+        )
+
+    @staticmethod
+    def _pasta_sessoes(pasta: str) -> str:
+        return os.path.join(pasta, '.tmp', 'sessoes')
+
+    def _pasta_sessao(self, pasta: str, sessao: UploadSessao) -> str:
+        return os.path.join(self._pasta_sessoes(pasta), sessao.id)
+
+    def create(self, db: Session, destino: str, pet_id: int, tamanho: int,
+               user_id: Optional[int] = None, descricao: Optional[str] = None) -> UploadSessao:
+        """Abre uma sessão de upload. Não faz commit."""
+        if destino not in self.DESTINOS:
+            raise ValueError("Destino inválido. Use 'pet' ou 'concurso'.")
+        if tamanho <= 0:
+            raise ValueError('Tamanho do arquivo inválido.')
+        sessao = UploadSessao(
+            id=secrets.token_urlsafe(24),
+            destino=destino,
+            pet_id=pet_id,
+            user_id=user_id,
+            descricao=descricao,
+            tamanho=tamanho,
+            tamanho_bloco=self.tamanho_bloco,
+        )
+        db.add(sessao)
+        return sessao
+
+    def chunk_length(self, sessao: UploadSessao, indice: int) -> int:
+        """Quantos bytes o bloco 'indice' tem (o último pode ser menor)"""
+        if not 0 <= indice < sessao.total_blocos:
+            raise ValueError(f'Bloco {indice} fora do intervalo 0..{sessao.total_blocos - 1}.')
+        return min(sessao.tamanho_bloco, sessao.tamanho - indice * sessao.tamanho_bloco)
+
+    def write_chunk(self, pasta: str, sessao: UploadSessao, indice: int, stream) -> None:
+        """
+        Grava o bloco 'indice' lido de 'stream' (substitui um envio anterior do mesmo bloco).
+        Levanta ValueError se o tamanho não for o esperado e UnsupportedMediaType se o
+        primeiro bloco não começar como uma imagem aceita.
+        """
+        esperado = self.chunk_length(sessao, indice)
+        destino = self._pasta_sessao(pasta, sessao)
+        os.makedirs(destino, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=destino, suffix='.tmp')
+        try:
+            recebido = 0
+            with os.fdopen(fd, 'wb') as arquivo:
+                while True:
+                    bloco = stream.read(self.COPY_SIZE)
+                    if not bloco:
+                        break
+                    recebido += len(bloco)
+                    if recebido > esperado:
+                        break
+                    arquivo.write(bloco)
+            if recebido != esperado:
+                raise ValueError(f'O bloco {indice} deve ter {esperado} bytes.')
+            if indice == 0:
+                # O tipo é conferido já no primeiro bloco, antes de o resto do arquivo ser enviado
+                with open(temporario, 'rb') as arquivo:
+                    if sniff_image(arquivo.read(TAMANHO_CABECALHO)) is None:
+                        raise UnsupportedMediaType('Arquivo não é uma imagem PNG, JPG, GIF ou WEBP.')
+            os.replace(temporario, os.path.join(destino, f'{indice}.part'))
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    def received(self, pasta: str, sessao: UploadSessao) -> List[int]:
+        """Índices dos blocos já recebidos, em ordem"""
+        try:
+            nomes = os.listdir(self._pasta_sessao(pasta, sessao))
+        except FileNotFoundError:
+            return []
+        return sorted(int(nome[:-len('.part')]) for nome in nomes if nome.endswith('.part'))
+
+    def status(self, pasta: str, sessao: UploadSessao) -> Dict:
+        """Sessão com as faixas de bytes recebidas ([início, fim), contíguas) e os blocos que faltam"""
+        recebidos = self.received(pasta, sessao)
+        faixas = []
+        for indice in recebidos:
+            inicio = indice * sessao.tamanho_bloco
+            fim = inicio + self.chunk_length(sessao, indice)
+            if faixas and faixas[-1][1] == inicio:
+                faixas[-1][1] = fim
+            else:
+                faixas.append([inicio, fim])
+        faltando = sorted(set(range(sessao.total_blocos)) - set(recebidos))
+        return {
+            **sessao.to_dict(),
+            'recebidos': faixas,
+            'bytes_recebidos': sum(fim - inicio for inicio, fim in faixas),
+            'faltando': faltando,
+            'completo': not faltando,
+        }
+
+    def assemble(self, pasta: str, sessao: UploadSessao, limite: Optional[int] = None) -> ImageSpool:
+        """
+        Junta os blocos num ImageSpool pronto para upload_storage.store().
+        Levanta ValueError se faltar algum bloco (e as exceções de validação do ImageSpool).
+        """
+        if len(self.received(pasta, sessao)) != sessao.total_blocos:
+            raise ValueError('Ainda faltam blocos deste upload.')
+        spool = ImageSpool(pasta, limite)
+        try:
+            for indice in range(sessao.total_blocos):
+                with open(os.path.join(self._pasta_sessao(pasta, sessao), f'{indice}.part'), 'rb') as parte:
+                    shutil.copyfileobj(parte, spool, self.COPY_SIZE)
+            return spool.finish()
+        except BaseException:
+            spool.close()
+            raise
+
+    def discard(self, db: Session, pasta: str, sessao: UploadSessao) -> None:
+        """Apaga a sessão e os blocos. Não faz commit."""
+        shutil.rmtree(self._pasta_sessao(pasta, sessao), ignore_errors=True)
+        db.delete(sessao)
+
+    def expire(self, db: Session, pasta: str, agora: Optional[datetime] = None) -> int:
+        """
+        Apaga as sessões abertas há mais de ttl segundos e as pastas de blocos sem sessão, com commit.
+        Returns: quantas sessões foram apagadas
+        """
+        limite = (agora or datetime.now()) - timedelta(seconds=self.ttl)
+        vencidas = db.query(UploadSessao).filter(UploadSessao.criado_em < limite).all()
+        for sessao in vencidas:
+            self.discard(db, pasta, sessao)
+        db.commit()
+
+        # Pastas que ficaram para trás (a pasta só é criada depois da sessão existir)
+        sessoes = self._pasta_sessoes(pasta)
+        if os.path.isdir(sessoes):
+            pastas = os.listdir(sessoes)  # antes da consulta: uma sessão nova não some no meio
+            ativas = {id_ for (id_,) in db.query(UploadSessao.id)}
+            for nome in pastas:
+                if nome not in ativas:
+                    shutil.rmtree(os.path.join(sessoes, nome), ignore_errors=True)
+        if vencidas:
+            print(f"[UPLOADS] {len(vencidas)} upload(s) retomável(is) abandonado(s) apagado(s)")
+        return len(vencidas)
+
+    def run_job(self, pasta: str) -> str:
+        """Tarefa periódica do agendador: apaga as sessões vencidas com a própria sessão do banco"""
+        db = SessionLocal()
+        try:
+            return f"{self.expire(db, pasta)} upload(s) retomável(is) expirado(s)"
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+resumable_uploads = ResumableUploadService()
@@ -0,0 +1,113 @@
+import atexit
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class SchedulerService:
+    """
+    Agendador de tarefas periódicas dentro do processo.
+
+    Cada tarefa roda a cada 'intervalo' segundos numa única thread em segundo
+    plano (uma tarefa por vez); erros são registrados no log e não param o
+    agendador. As tarefas abrem a própria sessão de banco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def every(self, intervalo: float, nome: str, tarefa: Callable[[], object], imediata: bool = False) -> None:
+        """Registra (ou substitui) a tarefa 'nome' para rodar a cada 'intervalo' segundos"""
+        with self._lock:
+            self._jobs[nome] = {
+                'intervalo': float(intervalo),
+                'tarefa': tarefa,
+                'proxima': time.monotonic() + (0 if imediata else float(intervalo)),
+                'execucoes': 0,
+                'erros': 0,
+                'ultima_execucao': None,
+            }
+        self._wake.set()
+
+    def run_job(self, nome: str):
+        """Executa a tarefa agora (e reagenda a próxima execução a partir de agora)"""
+        with self._lock:
+            job = self._jobs[nome]
+            job['proxima'] = time.monotonic() + job['intervalo']
+
+        inicio = time.perf_counter()
+        try:
+            resultado = job['tarefa']()
+        except Exception as e:
+            job['erros'] += 1
+            print(f"[AGENDADOR] Erro na tarefa {nome}: {e}")
+            return None
+        finally:
+            job['execucoes'] += 1
+            job['ultima_execucao'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+        print(f"[AGENDADOR] Tarefa {nome} concluída em {(time.perf_counter() - inicio) * 1000:.0f} ms: {resultado}")
+        return resultado
+
+    def run_pending(self) -> List[str]:
+        """Executa as tarefas vencidas. Returns: nomes das tarefas executadas"""
+        agora = time.monotonic()
+        with self._lock:
+            vencidas = [nome for nome, job in self._jobs.items() if job['proxima'] <= agora]
+        for nome in vencidas:
+            self.run_job(nome)
+        return vencidas
+
+    def _seconds_until_next(self) -> float:
+        with self._lock:
+            if not self._jobs:
+                return 60.0
+            return max(min(job['proxima'] for job in self._jobs.values()) - time.monotonic(), 0.0)
+
+    def start(self) -> None:
+        """Inicia a thread do agendador (uma vez por processo)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='scheduler', daemon=True)
+            self._thread.start()
+        print(f"[AGENDADOR] Iniciado com {len(self._jobs)} tarefa(s): {', '.join(self._jobs)}")
+
+    def run(self) -> None:
+        """Roda o agendador na thread atual até stop() (processo dedicado às tarefas)"""
+        while not self._stop.is_set():
+            self._wake.wait(self._seconds_until_next())
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.run_pending()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                nome: {
+                    'intervalo_segundos': job['intervalo'],
+                    'proxima_em_segundos': round(max(job['proxima'] - agora, 0), 1),
+                    'execucoes': job['execucoes'],
+                    'erros': job['erros'],
+                    'ultima_execucao': job['ultima_execucao'],
+                }
+                for nome, job in self._jobs.items()
+            }
+
+
+scheduler = SchedulerService()
+atexit.register(scheduler.stop)
@@ -0,0 +1,119 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import DateTime, delete, false, insert, literal, select, true, union_all
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Servico import Servico
+from models.ServicoArquivado import ServicoArquivado
+from services.ClinicCatalogService import clinic_catalog
+
+
+class ServicoArchiveService:
+    """
+    Arquivo dos serviços passados.
+
+    Em vez de apagar os serviços passados, eles são movidos para servicos_archive
+    (mesmo id) em lotes: um SELECT dos ids do lote, um INSERT ... SELECT e um DELETE
+    pelos mesmos ids. A tabela servicos fica só com o que ainda vai acontecer, e o
+    histórico continua disponível para as rotas de histórico, o veterinário principal,
+    os gastos do mês e o resumo de vacinação.
+    """
+
+    BATCH_SIZE = 900
+    IDS_POR_COMANDO = 900  # ids ligados por IN (...): abaixo do limite de 999 variáveis do SQLite antes da 3.32
+    COLUNAS = ('id', 'pet_id', 'clinica_id', 'tipo', 'data_agendada', 'preco', 'clinica', 'veterinario', 'recorrencia_id')
+
+    def move(self, db: Session, *filtros, limit: Optional[int] = None) -> int:
+        """
+        Move para o arquivo as linhas de servicos que atendem aos filtros (até 'limit'). Não faz commit.
+        Returns: número de serviços arquivados
+        """
+        ids = db.execute(select(Servico.id).where(*filtros).limit(limit)).scalars().all()
+        if not ids:
+            return 0
+
+        origem = Servico.__table__
+        agora = datetime.now()
+        for inicio in range(0, len(ids), self.IDS_POR_COMANDO):
+            bloco = ids[inicio:inicio + self.IDS_POR_COMANDO]
+            db.execute(insert(ServicoArquivado.__table__).from_select(
+                [*self.COLUNAS, 'arquivado_em'],
+                select(*[origem.c[coluna] for coluna in self.COLUNAS], literal(agora, DateTime))
+                .where(origem.c.id.in_(bloco))
+            ))
+            db.execute(delete(origem).where(origem.c.id.in_(bloco)))
+        return len(ids)
+
+    def archive(self, db: Session, *filtros) -> int:
+        """
+        Move para o arquivo, em lotes de BATCH_SIZE com um commit por lote, os serviços que atendem aos filtros.
+        Returns: número de serviços arquivados
+        """
+        total = 0
+        while True:
+            movidos = self.move(db, *filtros, limit=self.BATCH_SIZE)
+            db.commit()
+            total += movidos
+            if movidos < self.BATCH_SIZE:
+                return total
+
+    def with_history(self, *colunas, filtros_servicos=(), filtros_arquivo=()):
+        """
+        UNION ALL das mesmas colunas (por nome) de servicos e servicos_archive, com uma coluna 'arquivado'.
+        Cada lado recebe os próprios filtros, para usar os índices de cada tabela.
+        Returns: subconsulta
+        """
+        return union_all(
+            select(*[getattr(Servico, coluna) for coluna in colunas], false().label('arquivado'))
+            .where(*filtros_servicos),
+            select(*[getattr(ServicoArquivado, coluna) for coluna in colunas], true().label('arquivado'))
+            .where(*filtros_arquivo),
+        ).subquery('historico')
+
+    def history_query(self, db: Session, pet_ids, hoje: Optional[date] = None):
+        """
+        Serviços passados dos pets (arquivados e os de servicos que ainda não foram arquivados).
+        'pet_ids' pode ser uma lista ou uma subconsulta de ids.
+        Returns: (query, subconsulta) para paginar pelas colunas (data_agendada, id) da subconsulta
+        """
+        hoje = hoje or datetime.now().date()
+        historico = self.with_history(
+            *self.COLUNAS,
+            filtros_servicos=(Servico.pet_id.in_(pet_ids), Servico.data_agendada < hoje),
+            filtros_arquivo=(ServicoArquivado.pet_id.in_(pet_ids),),
+        )
+        return db.query(historico), historico
+
+    def history_dict(self, db: Session, linha) -> Dict:
+        """Mesmo formato de Servico.to_dict, com o nome da clínica vindo do catálogo"""
+        clinica = clinic_catalog.get(db, linha.clinica_id) if linha.clinica_id else None
+        return {
+            'id': linha.id,
+            'pet_id': linha.pet_id,
+            'clinica_id': linha.clinica_id,
+            'tipo': linha.tipo,
+            'data_agendada': linha.data_agendada.isoformat() if linha.data_agendada else None,
+            'preco': linha.preco,
+            'clinica': clinica.nome if clinica else linha.clinica,
+            'veterinario': linha.veterinario,
+            'recorrencia_id': linha.recorrencia_id,
+            'arquivado': bool(linha.arquivado)
+        }
+
+    def archived_between(self, db: Session, pet_ids: Iterable[int], inicio: date, fim: date) -> List[ServicoArquivado]:
+        """Serviços arquivados com preço dos pets entre 'inicio' e 'fim' (gastos do mês)"""
+        pet_ids = list(pet_ids)
+        if not pet_ids:
+            return []
+        return db.query(ServicoArquivado).filter(
+            ServicoArquivado.pet_id.in_(pet_ids),
+            ServicoArquivado.data_agendada >= inicio,
+            ServicoArquivado.data_agendada <= fim,
+            ServicoArquivado.preco.isnot(None)
+        ).all()
+
+
+servico_archive = ServicoArchiveService()
@@ -0,0 +1,178 @@
+from collections import namedtuple
+from typing import Optional
+import uuid
+from sqlalchemy import delete, event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Arquivo import Arquivo
+from services.ImageVariantService import VARIANTES, variant_filename
+from config.uploads import ImageSpool
+from config.database import SessionLocal
+
+
+class ArquivoSalvo(namedtuple('ArquivoSalvo', ['caminho', 'hash', 'tamanho', 'novo', 'pasta', 'copia'],
+                              defaults=(None, None))):
+    """
+    Resultado de store(): caminho relativo à pasta de uploads e se o conteúdo ainda não existia.
+    Quando o conteúdo já existia, 'copia' guarda o temporário até acquire(), que o usa se o
+    arquivo tiver sido apagado nesse meio tempo.
+    """
+
+    __slots__ = ()
+
+    @property
+    def url(self) -> str:
+        return f"/uploads/{self.caminho}"
+
+
+class UploadStorageService:
+    """
+    Armazenamento dos uploads pelo conteúdo.
+
+    O arquivo é gravado em blocos num temporário enquanto o sha256 é calculado
+    (ver config/uploads.py) e depois renomeado para ab/cd/<sha256>.<ext>, com a
+    extensão do formato detectado, dentro da pasta de uploads (dois
+    níveis de subpastas, poucas entradas por diretório). Conteúdo repetido não
+    ocupa disco de novo: o temporário é descartado. A tabela arquivos conta quantas
+    fotos (Pet.photo_url, Concurso.imagem_url) usam cada arquivo; quando a contagem
+    chega a zero, o arquivo sai do lugar ainda dentro da transação e é apagado (com
+    as variantes) depois do commit, ou volta para o lugar no rollback. Assim, quem
+    registra uma nova referência depois desse commit encontra o arquivo ausente e o
+    grava de novo a partir da própria cópia.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    PREFIXO_URL = '/uploads/'
+
+    @staticmethod
+    def shard_path(hash_hex: str, extensao: str) -> str:
+        return f"{hash_hex[:2]}/{hash_hex[2:4]}/{hash_hex}.{extensao}"
+
+    def store(self, pasta: str, stream) -> ArquivoSalvo:
+        """
+        Grava uma imagem e devolve onde ela ficou. 'stream' é o ImageSpool que recebeu o upload
+        (já gravado e com o hash calculado) ou qualquer arquivo, copiado em blocos por um ImageSpool.
+        Levanta UnsupportedMediaType se o conteúdo não for uma imagem aceita.
+        """
+        spool = stream
+        if not isinstance(spool, ImageSpool):
+            spool = ImageSpool(pasta)
+            try:
+                while True:
+                    bloco = stream.read(self.CHUNK_SIZE)
+                    if not bloco:
+                        break
+                    spool.write(bloco)
+            except BaseException:
+                spool.close()
+                raise
+        spool.finish()
+
+        caminho = self.shard_path(spool.hash, spool.extensao)
+        final = os.path.join(pasta, caminho)
+        if os.path.exists(final):
+            # Mesmo conteúdo já gravado: o temporário fica até acquire() conferir que o arquivo continua lá
+            return ArquivoSalvo(caminho, spool.hash, spool.tamanho, False, pasta, spool)
+        spool.persist(final)
+        return ArquivoSalvo(caminho, spool.hash, spool.tamanho, True, pasta)
+
+    def relative_path(self, url: Optional[str]) -> Optional[str]:
+        """Caminho relativo à pasta de uploads de uma URL /uploads/..."""
+        if not url or not url.startswith(self.PREFIXO_URL):
+            return None
+        return url[len(self.PREFIXO_URL):]
+
+    def acquire(self, db: Session, arquivo: ArquivoSalvo) -> None:
+        """Mais uma foto usa o arquivo. Não faz commit."""
+        if not self._increment(db, arquivo.caminho):
+            try:
+                with db.begin_nested():
+                    db.add(Arquivo(caminho=arquivo.caminho, hash=arquivo.hash, tamanho=arquivo.tamanho, referencias=1))
+            except IntegrityError:
+                # Outra requisição registrou o mesmo conteúdo ao mesmo tempo
+                self._increment(db, arquivo.caminho)
+
+        # A linha já está travada por esta transação: um release() concorrente ou já terminou
+        # (e tirou o arquivo do lugar antes do commit) ou só vai decrementar depois deste commit
+        if arquivo.copia is not None:
+            final = os.path.join(arquivo.pasta, arquivo.caminho)
+            if not arquivo.copia.persistido and not os.path.exists(final):
+                arquivo.copia.persist(final)
+                print(f"[UPLOADS] Arquivo apagado por outra requisição gravado de novo: {arquivo.caminho}")
+            else:
+                arquivo.copia.close()
+
+    def _increment(self, db: Session, caminho: str) -> bool:
+        return db.execute(
+            update(Arquivo).where(Arquivo.caminho == caminho)
+            .values(referencias=Arquivo.referencias + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+
+    def release(self, db: Session, pasta: str, url: Optional[str]) -> None:
+        """
+        Uma foto deixou de usar o arquivo. Não faz commit; se era a última referência,
+        o arquivo e as variantes são apagados depois do commit.
+        Uploads antigos (sem linha em arquivos) são apagados como antes.
+        """
+        caminho = self.relative_path(url)
+        if not caminho:
+            return
+        registrado = db.execute(
+            update(Arquivo).where(Arquivo.caminho == caminho)
+            .values(referencias=Arquivo.referencias - 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+        if registrado:
+            orfao = db.execute(
+                delete(Arquivo).where(Arquivo.caminho == caminho, Arquivo.referencias <= 0)
+                .execution_options(synchronize_session=False)
+            ).rowcount > 0
+        else:
+            orfao = '/' not in caminho  # upload antigo, gravado direto na pasta com nome único
+        if orfao:
+            final = os.path.join(pasta, caminho)
+            removido = None
+            if os.path.exists(final):
+                # Sai do lugar antes do commit: uma nova referência registrada depois dele não encontra o arquivo
+                os.makedirs(os.path.join(pasta, '.tmp'), exist_ok=True)
+                removido = os.path.join(pasta, '.tmp', f"{os.path.basename(caminho)}.{uuid.uuid4().hex}.removido")
+                os.replace(final, removido)
+            db.info.setdefault('uploads_orfaos', []).append((final, removido))
+
+    def remove_files(self, caminho_absoluto: str, removido: Optional[str] = None) -> None:
+        """Apaga um upload (ou o temporário para onde ele foi movido) e as variantes"""
+        for arquivo in [removido or caminho_absoluto, *(variant_filename(caminho_absoluto, nome) for nome in VARIANTES)]:
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+                print(f"[UPLOADS] Arquivo removido: {arquivo}")
+
+    def restore_file(self, caminho_absoluto: str, removido: Optional[str]) -> None:
+        """Rollback de release(): o arquivo volta para o lugar (se ninguém gravou o mesmo conteúdo lá)"""
+        if not removido or not os.path.exists(removido):
+            return
+        if os.path.exists(caminho_absoluto):
+            os.remove(removido)
+        else:
+            os.replace(removido, caminho_absoluto)
+
+
+upload_storage = UploadStorageService()
+
+
+@event.listens_for(SessionLocal, 'after_commit')
+def _remove_orphans_after_commit(session):
+    for caminho, removido in session.info.pop('uploads_orfaos', []):
+        upload_storage.remove_files(caminho, removido)
+
+
+@event.listens_for(SessionLocal, 'after_transaction_end')
+def _keep_files_after_rollback(session, transaction):
+    # Transação principal terminada sem commit (rollback ou close): os arquivos voltam para o lugar
+    if transaction.parent is None:
+        for caminho, removido in session.info.pop('uploads_orfaos', []):
+            upload_storage.restore_file(caminho, removido)
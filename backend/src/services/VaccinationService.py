@@ -0,0 +1,185 @@
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select, insert, delete, literal, null
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Pet import Pet
+from models.Servico import Servico
+from models.ServicoArquivado import ServicoArquivado
+from models.PetVaccinationStatus import PetVaccinationStatus
+from services.ServicoArchiveService import servico_archive
+
+
+class VaccinationService:
+    """
+    Status de vacinação dos pets.
+
+    A última vacinação de cada pet fica na tabela resumo pet_vaccination_status,
+    atualizada na mesma transação de qualquer rota que altere um serviço de
+    'vacinacao' (ver refresh). Pets sem linha no resumo nunca foram vacinados.
+    """
+
+    # Validade de uma vacinação, em dias
+    VALIDADE_DIAS = 365
+
+    def _last_vaccination_query(self, pet_ids: Optional[Iterable[int]] = None):
+        """SELECT pet_id, MAX(data_agendada) dos serviços de vacinação (incluindo os arquivados), agrupado por pet"""
+        filtros_servicos = [Servico.tipo == 'vacinacao']
+        filtros_arquivo = [ServicoArquivado.tipo == 'vacinacao']
+        if pet_ids is not None:
+            pet_ids = list(pet_ids)
+            filtros_servicos.append(Servico.pet_id.in_(pet_ids))
+            filtros_arquivo.append(ServicoArquivado.pet_id.in_(pet_ids))
+
+        vacinas = servico_archive.with_history(
+            'pet_id', 'data_agendada', filtros_servicos=filtros_servicos, filtros_arquivo=filtros_arquivo
+        )
+        return select(
+            vacinas.c.pet_id.label('pet_id'),
+            func.max(vacinas.c.data_agendada).label('ultima_vacinacao')
+        ).group_by(vacinas.c.pet_id)
+
+    def refresh(self, db: Session, pet_ids: Iterable[int]) -> None:
+        """
+        Recalcula o resumo de vacinação dos pets informados.
+        Deve ser chamado antes do commit da transação que alterou os serviços.
+        """
+        pet_ids = {pet_id for pet_id in pet_ids if pet_id is not None}
+        if not pet_ids:
+            return
+
+        # Garante que as alterações pendentes da sessão entrem no MAX()
+        db.flush()
+
+        ultimas = dict(db.execute(self._last_vaccination_query(pet_ids)).all())
+        existentes = {
+            status.pet_id: status
+            for status in db.query(PetVaccinationStatus).filter(PetVaccinationStatus.pet_id.in_(pet_ids)).all()
+        }
+
+        for pet_id in pet_ids:
+            ultima_vacinacao = ultimas.get(pet_id)
+            status = existentes.get(pet_id)
+
+            if ultima_vacinacao is None:
+                if status is not None:
+                    db.delete(status)
+                continue
+
+            if status is None:
+                status = PetVaccinationStatus(pet_id=pet_id)
+                db.add(status)
+            status.ultima_vacinacao = ultima_vacinacao
+            status.proxima_vacinacao = ultima_vacinacao + timedelta(days=self.VALIDADE_DIAS)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Reconstrói todo o resumo de vacinação a partir de servicos e servicos_archive.
+        Returns: número de pets com vacinação registrada
+        """
+        db.execute(delete(PetVaccinationStatus))
+
+        agora = datetime.now()
+        linhas = [
+            {
+                'pet_id': pet_id,
+                'ultima_vacinacao': ultima_vacinacao,
+                'proxima_vacinacao': ultima_vacinacao + timedelta(days=self.VALIDADE_DIAS),
+                'atualizado_em': agora
+            }
+            for pet_id, ultima_vacinacao in db.execute(self._last_vaccination_query()).all()
+        ]
+        if linhas:
+            db.execute(insert(PetVaccinationStatus), linhas)
+
+        db.commit()
+        return len(linhas)
+
+    def status_for_pets(self, db: Session, owner_id: Optional[int] = None,
+                        hoje: Optional[date] = None) -> List[Dict]:
+        """
+        Status de vacinação de todos os pets de um dono (ou de todos os pets, se owner_id for None)
+        Returns: lista de dicts com pet_id, pet_name, ultima_vacinacao, vencida,
+                 dias_desde_vacinacao e dias_apos_vencimento
+        """
+        hoje = hoje or datetime.now().date()
+
+        query = db.query(Pet.id, Pet.name, PetVaccinationStatus.ultima_vacinacao).outerjoin(
+            PetVaccinationStatus, PetVaccinationStatus.pet_id == Pet.id
+        )
+        if owner_id is not None:
+            query = query.filter(Pet.owner_id == owner_id)
+
+        return [
+            self._build_status(pet_id, pet_name, ultima_vacinacao, hoje)
+            for pet_id, pet_name, ultima_vacinacao in query.order_by(Pet.id).all()
+        ]
+
+    def status_for_loaded_pets(self, db: Session, pets: Iterable[Pet],
+                               hoje: Optional[date] = None) -> List[Dict]:
+        """Mesmo resultado de status_for_pets para pets já carregados (consulta só o resumo)"""
+        hoje = hoje or datetime.now().date()
+        pets = list(pets)
+
+        ultimas = dict(db.query(PetVaccinationStatus.pet_id, PetVaccinationStatus.ultima_vacinacao).filter(
+            PetVaccinationStatus.pet_id.in_([pet.id for pet in pets])
+        ).all()) if pets else {}
+
+        return [
+            self._build_status(pet.id, pet.name, ultimas.get(pet.id), hoje)
+            for pet in sorted(pets, key=lambda pet: pet.id)
+        ]
+
+    def overdue_for_pets(self, db: Session, owner_id: Optional[int] = None,
+                         hoje: Optional[date] = None) -> List[Dict]:
+        """
+        Apenas os pets com vacinação vencida ou sem nenhuma vacinação.
+        As vencidas saem de uma busca por intervalo no índice de proxima_vacinacao.
+        """
+        hoje = hoje or datetime.now().date()
+
+        vencidas = db.query(Pet.id, Pet.name, PetVaccinationStatus.ultima_vacinacao).join(
+            PetVaccinationStatus, PetVaccinationStatus.pet_id == Pet.id
+        ).filter(PetVaccinationStatus.proxima_vacinacao < hoje)
+
+        sem_vacinacao = db.query(Pet.id, Pet.name, null()).filter(
+            ~select(literal(1)).where(PetVaccinationStatus.pet_id == Pet.id).exists()
+        )
+
+        if owner_id is not None:
+            vencidas = vencidas.filter(Pet.owner_id == owner_id)
+            sem_vacinacao = sem_vacinacao.filter(Pet.owner_id == owner_id)
+
+        rows = sorted(vencidas.union_all(sem_vacinacao).all(), key=lambda row: row[0])
+        return [
+            self._build_status(pet_id, pet_name, ultima_vacinacao, hoje)
+            for pet_id, pet_name, ultima_vacinacao in rows
+        ]
+
+    def _build_status(self, pet_id: int, pet_name: str, ultima_vacinacao: Optional[date], hoje: date) -> Dict:
+        if ultima_vacinacao is None:
+            # Pet sem nenhuma vacinação agendada = vacina vencida
+            return {
+                'pet_id': pet_id,
+                'pet_name': pet_name,
+                'ultima_vacinacao': None,
+                'vencida': True,
+                'dias_desde_vacinacao': None,
+                'dias_apos_vencimento': None
+            }
+
+        dias_desde_vacinacao = (hoje - ultima_vacinacao).days
+        return {
+            'pet_id': pet_id,
+            'pet_name': pet_name,
+            'ultima_vacinacao': ultima_vacinacao,
+            'vencida': dias_desde_vacinacao > self.VALIDADE_DIAS,
+            'dias_desde_vacinacao': dias_desde_vacinacao,
+            'dias_apos_vencimento': dias_desde_vacinacao - self.VALIDADE_DIAS
+        }
+
+
+vaccination_service = VaccinationService()
@@ -0,0 +1,265 @@
+import atexit
+from datetime import datetime
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Concurso import Concurso
+from models.ConcursoVoto import ConcursoVoto
+from config.database import SessionLocal
+
+
+class VoteCounterService:
+    """
+    Contador de votos do concurso com escrita adiada (write-behind).
+
+    Cada voto só incrementa um contador em memória; uma thread em segundo plano
+    grava os acumulados a cada VOTE_FLUSH_INTERVAL segundos com um único
+    UPDATE concursos SET votos = votos + :n (executemany), e o restante é
+    gravado no encerramento do processo. A contagem devolvida ao votar é
+    aproximada: último valor lido do banco + votos registrados por este processo.
+
+    Cada usuário vota uma vez por foto: o conjunto de quem já votou em cada foto
+    fica em memória, então votos repetidos são recusados sem consultar o banco.
+    Os votos aceitos são inseridos em concurso_votes no mesmo lote; a restrição
+    única da tabela resolve votos repetidos vindos de outros processos.
+    """
+
+    DEFAULT_FLUSH_INTERVAL = 2.0  # segundos
+    # Antecipa a gravação quando há muitos votos pendentes
+    MAX_PENDING = 500
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = flush_interval or float(
+            os.environ.get('VOTE_FLUSH_INTERVAL', self.DEFAULT_FLUSH_INTERVAL)
+        )
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, int] = {}
+        self._pending_total = 0
+        self._known: Dict[int, int] = {}  # votos já gravados, por foto
+        self._voters: Dict[int, Set[int]] = {}  # quem já votou (gravado ou pendente), por foto
+        self._pending_votes: List[Tuple[int, int, datetime]] = []  # (concurso_id, user_id, data_voto)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, db: Session) -> int:
+        """
+        Carrega as contagens e os votantes de todas as fotos (duas consultas).
+        Returns: número de fotos carregadas
+        """
+        contagens = {cid: votos or 0 for cid, votos in db.query(Concurso.id, Concurso.votos)}
+        votantes: Dict[int, Set[int]] = {cid: set() for cid in contagens}
+        for cid, user_id in db.query(ConcursoVoto.concurso_id, ConcursoVoto.user_id):
+            votantes.setdefault(cid, set()).add(user_id)
+
+        with self._lock:
+            for cid, votos in contagens.items():
+                if cid not in self._known:
+                    self._known[cid] = votos
+                    self._voters[cid] = votantes[cid]
+        print(f"[VOTOS] Votos carregados: {len(contagens)} foto(s)")
+        return len(contagens)
+
+    def _load(self, db: Session, concurso_id: int) -> bool:
+        """Lê a contagem e os votantes de uma foto ainda não vista. Returns: False se a foto não existir"""
+        linha = db.query(Concurso.votos).filter(Concurso.id == concurso_id).first()
+        if linha is None:
+            return False
+        votantes = {
+            user_id for (user_id,) in
+            db.query(ConcursoVoto.user_id).filter(ConcursoVoto.concurso_id == concurso_id)
+        }
+        with self._lock:
+            if concurso_id not in self._known:
+                self._known[concurso_id] = linha.votos or 0
+                self._voters[concurso_id] = votantes
+        return True
+
+    def record(self, db: Session, concurso_id: int, user_id: int) -> Optional[Tuple[int, bool]]:
+        """
+        Registra o voto de um usuário.
+        Returns: (contagem aproximada da foto, voto aceito), ou None se a foto não existir.
+        Um voto repetido do mesmo usuário não é aceito e não muda a contagem.
+        """
+        if concurso_id not in self._known and not self._load(db, concurso_id):
+            return None
+
+        with self._lock:
+            votantes = self._voters[concurso_id]
+            if user_id in votantes:
+                return self._known[concurso_id] + self._pending.get(concurso_id, 0), False
+            votantes.add(user_id)
+            self._pending_votes.append((concurso_id, user_id, datetime.now()))
+            self._pending[concurso_id] = self._pending.get(concurso_id, 0) + 1
+            self._pending_total += 1
+            contagem = self._known[concurso_id] + self._pending[concurso_id]
+            cheio = self._pending_total >= self.MAX_PENDING
+
+        self._ensure_started()
+        if cheio:
+            self._wake.set()
+        return contagem, True
+
+    def pending(self, concurso_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """Votos ainda não gravados (de todas as fotos ou só das informadas)"""
+        with self._lock:
+            if concurso_ids is None:
+                return dict(self._pending)
+            return {cid: self._pending[cid] for cid in concurso_ids if cid in self._pending}
+
+    def forget(self, concurso_id: int) -> None:
+        """Descarta votos pendentes, contagem e votantes conhecidos de uma foto removida"""
+        with self._lock:
+            self._pending_total -= self._pending.pop(concurso_id, 0)
+            self._pending_votes = [voto for voto in self._pending_votes if voto[0] != concurso_id]
+            self._known.pop(concurso_id, None)
+            self._voters.pop(concurso_id, None)
+
+    def clear(self) -> None:
+        """Descarta todo o estado em memória (ex.: depois de recriar o banco)"""
+        with self._lock:
+            self._pending.clear()
+            self._pending_votes = []
+            self._pending_total = 0
+            self._known.clear()
+            self._voters.clear()
+
+    def flush(self) -> int:
+        """
+        Grava os votos pendentes em um único lote (INSERT em concurso_votes + UPDATE das contagens).
+        Os votos continuam contados como pendentes até a gravação terminar: contagem gravada e
+        pendente mudam juntas, sob o lock, e a soma vista por record() nunca diminui no meio.
+        Returns: número de votos gravados
+        """
+        with self._flush_lock:
+            with self._lock:
+                lote, self._pending_votes = self._pending_votes, []
+            if not lote:
+                return 0
+
+            db = SessionLocal()
+            try:
+                try:
+                    aceitos = self._write(db, self._without_forgotten(lote))
+                except IntegrityError:
+                    # Outro processo já gravou algum destes votos: descarta os repetidos e tenta de novo
+                    db.rollback()
+                    aceitos = self._write(db, self._without_existing(db, self._without_forgotten(lote)))
+            except Exception as e:
+                db.rollback()
+                # Devolve o lote para a próxima tentativa (as contagens pendentes não mudaram)
+                with self._lock:
+                    self._pending_votes = [voto for voto in lote if voto[0] in self._known] + self._pending_votes
+                print(f"[VOTOS] Erro ao gravar votos: {e}")
+                return 0
+            finally:
+                db.close()
+
+            por_foto: Dict[int, int] = {}
+            for cid, _, _ in lote:
+                por_foto[cid] = por_foto.get(cid, 0) + 1
+            with self._lock:
+                for cid, n in por_foto.items():
+                    if cid not in self._known:
+                        continue  # foto removida durante a gravação: forget() já limpou tudo
+                    self._known[cid] += aceitos.get(cid, 0)
+                    restantes = self._pending.get(cid, 0) - n
+                    if restantes > 0:
+                        self._pending[cid] = restantes
+                    else:
+                        self._pending.pop(cid, None)
+                    self._pending_total -= n
+            total = sum(aceitos.values())
+            repetidos = len(lote) - total
+            print(f"[VOTOS] {total} voto(s) gravado(s) em {len(aceitos)} foto(s)"
+                  + (f", {repetidos} repetido(s) ou de foto removida descartado(s)" if repetidos else ""))
+            return total
+
+    def _without_forgotten(self, lote: List[Tuple[int, int, datetime]]) -> List[Tuple[int, int, datetime]]:
+        """Tira do lote os votos de fotos esquecidas (forget) depois que o lote foi separado"""
+        with self._lock:
+            return [voto for voto in lote if voto[0] in self._known]
+
+    @staticmethod
+    def _write(db: Session, lote: List[Tuple[int, int, datetime]]) -> Dict[int, int]:
+        """
+        Insere os votos e soma as contagens na mesma transação. Votos de fotos que não
+        existem mais (removidas por outra requisição) são descartados.
+        Returns: votos gravados por foto
+        """
+        if lote:
+            existentes = {
+                cid for (cid,) in
+                db.query(Concurso.id).filter(Concurso.id.in_({cid for cid, _, _ in lote}))
+            }
+            lote = [voto for voto in lote if voto[0] in existentes]
+        por_foto: Dict[int, int] = {}
+        for cid, _, _ in lote:
+            por_foto[cid] = por_foto.get(cid, 0) + 1
+        if not lote:
+            return por_foto
+
+        db.execute(
+            insert(ConcursoVoto.__table__),
+            [{'concurso_id': cid, 'user_id': uid, 'data_voto': data} for cid, uid, data in lote]
+        )
+        db.execute(
+            update(Concurso.__table__)
+            .where(Concurso.__table__.c.id == bindparam('concurso_id'))
+            .values(votos=Concurso.__table__.c.votos + bindparam('n')),
+            [{'concurso_id': cid, 'n': n} for cid, n in por_foto.items()]
+        )
+        db.commit()
+        return por_foto
+
+    @staticmethod
+    def _without_existing(db: Session, lote: List[Tuple[int, int, datetime]]) -> List[Tuple[int, int, datetime]]:
+        """Remove do lote os votos que já estão gravados (uma consulta)"""
+        existentes = {
+            (cid, uid) for cid, uid in
+            db.query(ConcursoVoto.concurso_id, ConcursoVoto.user_id).filter(
+                ConcursoVoto.concurso_id.in_({cid for cid, _, _ in lote}),
+                ConcursoVoto.user_id.in_({uid for _, uid, _ in lote})
+            )
+        }
+        return [voto for voto in lote if (voto[0], voto[1]) not in existentes]
+
+    def start(self) -> None:
+        """Inicia a thread de gravação (na inicialização do processo; record() também inicia se preciso)"""
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='vote-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self) -> None:
+        """Para a thread de gravação e grava o que estiver pendente"""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+vote_counter = VoteCounterService()
+atexit.register(vote_counter.stop)
@@ -52,15 +52,12 @@ async function carregarPetsUsuario() {
             return;
         }
         
-        const response = await fetch('http://127.0.0.1:5000/api/pets');
+        // Apenas pets do usuário logado (o servidor filtra; sem limit, vêm todos)
+        const response = await fetch(`http://127.0.0.1:5000/api/pets?user_email=${encodeURIComponent(userEmail)}`);
         const data = await response.json();
         
         if (data.success) {
-            // Filtrar apenas pets do usuário logado
-            const user = await fetch(`http://127.0.0.1:5000/api/users?email=${encodeURIComponent(userEmail)}`).then(r => r.json());
-            const userId = user.users?.[0]?.id;
-            
-            const meusPets = data.pets.filter(pet => pet.owner_id === userId);
+            const meusPets = data.pets;
             
             const select = document.getElementById('petSelect');
             select.innerHTML = '<option value="">-- Selecione um pet --</option>';
@@ -128,13 +125,16 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Carregar fotos ao iniciar a página
     carregarFotosConcurso();
+    conectarStreamVotos();
 });
 
 // ==================== CARREGAR FOTOS DO CONCURSO ====================
 
-async function carregarFotosConcurso() {
+// Sem cursor recarrega a galeria do topo do ranking; com cursor acrescenta a próxima página
+async function carregarFotosConcurso(cursor) {
     try {
-        const response = await fetch('http://127.0.0.1:5000/api/concurso/fotos');
+        const url = 'http://127.0.0.1:5000/api/concurso/fotos' + (cursor ? `?cursor=${encodeURIComponent(cursor)}` : '');
+        const response = await fetch(url);
         const data = await response.json();
         
         const grid = document.querySelector('.submissions-grid');
@@ -143,8 +143,10 @@ async function carregarFotosConcurso() {
         const userData = JSON.parse(localStorage.getItem('user') || '{}');
         const userEmail = userData.email || '';
         
-        if (data.success && data.fotos.length > 0) {
-            grid.innerHTML = '';
+        if (data.success && (cursor || data.fotos.length > 0)) {
+            if (!cursor) {
+                grid.innerHTML = '';
+            }
             
             data.fotos.forEach(foto => {
                 const card = document.createElement('div');
@@ -158,19 +160,23 @@ async function carregarFotosConcurso() {
                     </button>
                 ` : '';
                 
+                // Miniatura da foto quando já gerada
+                const imagemCard = (foto.imagem_variants && foto.imagem_variants.thumb) || foto.imagem_url;
+                
                 card.innerHTML = `
                     ${btnDeletar}
-                    <div class="photo-placeholder" style="background-image: url('http://127.0.0.1:5000${foto.imagem_url}'); background-size: cover; background-position: center;"></div>
+                    <div class="photo-placeholder" style="background-image: url('http://127.0.0.1:5000${imagemCard}'); background-size: cover; background-position: center;"></div>
                     <div class="submission-details">
                         <h4>${foto.descricao || 'Sem descrição'}</h4>
                         <p>Submetido por: ${foto.user_name}</p>
                         <a href="#" onclick="votarFoto(${foto.id}); return false;" class="btn-vote">
-                            <i class="fas fa-heart"></i> Votar (${foto.votos})
+                            <i class="fas fa-heart"></i> Votar (<span class="contador-votos" data-concurso-id="${foto.id}">${foto.votos}</span>)
                         </a>
                     </div>
                 `;
                 grid.appendChild(card);
             });
+            atualizarBotaoCarregarMais(grid, data.next_cursor);
         } else {
             grid.innerHTML = '<p style="text-align: center; color: #1a1a1a; padding: 40px; width: 100%; font-size: 18px;"><i class="fas fa-paw" style="font-size: 48px; color: #ff7700; margin-bottom: 20px;"></i><br><br>Nenhuma foto enviada ainda. Seja o primeiro a participar!</p>';
         }
@@ -181,28 +187,74 @@ async function carregarFotosConcurso() {
     }
 }
 
+function atualizarBotaoCarregarMais(grid, nextCursor) {
+    let botao = document.getElementById('btnCarregarMais');
+    if (!nextCursor) {
+        if (botao) botao.remove();
+        return;
+    }
+    if (!botao) {
+        botao = document.createElement('button');
+        botao.id = 'btnCarregarMais';
+        botao.className = 'btn-submit';
+        botao.style.marginTop = '25px';
+        botao.innerHTML = '<i class="fas fa-chevron-down"></i> Carregar mais fotos';
+        grid.after(botao);
+    }
+    botao.onclick = function() {
+        carregarFotosConcurso(nextCursor);
+    };
+}
+
 // ==================== VOTAR EM FOTO ====================
 
 async function votarFoto(concursoId) {
     try {
-        const response = await fetch(`http://127.0.0.1:5000/api/concurso/votar/${concursoId}`, {
+        const userData = JSON.parse(localStorage.getItem('user') || '{}');
+        if (!userData.email) {
+            alert('Você precisa estar logado para votar!');
+            return;
+        }
+        
+        const response = await fetch(`http://127.0.0.1:5000/api/concurso/votar/${concursoId}?user_email=${encodeURIComponent(userData.email)}`, {
             method: 'POST'
         });
         
         const data = await response.json();
         
-        if (data.success) {
-            alert(data.message);
-            carregarFotosConcurso();
-        } else {
-            alert(data.message);
-        }
+        // Atualiza só o contador da foto; o stream SSE corrige a contagem dos outros votos
+        atualizarContadorVotos(concursoId, data.votos);
+        alert(data.message);
     } catch (error) {
         console.error('Erro ao votar:', error);
         alert('Erro ao registrar voto. Tente novamente.');
     }
 }
 
+// ==================== VOTOS EM TEMPO REAL ====================
+
+function atualizarContadorVotos(concursoId, votos) {
+    const contador = document.querySelector(`.contador-votos[data-concurso-id="${concursoId}"]`);
+    if (contador && votos !== undefined) {
+        contador.textContent = votos;
+    }
+}
+
+function conectarStreamVotos() {
+    if (!window.EventSource) {
+        return;
+    }
+    
+    // O servidor agrupa os votos e envia só as fotos que mudaram: [{id, votos}]
+    const stream = new EventSource('http://127.0.0.1:5000/api/concurso/stream');
+    stream.addEventListener('votos', function(event) {
+        JSON.parse(event.data).forEach(foto => atualizarContadorVotos(foto.id, foto.votos));
+    });
+    stream.onerror = function() {
+        console.warn('Stream de votos desconectado; o navegador tentará reconectar.');
+    };
+}
+
 // ==================== DELETAR FOTO ====================
 
 async function deletarFoto(concursoId) {
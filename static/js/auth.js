@@ -1,4 +1,32 @@
 // auth.js
+
+// Envia o token de sessão (salvo no login) em todas as chamadas à API
+(function () {
+    const fetchOriginal = window.fetch.bind(window);
+    const API_URL = /^(https?:\/\/(localhost|127\.0\.0\.1):5000)?\/api\//;
+
+    window.fetch = async function (resource, options = {}) {
+        const token = localStorage.getItem('token');
+        const url = typeof resource === 'string' ? resource : resource.url;
+        if (!token || !API_URL.test(url)) {
+            return fetchOriginal(resource, options);
+        }
+
+        const headers = new Headers(options.headers || (resource instanceof Request ? resource.headers : undefined));
+        if (!headers.has('Authorization')) {
+            headers.set('Authorization', `Bearer ${token}`);
+        }
+        const response = await fetchOriginal(resource, { ...options, headers });
+        if (response.status === 401) {
+            // Token expirado ou inválido: a API não aceita mais o email no lugar do token, novo login
+            localStorage.removeItem('token');
+            localStorage.removeItem('user');
+            window.location.href = '/pages/login.html';
+        }
+        return response;
+    };
+})();
+
 async function login(email, password) {
     try {
         const response = await fetch('http://localhost:5000/api/auth/login', {
@@ -10,6 +38,10 @@ async function login(email, password) {
         });
 
         const data = await response.json();
+        if (data.success && data.token) {
+            // Token de sessão assinado: identifica o usuário nas próximas chamadas à API
+            localStorage.setItem('token', data.token);
+        }
         return data;
     } catch (error) {
         console.error('Erro ao fazer login:', error);
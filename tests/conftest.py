@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Banco de testes isolado: precisa ser definido antes de importar config.database
+_DB_DIR = tempfile.mkdtemp(prefix='petcloud-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'petcloud_test.db')}"
+# Hash de senha barato nos testes (o padrão de produção é lento de propósito)
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+# Votos só são gravados quando o teste chama vote_counter.flush()
+os.environ.setdefault('VOTE_FLUSH_INTERVAL', '3600')
+# Transmissões SSE só quando o teste chama contest_stream.broadcast_pending()
+os.environ.setdefault('CONTEST_STREAM_WINDOW', '3600')
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    return app_module
+
+
+@pytest.fixture
+def engine(app_module):
+    from config.database import Base, engine
+    from services.ClinicCatalogService import clinic_catalog
+    from services.VoteCounterService import vote_counter
+    from services.LeaderboardService import leaderboard
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    clinic_catalog.invalidate()  # DDL não passa pela invalidação automática
+    vote_counter.clear()
+    leaderboard.invalidate()
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    from config.database import SessionLocal
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(app_module, engine):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def seed(app_module, db, client):
+    """
+    Um usuário com dois pets, uma clínica, serviços passados/futuros e uma foto no concurso.
+    O cliente de teste passa a enviar o token desse usuário (um cabeçalho Authorization explícito prevalece).
+    """
+    from models import User, Pet, Servico, Clinica, Concurso
+
+    hoje = datetime.now().date()
+    user = User(name='Ana', email='ana@petcloud.com', password='x')
+    db.add(user)
+    db.flush()
+
+    clinica = Clinica(nome='VetCare', tipo_servico='vacinacao', preco_servico=80.0, veterinario='Dra. Silva')
+    db.add(clinica)
+    db.flush()
+
+    pets = []
+    for nome in ('Mia', 'Thor'):
+        pet = Pet(name=nome, breed='SRD', birth_date=datetime(2020, 1, 1), type='gato', owner_id=user.id)
+        db.add(pet)
+        db.flush()
+        pets.append(pet)
+        db.add_all([
+            Servico(pet_id=pet.id, clinica_id=clinica.id, tipo='vacinacao', data_agendada=hoje - timedelta(days=400),
+                    preco=80.0, veterinario='Dra. Silva'),
+            Servico(pet_id=pet.id, clinica_id=clinica.id, tipo='banho', data_agendada=hoje + timedelta(days=5),
+                    preco=50.0, veterinario='Dra. Silva'),
+        ])
+
+    db.add(Concurso(pet_id=pets[0].id, user_id=user.id, imagem_url='/uploads/mia.jpg', votos=3))
+    db.commit()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {app_module.auth_service.issue_token(user)}'
+
+    return {'user_email': user.email, 'user_id': user.id, 'pet_ids': [p.id for p in pets], 'clinica_id': clinica.id}
+
+
+@pytest.fixture
+def voters(app_module, db, seed):
+    """Cria n usuários votantes e devolve os cabeçalhos Authorization de cada um"""
+    from models import User
+
+    def criar(n):
+        users = [User(name=f'Votante {i}', email=f'votante{i}@petcloud.com', password='x') for i in range(n)]
+        db.add_all(users)
+        db.commit()
+        return [{'Authorization': f'Bearer {app_module.auth_service.issue_token(u)}'} for u in users]
+
+    return criar
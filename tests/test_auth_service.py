@@ -0,0 +1,187 @@
+"""AuthService: hash PBKDF2, atualização de hashes SHA-256 antigos e sessões por chamada"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def auth(app_module, engine):
+    from services.AuthService import AuthService
+    return AuthService()
+
+
+def _stored_password(db, email):
+    from models import User
+    db.expire_all()
+    return db.query(User.password).filter(User.email == email).scalar()
+
+
+def test_register_stores_salted_pbkdf2_hash(auth, db):
+    ok, _, _ = auth.register('Bia', 'bia@petcloud.com', 'segredo')
+    assert ok
+
+    stored = _stored_password(db, 'bia@petcloud.com')
+    algoritmo, iteracoes, salt, digest = stored.split('$')
+    assert algoritmo == 'pbkdf2_sha256'
+    assert int(iteracoes) == auth.iterations
+    assert auth._hash_password('segredo') != stored  # salt aleatório
+
+    assert auth.login('bia@petcloud.com', 'segredo')[0]
+    assert auth.login('bia@petcloud.com', 'errada')[1] == 'Senha incorreta.'
+
+
+def test_legacy_sha256_hash_is_upgraded_on_login(auth, db):
+    from models import User
+
+    db.add(User(name='Caio', email='caio@petcloud.com', password=hashlib.sha256(b'antiga').hexdigest()))
+    db.commit()
+
+    assert not auth.login('caio@petcloud.com', 'outra')[0]
+    assert len(_stored_password(db, 'caio@petcloud.com')) == 64  # senha errada não altera o hash
+
+    ok, _, user = auth.login('caio@petcloud.com', 'antiga')
+    assert ok and user.email == 'caio@petcloud.com'
+    assert _stored_password(db, 'caio@petcloud.com').startswith('pbkdf2_sha256$')
+
+    assert auth.login('caio@petcloud.com', 'antiga')[0]
+
+
+def test_hash_with_other_iteration_count_is_upgraded(app_module, engine, db):
+    from services.AuthService import AuthService
+
+    AuthService(iterations=500).register('Duda', 'duda@petcloud.com', 'senha')
+    auth = AuthService(iterations=700)
+
+    assert auth.login('duda@petcloud.com', 'senha')[0]
+    assert _stored_password(db, 'duda@petcloud.com').split('$')[1] == '700'
+
+
+def test_concurrent_logins_use_their_own_sessions(auth, engine):
+    emails = [f'user{i}@petcloud.com' for i in range(6)]
+    for email in emails:
+        assert auth.register('Usuário', email, 'senha')[0]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        resultados = list(pool.map(lambda email: auth.login(email, 'senha'), emails * 3))
+
+    assert all(ok for ok, _, _ in resultados)
+    assert [user.email for _, _, user in resultados] == emails * 3
+    assert engine.pool.checkedout() == 0
+
+
+def test_login_route_upgrades_legacy_hash(client, db):
+    from models import User
+
+    db.add(User(name='Eva', email='eva@petcloud.com', password=hashlib.sha256(b'123456').hexdigest()))
+    db.commit()
+
+    response = client.post('/api/auth/login', json={'email': 'eva@petcloud.com', 'password': '123456'})
+
+    assert response.status_code == 200
+    assert response.get_json()['user']['email'] == 'eva@petcloud.com'
+    assert _stored_password(db, 'eva@petcloud.com').startswith('pbkdf2_sha256$')
+
+
+def test_token_round_trip_and_rejection(auth, db):
+    auth.register('Gil', 'gil@petcloud.com', 'senha')
+    _, _, user = auth.login('gil@petcloud.com', 'senha')
+
+    token = auth.issue_token(user)
+    assert auth.user_from_token(token) == (user.id, 'gil@petcloud.com', 'Gil')
+    assert auth.user_from_token(token[:-2] + 'xx') is None
+
+    auth.token_max_age = -1
+    assert auth.user_from_token(token) is None
+
+
+def test_token_identifies_user_without_users_query(client, engine, seed):
+    from models import User
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.update().values(password=hashlib.sha256(b'senha').hexdigest()))
+    login = client.post('/api/auth/login', json={'email': seed['user_email'], 'password': 'senha'})
+    token = login.get_json()['token']
+
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        response = client.get('/api/servicos?incluir_passados=true', headers={'Authorization': f'Bearer {token}'})
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['servicos']) == 4
+    assert not [sql for sql in executadas if 'FROM users' in sql]
+
+
+def test_invalid_token_is_rejected(client, seed):
+    response = client.get(f"/api/servicos?user_email={seed['user_email']}",
+                          headers={'Authorization': 'Bearer token-invalido'})
+    assert response.status_code == 401
+
+
+def test_user_email_does_not_replace_the_token(client, db, seed):
+    from models import User
+
+    outro = User(name='Bia', email='bia@petcloud.com', password='x')
+    db.add(outro)
+    db.commit()
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+
+    # Sem token, mandar o email de outra pessoa não dá acesso aos dados dela
+    resposta = client.get(f"/api/servicos?user_email={seed['user_email']}")
+    assert resposta.status_code in (401, 404)
+    assert 'servicos' not in resposta.get_json()
+
+
+def test_legacy_user_email_only_with_the_flag(client, seed, monkeypatch):
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+    monkeypatch.setitem(client.application.config, 'AUTH_LEGACY_USER_EMAIL', True)
+
+    resposta = client.get(f"/api/servicos?user_email={seed['user_email']}")
+    assert resposta.status_code == 200
+
+
+@pytest.mark.parametrize('legado, status', [(False, 401), (True, 404)])
+def test_unresolved_user_email_never_reaches_other_users_rows(client, db, seed, monkeypatch, legado, status):
+    from datetime import datetime, timedelta
+    from models import Servico
+
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+    monkeypatch.setitem(client.application.config, 'AUTH_LEGACY_USER_EMAIL', legado)
+    atrasados = db.query(Servico).filter(Servico.data_agendada < datetime.now().date()).count()
+    db.add(Servico(pet_id=seed['pet_ids'][0], tipo='banho', data_agendada=datetime.now().date() + timedelta(days=3)))
+    db.commit()
+    email = 'ninguem@petcloud.com'
+
+    for resposta in (
+        client.get(f'/api/dashboard/vacinas-vencidas?user_email={email}'),
+        client.get(f'/api/dashboard/proximos-agendamentos?user_email={email}'),
+        client.post('/api/servicos/limpar-atrasados', json={'user_email': email}),
+    ):
+        assert resposta.status_code == status
+        assert set(resposta.get_json()) == {'success', 'message'}
+
+    # Nada dos outros usuários foi arquivado
+    db.expire_all()
+    assert db.query(Servico).filter(Servico.data_agendada < datetime.now().date()).count() == atrasados > 0
+
+
+def test_reset_password_stores_the_current_hash_format(client, db, seed):
+    from datetime import datetime, timedelta
+    from models import PasswordReset, User
+
+    user = db.query(User).filter(User.email == seed['user_email']).one()
+    db.add(PasswordReset(user_id=user.id, token='tok', expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.commit()
+
+    assert client.post('/api/auth/reset-password', json={'token': 'tok', 'new_password': 'nova'}).status_code == 200
+    db.expire_all()
+    assert db.get(User, user.id).password.startswith('pbkdf2_sha256$')
+    assert client.post('/api/auth/login', json={'email': seed['user_email'], 'password': 'nova'}).status_code == 200
@@ -0,0 +1,65 @@
+"""Catálogo de clínicas em memória: leituras sem consulta, invalidação em escritas e hit rate"""
+from sqlalchemy import event, update
+
+
+def _clinicas_selects(engine, chamada):
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM clinicas' in statement:
+            executadas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        resultado = chamada()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    return resultado, executadas
+
+
+def test_catalog_is_loaded_once(client, engine, seed):
+    from services.ClinicCatalogService import clinic_catalog
+
+    primeira, consultas = _clinicas_selects(engine, lambda: client.get('/api/clinicas?tipo=vacinacao'))
+    assert len(consultas) == 1
+
+    hits_antes = clinic_catalog.hits
+    segunda, consultas = _clinicas_selects(engine, lambda: client.get('/api/clinicas?tipo=vacinacao'))
+    assert consultas == []
+    assert clinic_catalog.hits == hits_antes + 1
+    assert segunda.get_json() == primeira.get_json()
+    assert [c['nome'] for c in segunda.get_json()['clinicas']] == ['VetCare']
+
+    metricas = client.get('/api/metrics').get_json()['clinic_catalog']
+    assert metricas['carregado'] is True
+    assert 0 < metricas['hit_rate'] < 1
+
+
+def test_orm_and_core_writes_invalidate_catalog(client, db, seed):
+    from models import Clinica
+    from services.ClinicCatalogService import clinic_catalog
+
+    assert clinic_catalog.by_name(db, 'vetcare').id == seed['clinica_id']
+
+    db.add(Clinica(nome='Banho & Tosa', tipo_servico='banho', preco_servico=40.0))
+    db.commit()
+    nomes = [c['nome'] for c in client.get('/api/clinicas').get_json()['clinicas']]
+    assert nomes == ['VetCare', 'Banho & Tosa']
+
+    db.execute(update(Clinica).where(Clinica.id == seed['clinica_id']).values(preco_servico=99.0))
+    db.commit()
+    assert clinic_catalog.get(db, str(seed['clinica_id'])).preco_servico == 99.0
+
+
+def test_create_servico_uses_catalog_prices(client, seed):
+    response = client.post('/api/servicos', json={
+        'pet_id': seed['pet_ids'][0],
+        'tipo': 'vacinacao',
+        'data_agendada': '2030-01-10',
+        'clinica_id': str(seed['clinica_id']),
+    })
+
+    assert response.status_code == 201
+    servico = response.get_json()['servico']
+    assert servico['clinica_id'] == seed['clinica_id']
+    assert (servico['preco'], servico['veterinario'], servico['clinica']) == (80.0, 'Dra. Silva', 'VetCare')
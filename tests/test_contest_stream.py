@@ -0,0 +1,89 @@
+"""Stream SSE das contagens de votos do concurso"""
+import json
+
+import pytest
+
+
+@pytest.fixture
+def concurso_id(db, seed):
+    from models import Concurso
+    return db.query(Concurso.id).filter(Concurso.pet_id == seed['pet_ids'][0]).scalar()
+
+
+def _eventos(mensagem):
+    """Converte uma mensagem SSE 'event: votos' na lista de deltas"""
+    linhas = dict(linha.split(': ', 1) for linha in mensagem.strip().split('\n'))
+    assert linhas['event'] == 'votos'
+    return json.loads(linhas['data'])
+
+
+def test_votes_within_a_window_are_coalesced_into_one_broadcast():
+    from services.ContestStreamService import ContestStreamService
+
+    stream = ContestStreamService(coalesce_window=3600)
+    espectadores = [stream.subscribe() for _ in range(3)]
+    try:
+        for espectador in espectadores:
+            assert next(espectador).startswith('retry:')
+
+        for votos in (4, 5, 6):
+            stream.publish(1, votos)
+        stream.publish(2, 10)
+
+        assert stream.broadcast_pending() == 3
+        assert stream.broadcasts == 1
+        mensagens = [next(espectador) for espectador in espectadores]
+        # A mesma mensagem (só a última contagem de cada foto) serve todos os espectadores
+        assert len(set(mensagens)) == 1
+        assert _eventos(mensagens[0]) == [{'id': 1, 'votos': 6}, {'id': 2, 'votos': 10}]
+
+        assert stream.broadcast_pending() == 0
+    finally:
+        for espectador in espectadores:
+            espectador.close()
+    assert stream.subscriber_count() == 0
+
+
+def test_publish_without_viewers_is_discarded():
+    from services.ContestStreamService import ContestStreamService
+
+    stream = ContestStreamService(coalesce_window=3600)
+    stream.publish(1, 4)
+    assert stream.broadcast_pending() == 0
+    assert stream.broadcasts == 0
+
+
+def test_slow_viewer_is_disconnected():
+    from services.ContestStreamService import ContestStreamService
+
+    stream = ContestStreamService(coalesce_window=3600)
+    stream.MAX_QUEUED_MESSAGES = 2
+    lento = stream.subscribe()
+    assert next(lento).startswith('retry:')
+
+    for votos in range(3):
+        stream.publish(1, votos)
+        stream.broadcast_pending()
+
+    assert stream.subscriber_count() == 0
+    assert list(lento) == []
+
+
+def test_vote_route_publishes_to_stream_endpoint(client, concurso_id, voters):
+    from services.ContestStreamService import contest_stream
+
+    resposta = client.get('/api/concurso/stream')
+    assert resposta.mimetype == 'text/event-stream'
+    assert resposta.headers['Cache-Control'] == 'no-cache'
+    corpo = iter(resposta.response)
+    try:
+        assert next(corpo).startswith(b'retry:')
+
+        for headers in voters(3):
+            assert client.post(f'/api/concurso/votar/{concurso_id}', headers=headers).status_code == 200
+        contest_stream.broadcast_pending()
+
+        assert _eventos(next(corpo).decode()) == [{'id': concurso_id, 'votos': 6}]
+    finally:
+        resposta.close()
+    assert contest_stream.subscriber_count() == 0
@@ -0,0 +1,126 @@
+"""Miniaturas e versões WebP das fotos enviadas"""
+import io
+import time
+
+import pytest
+
+
+@pytest.fixture
+def uploads(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def servico(monkeypatch):
+    """Serviço com um processo no pool e a geração ligada mesmo sem Pillow no processo principal"""
+    import services.ImageVariantService as modulo
+
+    if modulo.Image is None:
+        monkeypatch.setattr(modulo, 'Image', object())
+    servico = modulo.ImageVariantService(workers=1)
+    yield servico
+    servico.shutdown()
+
+
+def _aguardar(servico, timeout=60):
+    limite = time.monotonic() + timeout
+    while servico.stats()['pendentes'] and time.monotonic() < limite:
+        time.sleep(0.05)
+    return servico.stats()
+
+
+def test_pool_is_created_at_startup_without_fork(servico):
+    assert servico._executor is None
+    servico.start()
+
+    assert servico._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_pool_reports_failed_renders(servico, uploads):
+    (uploads / 'quebrada.jpg').write_bytes(b'nao e uma imagem')
+    concluidas = []
+
+    servico.start()
+    assert servico._submit(str(uploads), '/uploads/quebrada.jpg', lambda *args: concluidas.append(args))
+
+    assert _aguardar(servico) == {'habilitado': True, 'pendentes': 0, 'geradas': 0, 'erros': 1}
+    assert concluidas == []
+
+
+def test_pool_renders_and_records_variants(servico, uploads):
+    Image = pytest.importorskip('PIL.Image')
+
+    Image.new('RGB', (800, 600), 'orange').save(uploads / 'mia.jpg', 'JPEG')
+    concluidas = []
+
+    assert servico._submit(str(uploads), '/uploads/mia.jpg', lambda *args: concluidas.append(args))
+
+    assert _aguardar(servico)['geradas'] == 1
+    assert concluidas == [('/uploads/mia.jpg', {'thumb': '/uploads/mia.thumb.webp', 'webp': '/uploads/mia.webp.webp'})]
+
+
+def test_variants_are_recorded_only_for_the_current_photo(client, db, seed):
+    from models import Pet
+    from services.ImageVariantService import image_variants
+
+    pet_id = seed['pet_ids'][0]
+    db.query(Pet).filter(Pet.id == pet_id).update({'photo_url': '/uploads/nova.jpg'})
+    db.commit()
+    variantes = {'thumb': '/uploads/nova.thumb.webp', 'webp': '/uploads/nova.webp.webp'}
+
+    # Foto trocada antes de a geração terminar: as variantes antigas são descartadas
+    assert not image_variants.record_pet(pet_id, '/uploads/antiga.jpg', variantes)
+    assert image_variants.record_pet(pet_id, '/uploads/nova.jpg', variantes)
+
+    pets = client.get(f"/api/pets?user_email={seed['user_email']}").get_json()['pets']
+    assert next(p for p in pets if p['id'] == pet_id)['photo_variants'] == variantes
+
+
+def test_contest_variants_update_the_ranking(client, db, seed):
+    from models import Concurso
+    from services.ImageVariantService import image_variants
+
+    client.get('/api/concurso/fotos')  # monta o ranking em memória
+    foto = db.query(Concurso).first()
+    assert image_variants.record_concurso(foto.id, foto.imagem_url, {'thumb': '/uploads/mia.thumb.webp'})
+
+    fotos = client.get('/api/concurso/fotos').get_json()['fotos']
+    assert fotos[0]['imagem_variants'] == {'thumb': '/uploads/mia.thumb.webp'}
+
+
+def test_uploaded_file_serves_variant_or_falls_back_to_original(client, uploads):
+    (uploads / 'mia.jpg').write_bytes(b'original')
+    assert client.get('/uploads/mia.jpg?variant=thumb').data == b'original'
+
+    (uploads / 'mia.thumb.webp').write_bytes(b'miniatura')
+    assert client.get('/uploads/mia.jpg?variant=thumb').data == b'miniatura'
+    assert client.get('/uploads/mia.jpg?variant=outra').data == b'original'
+
+
+def test_render_variants_bounds_size_and_writes_webp(uploads):
+    Image = pytest.importorskip('PIL.Image')
+    from services.ImageVariantService import VARIANTES, render_variants
+
+    Image.new('RGB', (3000, 2000), 'orange').save(uploads / 'grande.jpg', 'JPEG')
+    geradas = render_variants(str(uploads), 'grande.jpg')
+
+    assert set(geradas) == set(VARIANTES)
+    for nome, arquivo in geradas.items():
+        with Image.open(uploads / arquivo) as variante:
+            assert variante.format == 'WEBP'
+            assert max(variante.size) == VARIANTES[nome][0]
+    assert not list(uploads.glob('.*.tmp'))
+
+
+def test_upload_without_pillow_keeps_the_original(client, db, seed, uploads, monkeypatch):
+    import services.ImageVariantService as modulo
+
+    monkeypatch.setattr(modulo, 'Image', None)
+    resposta = client.put(f"/api/pets/{seed['pet_ids'][0]}/photo", data={
+        'foto': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'0' * 64), 'mia.png')
+    }, content_type='multipart/form-data')
+
+    assert resposta.status_code == 200
+    assert modulo.image_variants.stats()['pendentes'] == 0
+    assert (uploads / resposta.get_json()['photo_url'][len('/uploads/'):]).exists()
@@ -0,0 +1,105 @@
+"""Ranking do concurso em memória"""
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def fotos(db, seed):
+    """Cinco fotos com votos e datas de envio conhecidos (além da foto da Mia, com 3 votos)"""
+    from models import Concurso, Pet
+
+    base = datetime(2026, 1, 1)
+    ids = []
+    for i, votos in enumerate([5, 1, 3, 5, 0]):
+        pet = Pet(name=f'Foto {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+        db.add(pet)
+        db.flush()
+        concurso = Concurso(pet_id=pet.id, user_id=seed['user_id'], imagem_url=f'/uploads/{i}.jpg',
+                            votos=votos, data_envio=base + timedelta(days=i))
+        db.add(concurso)
+        db.flush()
+        ids.append(concurso.id)
+    db.commit()
+    return ids
+
+
+def _ranking(client, **params):
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    return client.get(f'/api/concurso/fotos?{query}').get_json()
+
+
+def test_pages_follow_votes_then_submission_date(client, fotos):
+    ranking = _ranking(client)
+    assert [(f['pet_name'], f['votos']) for f in ranking['fotos']] == [
+        ('Foto 3', 5), ('Foto 0', 5), ('Mia', 3), ('Foto 2', 3), ('Foto 1', 1), ('Foto 4', 0)
+    ]
+    assert ranking['fotos'][0]['user_email'] == 'ana@petcloud.com'
+
+    pagina = _ranking(client, limit=2, offset=2)
+    assert [f['pet_name'] for f in pagina['fotos']] == ['Mia', 'Foto 2']
+    assert pagina['total'] == 6
+
+
+def test_warm_pages_do_not_query_the_database(client, engine, fotos):
+    _ranking(client, limit=3)
+
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        _ranking(client, limit=3, offset=1)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    assert executadas == []
+
+
+def test_ranking_is_built_at_process_startup(app_module, client, engine, fotos):
+    # Tarefa registrada em init_startup: a primeira página já encontra o ranking montado
+    app_module._montar_ranking()
+
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        assert _ranking(client, limit=3)['total'] == 6
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    assert executadas == []
+
+
+def test_votes_submissions_and_deletes_update_the_ranking(client, db, seed, fotos, voters, tmp_path, monkeypatch):
+    from models import Pet
+
+    _ranking(client)
+    for headers in voters(3):
+        client.post(f'/api/concurso/votar/{fotos[1]}', headers=headers)
+    topo = _ranking(client, limit=3)['fotos']
+    assert [(f['pet_name'], f['votos']) for f in topo] == [('Foto 3', 5), ('Foto 0', 5), ('Foto 1', 4)]
+
+    pet = Pet(name='Novo', breed='SRD', birth_date=datetime(2022, 1, 1), owner_id=seed['user_id'])
+    db.add(pet)
+    db.commit()
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    resposta = client.post('/api/concurso/enviar', data={
+        'pet_id': str(pet.id), 'user_email': seed['user_email'],
+        'imagem': (io.BytesIO(b'\xff\xd8\xff\xe0' + b'img' * 8), 'novo.jpg'),
+    }, content_type='multipart/form-data')
+    assert resposta.status_code == 201
+    # Empate em 0 votos: a foto mais recente vem antes
+    assert [f['pet_name'] for f in _ranking(client)['fotos'][-2:]] == ['Novo', 'Foto 4']
+
+    resposta = client.delete(f"/api/concurso/deletar/{fotos[3]}?user_email={seed['user_email']}")
+    assert resposta.status_code == 200
+    assert [f['pet_name'] for f in _ranking(client, limit=2)['fotos']] == ['Foto 0', 'Foto 1']
+
+    client.put(f'/api/pets/{seed["pet_ids"][0]}', json={'nome': 'Mimi'})
+    assert 'Mimi' in [f['pet_name'] for f in _ranking(client)['fotos']]
@@ -0,0 +1,86 @@
+"""Limpeza dos agendamentos atrasados: movidos em lote para o histórico, fora do dashboard"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def statements(engine):
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    yield capturadas
+    event.remove(engine, 'before_cursor_execute', capturar)
+
+
+def _outro_dono(db, seed):
+    """Outro usuário com um pet e um serviço atrasado"""
+    from models import User, Pet, Servico
+
+    user = User(name='Bia', email='bia@petcloud.com', password='x')
+    db.add(user)
+    db.flush()
+    pet = Pet(name='Rex', breed='SRD', birth_date=datetime(2020, 1, 1), owner_id=user.id)
+    db.add(pet)
+    db.flush()
+    db.add(Servico(pet_id=pet.id, clinica_id=seed['clinica_id'], tipo='banho',
+                   data_agendada=datetime.now().date() - timedelta(days=2), preco=50.0))
+    db.commit()
+    return pet.id
+
+
+def _atrasados(db):
+    from models import Servico
+    db.expire_all()
+    return db.query(Servico).filter(Servico.data_agendada < datetime.now().date()).count()
+
+
+def test_user_cleanup_is_one_scoped_insert_and_delete(client, db, seed, statements):
+    _outro_dono(db, seed)
+    statements.clear()
+
+    resposta = client.post('/api/servicos/limpar-atrasados', json={'user_email': seed['user_email']})
+
+    assert resposta.get_json()['total_removidos'] == 2
+    deletes = [s for s in statements if s.lstrip().upper().startswith('DELETE')]
+    inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT')]
+    assert len(deletes) == 1 and 'servicos' in deletes[0]
+    assert len(inserts) == 1 and 'servicos_archive' in inserts[0]
+    assert _atrasados(db) == 1  # o serviço do outro dono continua
+
+
+def test_archived_vaccination_still_counts(db, seed):
+    from models import PetVaccinationStatus
+    from services.OverdueCleanupService import overdue_cleanup
+    from services.VaccinationService import vaccination_service
+
+    vaccination_service.rebuild(db)
+    assert overdue_cleanup.cleanup(db, owner_id=seed['user_id']) == 2
+    vaccination_service.rebuild(db)
+    db.expire_all()
+    assert db.query(PetVaccinationStatus).filter(PetVaccinationStatus.pet_id.in_(seed['pet_ids'])).count() == 2
+
+
+def test_dashboard_bundle_no_longer_deletes(client, db, seed, statements):
+    statements.clear()
+    resposta = client.post('/api/dashboard/bundle', json={'user_email': seed['user_email']})
+
+    assert resposta.status_code == 200
+    assert 'limpeza' not in resposta.get_json()
+    assert not [s for s in statements if s.lstrip().upper().startswith('DELETE')]
+    assert _atrasados(db) == 2
+
+
+def test_scheduled_job_cleans_all_users(db, seed):
+    from app import _registrar_tarefas, scheduler
+
+    _outro_dono(db, seed)
+    _registrar_tarefas()
+    scheduler.run_job('limpeza-atrasados')
+
+    assert _atrasados(db) == 0
+    assert scheduler.stats()['limpeza-atrasados']['erros'] == 0
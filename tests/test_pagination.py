@@ -0,0 +1,118 @@
+"""Paginação por cursor (keyset) das listagens"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def muitos(db, seed):
+    """25 pets extras com um serviço passado e um futuro cada, e 12 fotos no concurso"""
+    from models import Pet, Servico, Concurso
+
+    hoje = datetime.now().date()
+    pets = [Pet(name=f'Pet {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+            for i in range(25)]
+    db.add_all(pets)
+    db.flush()
+    for i, pet in enumerate(pets):
+        db.add_all([
+            Servico(pet_id=pet.id, clinica_id=seed['clinica_id'], tipo='banho', preco=50.0,
+                    data_agendada=hoje - timedelta(days=i % 7)),
+            Servico(pet_id=pet.id, clinica_id=seed['clinica_id'], tipo='consulta', preco=90.0,
+                    data_agendada=hoje + timedelta(days=1 + i % 5)),
+        ])
+        if i < 12:
+            db.add(Concurso(pet_id=pet.id, user_id=seed['user_id'], imagem_url=f'/uploads/{i}.jpg', votos=i % 4))
+    db.commit()
+    return seed
+
+
+def _todas_as_paginas(client, url, chave, limit):
+    itens, paginas, cursor = [], 0, None
+    while True:
+        separador = '&' if '?' in url else '?'
+        pagina_url = f'{url}{separador}limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        resposta = client.get(pagina_url)
+        assert resposta.status_code == 200
+        dados = resposta.get_json()
+        assert len(dados[chave]) <= limit
+        itens.extend(dados[chave])
+        paginas += 1
+        cursor = dados['next_cursor']
+        if not cursor:
+            return itens, paginas
+
+
+def test_all_pets_mode_is_paginated_by_id(client, muitos):
+    pets, paginas = _todas_as_paginas(client, '/api/pets', 'pets', 10)
+    ids = [p['id'] for p in pets]
+    assert len(ids) == 27 and ids == sorted(set(ids))
+    assert paginas == 3
+
+
+def test_pages_that_do_not_paginate_get_every_pet(client, db, seed):
+    from models import Pet
+
+    db.add_all([Pet(name=f'Pet {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+                for i in range(60)])
+    db.commit()
+
+    # Mesma chamada de listagem.html e concurso.js: sem limit nem cursor
+    dados = client.get(f"/api/pets?user_email={seed['user_email']}").get_json()
+    assert len(dados['pets']) == 62
+    assert dados['next_cursor'] is None
+
+    # Quem pede limit ou cursor continua recebendo páginas
+    pagina = client.get('/api/pets?limit=50').get_json()
+    assert len(pagina['pets']) == 50 and pagina['next_cursor']
+
+
+def test_users_are_paginated(client, muitos, voters):
+    voters(4)
+    users, paginas = _todas_as_paginas(client, '/api/users', 'users', 2)
+    assert [u['email'] for u in users][0] == muitos['user_email']
+    assert len(users) == 5 and paginas == 3
+
+
+def test_past_services_are_paginated_by_date_and_id(client, muitos):
+    servicos, _ = _todas_as_paginas(
+        client, f"/api/servicos?user_email={muitos['user_email']}&incluir_passados=true", 'servicos', 7
+    )
+    chaves = [(s['data_agendada'], s['id']) for s in servicos]
+    assert len(chaves) == 2 * 2 + 25 * 2
+    assert chaves == sorted(set(chaves))
+
+
+def test_contest_photos_follow_the_ranking(client, muitos):
+    completo = client.get('/api/concurso/fotos?limit=200').get_json()
+    fotos, paginas = _todas_as_paginas(client, '/api/concurso/fotos', 'fotos', 5)
+    assert [f['id'] for f in fotos] == [f['id'] for f in completo['fotos']]
+    assert len(fotos) == completo['total'] == 13 and paginas == 3
+
+
+def test_page_reads_only_one_page_of_rows(client, engine, muitos):
+    from sqlalchemy import event
+
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        resposta = client.get('/api/pets?limit=5')
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    assert len(resposta.get_json()['pets']) == 5
+    # limit + 1 linhas (para saber se há próxima página) e não a tabela inteira
+    statement, parameters = next((st, p) for st, p in executadas if 'FROM pets' in st)
+    assert 'LIMIT' in statement and 6 in parameters
+
+
+def test_limit_is_capped_and_bad_cursors_are_rejected(client, muitos):
+    from config.pagination import MAX_LIMIT
+
+    assert client.get('/api/pets?limit=100000').get_json()['limit'] == MAX_LIMIT
+    assert client.get('/api/pets?cursor=nao-e-um-cursor').status_code == 400
+    assert client.get('/api/concurso/fotos?limit=abc').status_code == 400
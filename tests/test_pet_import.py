@@ -0,0 +1,107 @@
+"""Importação de pets em lote (CSV / NDJSON)"""
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def statements(engine):
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement.split()[0], executemany))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    yield capturadas
+    event.remove(engine, 'before_cursor_execute', capturar)
+
+
+def test_csv_import_uses_batched_inserts(client, db, seed, statements, monkeypatch):
+    from models import Pet
+    from services.PetImportService import pet_import_service
+    monkeypatch.setattr(pet_import_service, 'BATCH_SIZE', 100)
+
+    linhas = ['nome,raca,birth_date,especie,behavior_tags,owner_email']
+    for i in range(250):
+        dono = seed['user_email'].upper() if i % 2 else ''
+        linhas.append(f'Pet {i},SRD,2020-05-{1 + i % 28:02d},cão,calmo;brincalhão,{dono}')
+    statements.clear()
+
+    resposta = client.post('/api/pets/import', data='\n'.join(linhas), content_type='text/csv')
+    assert resposta.status_code == 201
+    assert resposta.get_json() == {'success': True, 'importados': 250, 'rejeitados': 0, 'erros': [], 'erros_omitidos': 0}
+
+    assert [s for s in statements if s[0] == 'SELECT'] == []
+    assert [s for s in statements if s[0] == 'INSERT'] == [('INSERT', True)] * 3
+
+    pet = db.query(Pet).filter(Pet.name == 'Pet 7').one()
+    assert pet.get_behavior_tags() == ['calmo', 'brincalhão']
+    assert pet.owner_id == seed['user_id']
+
+
+def test_pets_can_only_be_imported_for_the_current_user(client, db, seed, voters):
+    from models import Pet
+    voters(1)
+
+    corpo = f"nome,raca,birth_date,owner_email\nBolt,SRD,2020-01-01,votante0@petcloud.com\nToby,SRD,2020-01-01,{seed['user_email']}\n"
+    dados = client.post('/api/pets/import', data=corpo, content_type='text/csv').get_json()
+
+    assert (dados['importados'], dados['rejeitados']) == (1, 1)
+    assert dados['erros'] == [{'linha': 2, 'erros': ['owner_email deve ser o do usuário que faz a importação']}]
+    assert db.query(Pet).filter(Pet.name == 'Bolt').count() == 0
+
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+    assert client.post('/api/pets/import', data=corpo, content_type='text/csv').status_code == 401
+
+
+def test_rows_over_the_limit_are_not_counted_as_rejected(client, seed, monkeypatch):
+    from services.PetImportService import pet_import_service
+    monkeypatch.setattr(pet_import_service, 'MAX_ROWS', 3)
+
+    corpo = 'nome,raca,birth_date\n' + ''.join(f'Pet {i},SRD,2020-01-01\n' for i in range(5))
+    dados = client.post('/api/pets/import', data=corpo, content_type='text/csv').get_json()
+
+    # A importação para na quarta linha: 3 importadas, nenhuma rejeitada por erro próprio
+    assert (dados['importados'], dados['rejeitados']) == (3, 0)
+    assert dados['erros'] == [{'linha': 5, 'erros': ['Limite de 3 linhas por importação']}]
+
+
+def test_ndjson_upload_reports_errors_per_row(client, db, seed):
+    from models import Pet
+
+    linhas = [
+        {'nome': 'Bolt', 'raca': 'Husky', 'birth_date': '2019-03-10', 'behavior_tags': ['ativo']},
+        {'nome': 'Sem raça', 'birth_date': '2019-03-10'},
+        'isto não é json',
+        {'nome': 'Luna', 'raca': 'SRD', 'birth_date': '10/03/2019'},
+        {'nome': 'Nina', 'raca': 'SRD', 'birth_date': '2019-03-10', 'owner_email': 'ninguem@petcloud.com'},
+        {'nome': 'Toby', 'raca': 'SRD', 'birth_date': '2019-03-10', 'behavior_tags': 'dócil'},
+    ]
+    corpo = '\n'.join(l if isinstance(l, str) else json.dumps(l) for l in linhas)
+
+    resposta = client.post(f"/api/pets/import?user_email={seed['user_email']}", data={
+        'arquivo': (io.BytesIO(corpo.encode()), 'pets.ndjson'),
+    }, content_type='multipart/form-data')
+    dados = resposta.get_json()
+
+    assert resposta.status_code == 201
+    assert dados['importados'] == 2 and dados['rejeitados'] == 4
+    assert [(e['linha'], e['erros']) for e in dados['erros']] == [
+        (2, ['raca é obrigatório']),
+        (3, ['JSON inválido']),
+        (4, ['birth_date inválida (use YYYY-MM-DD)']),
+        (5, ['owner_email deve ser o do usuário que faz a importação']),
+    ]
+    # Sem owner_email, o pet fica com quem importou
+    importados = db.query(Pet).filter(Pet.name.in_(['Bolt', 'Toby'])).all()
+    assert {p.owner_id for p in importados} == {seed['user_id']}
+
+
+def test_unknown_format_and_all_rejected(client, seed):
+    assert client.post('/api/pets/import', data='x', content_type='text/plain').status_code == 400
+
+    resposta = client.post('/api/pets/import?format=csv', data='nome,raca\nRex,SRD\n')
+    assert resposta.status_code == 422
+    assert resposta.get_json()['erros'] == [{'linha': 2, 'erros': ['birth_date é obrigatório']}]
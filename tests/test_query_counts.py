@@ -0,0 +1,76 @@
+"""
+Garante que as listagens de serviços não fazem uma consulta por linha (N+1).
+
+Cada rota é chamada duas vezes, com poucos e com muitos serviços; o número
+de consultas emitidas precisa ser o mesmo nas duas chamadas.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+LISTING_ROUTES = [
+    ('GET', '/api/servicos?user_email={user_email}', None),
+    ('GET', '/api/servicos?user_email={user_email}&incluir_passados=true', None),
+    ('GET', '/api/dashboard/proximos-agendamentos?user_email={user_email}', None),
+    ('GET', '/api/dashboard/proximos-agendamentos', None),
+    ('GET', '/api/dashboard/bundle?user_email={user_email}', None),
+    ('POST', '/api/servicos/limpar-atrasados', {'user_email': '{user_email}'}),
+    ('POST', '/api/servicos/limpar-atrasados', {}),
+]
+
+
+def _add_pets(db, seed, quantidade):
+    """Pets extras, cada um com um serviço atrasado e um futuro"""
+    from models import Pet, Servico
+
+    hoje = datetime.now().date()
+    for i in range(quantidade):
+        pet = Pet(name=f'Pet {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+        db.add(pet)
+        db.flush()
+        db.add_all([
+            Servico(pet_id=pet.id, clinica_id=seed['clinica_id'], tipo='vacinacao',
+                    data_agendada=hoje - timedelta(days=3), preco=80.0, veterinario='Dra. Silva'),
+            Servico(pet_id=pet.id, clinica_id=seed['clinica_id'], tipo='banho',
+                    data_agendada=hoje + timedelta(days=2), preco=50.0, veterinario='Dra. Silva'),
+        ])
+    db.commit()
+
+
+@pytest.fixture
+def query_counter(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.mark.parametrize('method,url,body', LISTING_ROUTES)
+def test_listing_query_count_is_constant(client, db, seed, query_counter, method, url, body):
+    url = url.format(user_email=seed['user_email'])
+    if body:
+        body = {key: value.format(user_email=seed['user_email']) for key, value in body.items()}
+
+    contagens = []
+    for quantidade in (1, 15):
+        _add_pets(db, seed, quantidade)
+        query_counter.clear()
+        response = client.open(url, method=method, json=body)
+        assert response.status_code < 400, response.get_json()
+        contagens.append(len(query_counter))
+
+    assert contagens[0] == contagens[1], f'consultas cresceram com N: {contagens}'
+
+
+def test_listar_servicos_keeps_pet_and_clinic_names(client, seed):
+    response = client.get(f"/api/servicos?user_email={seed['user_email']}&incluir_passados=true")
+    servicos = response.get_json()['servicos']
+
+    assert len(servicos) == 4
+    assert {servico['pet_nome'] for servico in servicos} == {'Mia', 'Thor'}
+    assert {servico['clinica'] for servico in servicos} == {'VetCare'}
@@ -0,0 +1,103 @@
+"""
+Garante que as consultas das rotas quentes usam índices.
+
+Cada rota é chamada com o test client; todos os SELECTs emitidos são
+capturados e reexecutados com EXPLAIN QUERY PLAN. O teste falha se algum
+plano fizer SCAN completo de uma tabela do modelo.
+"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+# Tabelas carregadas inteiras de propósito (catálogo de clínicas em memória)
+WHOLE_TABLE_LOADS = {'clinicas'}
+
+HOT_ROUTES = [
+    ('GET', '/api/pets?user_email={user_email}', None),
+    ('GET', '/api/pets/{pet_id}', None),
+    ('GET', '/api/pets/{pet_id}/main-veterinarian', None),
+    ('GET', '/api/pets/{pet_id}/full', None),
+    ('GET', '/api/pets/{pet_id}/full?tipos=banho,vacinacao&page=1&per_page=5', None),
+    ('GET', '/api/dashboard/stats?user_email={user_email}', None),
+    ('GET', '/api/dashboard/vacinas-vencidas?user_email={user_email}', None),
+    ('GET', '/api/dashboard/proximos-agendamentos?user_email={user_email}', None),
+    ('GET', '/api/dashboard/proximos-agendamentos', None),
+    ('GET', '/api/dashboard/bundle?user_email={user_email}', None),
+    ('GET', '/api/servicos?user_email={user_email}', None),
+    ('GET', '/api/servicos?user_email={user_email}&incluir_passados=true', None),
+    ('POST', '/api/servicos', {'pet_id': '{pet_id}', 'tipo': 'vacinacao', 'clinica_id': '{clinica_id}'}),
+    ('POST', '/api/servicos/limpar-atrasados', {'user_email': '{user_email}'}),
+    ('POST', '/api/servicos/limpar-atrasados', {}),
+]
+
+
+def _format(value, seed):
+    if isinstance(value, str):
+        return value.format(user_email=seed['user_email'], pet_id=seed['pet_ids'][0], clinica_id=seed['clinica_id'])
+    if isinstance(value, dict):
+        return {key: _format(item, seed) for key, item in value.items()}
+    return value
+
+
+def _full_scans(engine, statement, parameters):
+    """Tabelas do modelo que o plano de execução percorre inteiras"""
+    from config.database import Base
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        details = [row[3] for row in cursor.fetchall()]
+    finally:
+        raw.close()
+
+    scans = []
+    for detail in details:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) in Base.metadata.tables and match.group(1) not in WHOLE_TABLE_LOADS:
+            scans.append(detail)
+    return scans
+
+
+@pytest.fixture
+def captured_selects(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.mark.parametrize('method,url,body', HOT_ROUTES)
+def test_hot_route_queries_use_indexes(client, engine, seed, captured_selects, method, url, body):
+    body = _format(body, seed)
+    if body and 'tipo' in body:
+        body['data_agendada'] = (datetime.now().date() + timedelta(days=30)).isoformat()
+
+    response = client.open(_format(url, seed), method=method, json=body)
+    assert response.status_code < 400, response.get_json()
+    assert captured_selects, 'a rota não executou nenhuma consulta'
+
+    problemas = []
+    for statement, parameters in captured_selects:
+        scans = _full_scans(engine, statement, parameters)
+        if scans:
+            problemas.append(f'{scans}\n{statement}')
+
+    assert not problemas, 'Consultas com full table scan:\n\n' + '\n\n'.join(problemas)
+
+
+def test_concurso_lookup_by_pet_uses_index(engine, db, seed):
+    from models import Concurso
+
+    query = db.query(Concurso).filter(Concurso.pet_id == seed['pet_ids'][0])
+    compiled = query.statement.compile(engine, compile_kwargs={'literal_binds': True})
+
+    assert _full_scans(engine, str(compiled), ()) == []
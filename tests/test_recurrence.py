@@ -0,0 +1,193 @@
+"""Agendamentos recorrentes e agendador de tarefas"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def statements(engine):
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement.split()[0], executemany))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    yield capturadas
+    event.remove(engine, 'before_cursor_execute', capturar)
+
+
+def _criar(client, seed, **campos):
+    corpo = {'pet_id': seed['pet_ids'][1], 'tipo': 'banho', 'clinica_id': seed['clinica_id'],
+             'intervalo': 1, 'unidade': 'semanas', 'data_inicio': datetime.now().date().isoformat(), **campos}
+    resposta = client.post('/api/servicos/recorrentes', json=corpo)
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()['recorrencia']
+
+
+def _datas(db, recorrencia_id):
+    from models import Servico
+    db.expire_all()
+    return [s.data_agendada for s in db.query(Servico).filter(Servico.recorrencia_id == recorrencia_id)
+            .order_by(Servico.data_agendada)]
+
+
+def test_occurrences_in_the_horizon_are_created_with_one_insert(client, db, seed, statements):
+    hoje = datetime.now().date()
+    statements.clear()
+    regra = _criar(client, seed)
+
+    assert _datas(db, regra['id']) == [hoje + timedelta(weeks=k) for k in range(13)]  # horizonte de 90 dias
+    inserts_servicos = [s for s in statements if s == ('INSERT', True)]
+    assert len(inserts_servicos) == 1
+    assert regra['ocorrencias_geradas'] == 13 and regra['ativo']
+
+
+def test_series_limits_and_past_start(client, db, seed):
+    hoje = datetime.now().date()
+    por_total = _criar(client, seed, intervalo=10, unidade='dias', max_ocorrencias=3)
+    assert len(_datas(db, por_total['id'])) == 3 and not por_total['ativo']
+
+    por_data = _criar(client, seed, intervalo=1, unidade='meses', data_fim=(hoje + timedelta(days=70)).isoformat())
+    assert len(_datas(db, por_data['id'])) == 3
+
+    # Início no passado: nenhuma ocorrência antes de hoje
+    passado = _criar(client, seed, intervalo=3, unidade='dias', data_inicio=(hoje - timedelta(days=10)).isoformat())
+    datas = _datas(db, passado['id'])
+    assert datas[0] == hoje + timedelta(days=2)
+
+    assert client.post('/api/servicos/recorrentes', json={
+        'pet_id': seed['pet_ids'][1], 'tipo': 'banho', 'clinica_id': seed['clinica_id'],
+        'intervalo': 0, 'unidade': 'anos', 'data_inicio': hoje.isoformat()
+    }).status_code == 400
+
+
+def test_background_job_extends_the_horizon(client, db, seed):
+    from services.RecurrenceService import recurrence_service
+
+    hoje = datetime.now().date()
+    regra = _criar(client, seed)
+
+    db.expire_all()
+    assert recurrence_service.extend_all(db, hoje=hoje + timedelta(days=28)) == 4
+    assert recurrence_service.extend_all(db, hoje=hoje + timedelta(days=28)) == 0
+    datas = _datas(db, regra['id'])
+    assert len(datas) == 17 and len(set(datas)) == 17
+
+
+def test_clinic_change_updates_future_occurrences_in_one_statement(client, db, seed, statements):
+    from models import Clinica, Servico
+
+    outra = Clinica(nome='PetSpa', tipo_servico='banho', preco_servico=65.0, veterinario='Dr. Lima')
+    db.add(outra)
+    db.commit()
+    regra = _criar(client, seed)
+    a_partir_de = datetime.now().date() + timedelta(days=30)
+
+    statements.clear()
+    resposta = client.put(f"/api/servicos/recorrentes/{regra['id']}",
+                          json={'clinica_id': outra.id, 'a_partir_de': a_partir_de.isoformat()})
+    assert resposta.status_code == 200
+    assert resposta.get_json()['atualizadas'] == 8
+    assert [s for s in statements if s[0] == 'UPDATE' and s[1]] == []
+
+    db.expire_all()
+    ocorrencias = db.query(Servico).filter(Servico.recorrencia_id == regra['id']).all()
+    assert {(s.data_agendada >= a_partir_de, s.veterinario) for s in ocorrencias} == {
+        (False, 'Dra. Silva'), (True, 'Dr. Lima')
+    }
+
+
+def test_schedule_change_regenerates_from_the_next_occurrence(client, db, seed):
+    hoje = datetime.now().date()
+    regra = _criar(client, seed, data_inicio=(hoje + timedelta(days=2)).isoformat())
+
+    resposta = client.put(f"/api/servicos/recorrentes/{regra['id']}", json={'intervalo': 2})
+    dados = resposta.get_json()
+    assert resposta.status_code == 200
+    assert dados['removidas'] == 13 and dados['criadas'] == 7
+    assert _datas(db, regra['id']) == [hoje + timedelta(days=2 + 14 * k) for k in range(7)]
+
+
+def test_cancel_removes_future_occurrences(client, db, seed):
+    regra = _criar(client, seed)
+    resposta = client.delete(f"/api/servicos/recorrentes/{regra['id']}")
+    assert resposta.get_json()['removidas'] == 13
+    assert _datas(db, regra['id']) == []
+
+    from services.RecurrenceService import recurrence_service
+    assert recurrence_service.extend_all(db) == 0
+
+
+def test_concurrent_generation_of_the_same_series_writes_once(client, db, seed, engine):
+    from sqlalchemy.orm.exc import StaleDataError
+    from config.database import SessionLocal
+    from models import AgendamentoRecorrente
+    from services.RecurrenceService import recurrence_service
+
+    hoje = datetime.now().date()
+    regra = _criar(client, seed)
+    futuro = hoje + timedelta(days=60)
+
+    a, b = SessionLocal(), SessionLocal()
+    try:
+        # b lê a regra antes de a gravar a extensão da mesma série
+        regras_b = b.query(AgendamentoRecorrente).all()
+        assert recurrence_service.extend_all(a, hoje=futuro) > 0
+        assert recurrence_service.generate(b, regras_b, ate=recurrence_service.horizon(futuro)) > 0
+        with pytest.raises(StaleDataError):
+            b.commit()
+        b.rollback()
+    finally:
+        a.close()
+        b.close()
+    datas = _datas(db, regra['id'])
+    assert len(datas) == len(set(datas))
+
+
+def test_scheduler_runs_due_jobs_and_survives_errors():
+    from services.SchedulerService import SchedulerService
+
+    agendador = SchedulerService()
+    execucoes = []
+    agendador.every(3600, 'conta', lambda: execucoes.append(1), imediata=True)
+    agendador.every(3600, 'quebra', lambda: 1 / 0, imediata=True)
+    agendador.every(3600, 'depois', lambda: execucoes.append(2))
+
+    assert sorted(agendador.run_pending()) == ['conta', 'quebra']
+    assert agendador.run_pending() == []
+    assert execucoes == [1]
+    estatisticas = agendador.stats()
+    assert estatisticas['quebra']['erros'] == 1 and estatisticas['conta']['execucoes'] == 1
+
+
+@pytest.fixture
+def agendador(app_module, monkeypatch):
+    from services.SchedulerService import SchedulerService
+
+    novo = SchedulerService()
+    monkeypatch.setattr(app_module, 'scheduler', novo)
+    yield novo
+    novo.stop()
+
+
+def test_web_process_starts_the_scheduler_without_running_jobs_at_once(app_module, agendador, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'SCHEDULER_IN_WEB', False)
+    app_module._iniciar_agendador()
+    assert agendador.stats() == {}
+
+    monkeypatch.setitem(app_module.app.config, 'SCHEDULER_IN_WEB', True)
+    app_module._iniciar_agendador()
+    assert set(agendador.stats()) == {'recorrencias', 'limpeza-atrasados', 'uploads-expirados'}
+    # Nenhuma limpeza no primeiro ciclo de cada worker: só depois de um intervalo
+    assert agendador.run_pending() == []
+
+
+def test_scheduled_jobs_command_runs_each_job_once(app_module, agendador, monkeypatch):
+    executadas = []
+    monkeypatch.setattr(agendador, 'run_job', executadas.append)
+
+    resultado = app_module.app.test_cli_runner().invoke(args=['run-scheduled-jobs', '--once'])
+
+    assert resultado.exit_code == 0
+    assert sorted(executadas) == ['limpeza-atrasados', 'recorrencias', 'uploads-expirados']
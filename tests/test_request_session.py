@@ -0,0 +1,80 @@
+"""Sessão do banco por requisição e métricas expostas nos cabeçalhos X-DB-*"""
+from sqlalchemy import event
+
+
+def test_request_session_is_reused_and_closed(app_module, engine):
+    from config.request_session import get_request_db
+
+    with app_module.app.test_request_context('/'):
+        db = get_request_db()
+        assert get_request_db() is db
+        db.connection()
+        assert engine.pool.checkedout() == 1
+
+    assert engine.pool.checkedout() == 0
+
+
+def test_db_stats_headers_match_executed_queries(client, engine, seed):
+    executadas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', contar)
+    try:
+        response = client.get(f"/api/servicos?user_email={seed['user_email']}&incluir_passados=true")
+    finally:
+        event.remove(engine, 'after_cursor_execute', contar)
+
+    assert response.status_code == 200
+    assert int(response.headers['X-DB-Queries']) == len(executadas)
+    assert float(response.headers['X-DB-Time-Ms']) > 0
+    # Uma linha lida por serviço (a clínica vem no mesmo JOIN)
+    assert int(response.headers['X-DB-Rows']) == len(response.get_json()['servicos'])
+
+
+def test_db_rows_counts_rows_read(client, db, seed):
+    from datetime import datetime
+    from models import Pet
+
+    db.add_all([Pet(name=f'Pet {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+                for i in range(30)])
+    db.commit()
+
+    response = client.get('/api/pets')
+
+    assert len(response.get_json()['pets']) == 32
+    assert response.headers['X-DB-Queries'] == '1'
+    assert response.headers['X-DB-Rows'] == '32'
+
+
+def test_db_rows_counts_rows_written(client, db, seed):
+    from models import Servico
+
+    servico = db.query(Servico).filter(Servico.pet_id == seed['pet_ids'][0], Servico.tipo == 'banho').one()
+    response = client.delete(f'/api/servicos/{servico.id}')
+
+    assert response.status_code == 200
+    assert int(response.headers['X-DB-Rows']) >= 1
+
+
+def test_routes_release_connections_on_every_path(client, engine, seed):
+    # A sessão do fixture seed pode manter uma conexão própria
+    conexoes_antes = engine.pool.checkedout()
+    respostas = [
+        client.post('/api/auth/login', json={'email': seed['user_email'], 'password': 'errada'}),
+        client.get('/api/pets/999'),
+        client.post('/api/pets', json={'nome': 'Rex', 'raca': 'SRD', 'birth_date': '2020-01-01',
+                                       'user_email': seed['user_email']}),
+    ]
+
+    assert [r.status_code for r in respostas] == [401, 404, 201]
+    assert engine.pool.checkedout() == conexoes_antes
+
+
+def test_db_headers_only_on_requests_that_query(client):
+    response = client.get('/api/pets/999/main-veterinarian')
+    assert 'X-DB-Queries' in response.headers
+
+    response = client.get('/api/auth/oauth-status')
+    assert 'X-DB-Queries' not in response.headers
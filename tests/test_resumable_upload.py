@@ -0,0 +1,127 @@
+"""Uploads retomáveis: sessão, blocos numerados, faixas recebidas e conclusão"""
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 10  # 2568 bytes
+
+
+@pytest.fixture
+def uploads(client, monkeypatch, tmp_path):
+    from services.ResumableUploadService import resumable_uploads
+
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(resumable_uploads, 'tamanho_bloco', 1000)
+    return tmp_path
+
+
+def _abrir(client, seed, destino='pet', tamanho=len(PNG), **extra):
+    return client.post('/api/uploads', json={
+        'destino': destino, 'pet_id': seed['pet_ids'][0], 'tamanho': tamanho,
+        'user_email': seed['user_email'], **extra,
+    })
+
+
+def _bloco(client, upload_id, indice, conteudo=PNG):
+    return client.put(f'/api/uploads/{upload_id}/blocos/{indice}', data=conteudo[indice * 1000:(indice + 1) * 1000],
+                      content_type='application/octet-stream')
+
+
+def test_retries_only_send_the_missing_chunks(client, db, seed, uploads):
+    from models import Pet
+
+    resposta = _abrir(client, seed)
+    assert resposta.status_code == 201
+    upload = resposta.get_json()['upload']
+    assert (upload['total_blocos'], upload['faltando']) == (3, [0, 1, 2])
+
+    assert _bloco(client, upload['upload_id'], 0).status_code == 200
+    assert _bloco(client, upload['upload_id'], 2).status_code == 200
+
+    # A conexão caiu: o cliente pergunta o que já chegou e reenvia só o que falta
+    status = client.get(f"/api/uploads/{upload['upload_id']}").get_json()['upload']
+    assert status['recebidos'] == [[0, 1000], [2000, len(PNG)]]
+    assert status['faltando'] == [1]
+    assert client.post(f"/api/uploads/{upload['upload_id']}/concluir").status_code == 409
+
+    assert _bloco(client, upload['upload_id'], 1).get_json()['upload']['completo'] is True
+    resposta = client.post(f"/api/uploads/{upload['upload_id']}/concluir")
+
+    hash_hex = hashlib.sha256(PNG).hexdigest()
+    assert resposta.status_code == 200
+    assert resposta.get_json()['photo_url'] == f'/uploads/{hash_hex[:2]}/{hash_hex[2:4]}/{hash_hex}.png'
+    assert db.get(Pet, seed['pet_ids'][0]).photo_url == resposta.get_json()['photo_url']
+    assert client.get(f"/api/uploads/{upload['upload_id']}").status_code == 404
+    assert not list((uploads / '.tmp' / 'sessoes').iterdir())
+
+
+def test_contest_uploads_use_the_contest_rules(client, seed, uploads):
+    # Mia já está no concurso: o erro aparece antes de qualquer bloco ser enviado
+    assert _abrir(client, seed, destino='concurso').status_code == 400
+
+    client.delete(f"/api/concurso/deletar/1?user_email={seed['user_email']}")
+    upload = _abrir(client, seed, destino='concurso', descricao='Mia no sol').get_json()['upload']
+    for indice in range(3):
+        _bloco(client, upload['upload_id'], indice)
+    resposta = client.post(f"/api/uploads/{upload['upload_id']}/concluir")
+
+    assert resposta.status_code == 201
+    assert resposta.get_json()['concurso']['descricao'] == 'Mia no sol'
+
+
+def test_chunks_are_validated_as_they_arrive(client, seed, uploads, monkeypatch):
+    upload_id = _abrir(client, seed).get_json()['upload']['upload_id']
+
+    assert _bloco(client, upload_id, 0, b'GET / HTTP/1.1\r\n' * 100).status_code == 415
+    assert _bloco(client, upload_id, 1, PNG[:1500]).status_code == 400  # tamanho errado
+    assert _bloco(client, upload_id, 3).status_code == 400  # fora do intervalo
+    assert client.get(f'/api/uploads/{upload_id}').get_json()['upload']['recebidos'] == []
+
+    monkeypatch.setitem(client.application.config, 'MAX_IMAGE_SIZE', 1024)
+    assert _abrir(client, seed).status_code == 413
+
+
+def test_abandoned_sessions_expire(client, db, seed, uploads):
+    from models import UploadSessao
+    from services.ResumableUploadService import resumable_uploads
+
+    upload_id = _abrir(client, seed).get_json()['upload']['upload_id']
+    _bloco(client, upload_id, 0)
+    (uploads / '.tmp' / 'sessoes' / 'perdida').mkdir()
+
+    assert resumable_uploads.expire(db, str(uploads)) == 0
+    assert resumable_uploads.expire(db, str(uploads), agora=datetime.now() + timedelta(days=2)) == 1
+    assert db.query(UploadSessao).count() == 0
+    assert not list((uploads / '.tmp' / 'sessoes').iterdir())
+
+
+def test_uploads_belong_to_the_user_who_opened_them(client, seed, uploads, voters):
+    upload_id = _abrir(client, seed).get_json()['upload']['upload_id']
+    outro = voters(1)[0]
+
+    # Outra pessoa não vê, não envia, não conclui e não cancela o upload
+    assert client.get(f'/api/uploads/{upload_id}', headers=outro).status_code == 404
+    assert client.put(f'/api/uploads/{upload_id}/blocos/0', data=PNG[:1000], headers=outro,
+                      content_type='application/octet-stream').status_code == 404
+    assert client.post(f'/api/uploads/{upload_id}/concluir', headers=outro).status_code == 404
+    assert client.delete(f'/api/uploads/{upload_id}', headers=outro).status_code == 404
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 200
+
+    # Nem abre uploads para o pet de outra pessoa
+    assert client.post('/api/uploads', json={
+        'destino': 'pet', 'pet_id': seed['pet_ids'][0], 'tamanho': len(PNG),
+    }, headers=outro).status_code == 404
+
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+    assert _abrir(client, seed).status_code == 404
+
+
+def test_cleanup_interval_comes_from_the_environment(monkeypatch):
+    from services.ResumableUploadService import ResumableUploadService
+
+    monkeypatch.delenv('UPLOAD_CLEANUP_INTERVAL', raising=False)
+    assert ResumableUploadService().job_interval == ResumableUploadService.DEFAULT_JOB_INTERVAL
+    monkeypatch.setenv('UPLOAD_CLEANUP_INTERVAL', '600')
+    assert ResumableUploadService().job_interval == 600
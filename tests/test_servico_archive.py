@@ -0,0 +1,145 @@
+"""Serviços passados vão para servicos_archive e continuam nas rotas de histórico"""
+from datetime import datetime, timedelta
+
+
+def _contar(db, modelo, **filtros):
+    db.expire_all()
+    return db.query(modelo).filter_by(**filtros).count()
+
+
+def test_new_service_archives_overdue_of_same_type(client, db, seed):
+    from models import Servico, ServicoArquivado
+
+    pet_id = seed['pet_ids'][0]
+    resposta = client.post('/api/servicos', json={
+        'pet_id': pet_id, 'tipo': 'vacinacao', 'clinica_id': seed['clinica_id'],
+        'data_agendada': (datetime.now().date() + timedelta(days=10)).isoformat()
+    })
+
+    assert resposta.status_code == 201
+    assert _contar(db, Servico, pet_id=pet_id, tipo='vacinacao') == 1  # só o novo
+    assert _contar(db, ServicoArquivado, pet_id=pet_id, tipo='vacinacao') == 1
+
+    # O veterinário principal continua contando o serviço arquivado
+    veterinario = client.get(f'/api/pets/{pet_id}/main-veterinarian').get_json()
+    assert veterinario['main_veterinarian'] == 'Dra. Silva'
+    assert veterinario['total_services'] == 3
+
+
+def test_archive_moves_in_batches(db, seed, monkeypatch):
+    from models import Servico, ServicoArquivado
+    from services.ServicoArchiveService import servico_archive
+
+    hoje = datetime.now().date()
+    db.add_all([Servico(pet_id=seed['pet_ids'][1], tipo='banho', data_agendada=hoje - timedelta(days=i), preco=50.0)
+                for i in range(1, 6)])
+    db.commit()
+    monkeypatch.setattr(servico_archive, 'BATCH_SIZE', 3)
+
+    assert servico_archive.archive(db, Servico.data_agendada < hoje) == 7
+    assert _contar(db, ServicoArquivado) == 7
+    assert db.query(Servico).filter(Servico.data_agendada < hoje).count() == 0
+
+
+def test_move_binds_a_bounded_number_of_ids_per_statement(db, engine, seed, monkeypatch):
+    from sqlalchemy import event
+    from models import Servico, ServicoArquivado
+    from services.ServicoArchiveService import servico_archive
+
+    assert servico_archive.BATCH_SIZE <= 900 and servico_archive.IDS_POR_COMANDO <= 900
+    hoje = datetime.now().date()
+    db.add_all([Servico(pet_id=seed['pet_ids'][1], tipo='banho', data_agendada=hoje - timedelta(days=i))
+                for i in range(1, 6)])
+    db.commit()
+    monkeypatch.setattr(servico_archive, 'IDS_POR_COMANDO', 2)
+    parametros = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(('INSERT INTO servicos_archive', 'DELETE FROM servicos')):
+            parametros.append(len(parameters))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        movidos = servico_archive.move(db, Servico.data_agendada < hoje)
+        db.commit()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    assert movidos == 7
+    assert max(parametros) <= 3  # 2 ids (+ arquivado_em no INSERT)
+    assert _contar(db, ServicoArquivado) == 7
+
+
+def test_history_lists_archived_and_past_services_newest_first(client, db, seed):
+    from models import Servico
+    from services.ServicoArchiveService import servico_archive
+
+    hoje = datetime.now().date()
+    servico_archive.archive(db, Servico.data_agendada < hoje)
+    db.add(Servico(pet_id=seed['pet_ids'][0], tipo='banho', data_agendada=hoje - timedelta(days=1), preco=50.0))
+    db.commit()
+
+    primeira = client.get(f"/api/servicos/historico?user_email={seed['user_email']}&limit=2").get_json()
+    assert [s['arquivado'] for s in primeira['servicos']] == [False, True]
+    assert primeira['servicos'][1]['clinica'] == 'VetCare'
+
+    segunda = client.get(f"/api/servicos/historico?user_email={seed['user_email']}&limit=2"
+                         f"&cursor={primeira['next_cursor']}").get_json()
+    assert len(segunda['servicos']) == 1 and segunda['next_cursor'] is None
+    datas = [s['data_agendada'] for s in primeira['servicos'] + segunda['servicos']]
+    assert datas == sorted(datas, reverse=True)
+
+    do_pet = client.get(f"/api/pets/{seed['pet_ids'][1]}/historico").get_json()
+    assert [s['tipo'] for s in do_pet['servicos']] == ['vacinacao']
+    assert client.get('/api/pets/9999/historico').status_code == 404
+
+
+def test_pet_details_timeline_includes_archived_services(client, db, seed):
+    from models import Servico
+    from services.ServicoArchiveService import servico_archive
+
+    pet_id = seed['pet_ids'][0]
+    antes = client.get(f'/api/pets/{pet_id}/full?per_page=100').get_json()['servicos']
+    hoje = datetime.now().date()
+    assert servico_archive.archive(db, Servico.data_agendada < hoje) > 0
+
+    # Mesma chamada de detalhes.html
+    dados = client.get(f'/api/pets/{pet_id}/full?per_page=100&tipos=banho,vacinacao,consulta').get_json()
+    depois = dados['servicos']
+
+    assert depois['total'] == antes['total']
+    assert [s['id'] for s in depois['items']] == [s['id'] for s in antes['items']]
+    assert any(s['arquivado'] for s in depois['items'])
+    assert all(s['arquivado'] is False for s in antes['items'])
+
+    # A página esconde editar/apagar nos arquivados: a API não os encontra mais
+    arquivado = next(s for s in depois['items'] if s['arquivado'])
+    assert client.delete(f"/api/servicos/{arquivado['id']}").status_code == 404
+    assert client.put(f"/api/servicos/{arquivado['id']}", json={'preco': 1.0}).status_code == 404
+    assert dados['pet']['servicos'] == depois['items']
+
+    # Sem tipos, as clínicas vêm dos tipos de todo o histórico (também dos arquivados)
+    assert client.get(f'/api/pets/{pet_id}/full').get_json()['clinicas'] == dados['clinicas']
+
+
+def test_month_spending_includes_archived_services(client, db, seed):
+    from models import ServicoArquivado
+
+    hoje = datetime.now().date()
+    db.add(ServicoArquivado(id=9000, pet_id=seed['pet_ids'][0], tipo='consulta',
+                            data_agendada=hoje.replace(day=1), preco=120.0))
+    db.commit()
+
+    bundle = client.get(f"/api/dashboard/bundle?user_email={seed['user_email']}&sections=stats").get_json()
+    esperado = 120.0 + (100.0 if (hoje + timedelta(days=5)).month == hoje.month else 0)
+    assert bundle['stats']['gastos_mes'] == esperado
+
+
+def test_deleting_pet_removes_its_history(client, db, seed):
+    from models import Servico, ServicoArquivado
+    from services.ServicoArchiveService import servico_archive
+
+    servico_archive.archive(db, Servico.data_agendada < datetime.now().date())
+    assert client.delete(f"/api/pets/{seed['pet_ids'][0]}").status_code == 200
+    assert _contar(db, ServicoArquivado, pet_id=seed['pet_ids'][0]) == 0
+    assert _contar(db, ServicoArquivado) == 1
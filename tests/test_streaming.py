@@ -0,0 +1,68 @@
+"""Exportação NDJSON em streaming (?stream=ndjson)"""
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def pets_extras(db, seed):
+    from models import Pet
+    db.add_all([Pet(name=f'Pet {i}', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+                for i in range(73)])
+    db.commit()
+    return seed
+
+
+def _linhas(resposta):
+    return [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+
+
+def test_pets_export_streams_every_row_in_batches(client, engine, pets_extras, monkeypatch):
+    import config.streaming as streaming
+    monkeypatch.setattr(streaming, 'STREAM_BATCH_SIZE', 10)
+
+    selects = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        resposta = client.get('/api/pets?stream=ndjson')
+        assert resposta.is_streamed
+        assert resposta.mimetype == 'application/x-ndjson'
+        pedacos = list(resposta.response)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    # Um bloco por lote de 10 linhas, lidos de uma única consulta sem JOIN com users
+    assert len(pedacos) == 8
+    assert len(selects) == 1 and 'JOIN' not in selects[0] and 'behavior_tags' not in selects[0]
+
+    pets = [json.loads(linha) for pedaco in pedacos for linha in pedaco.decode().splitlines()]
+    assert len(pets) == 75
+    assert [p['id'] for p in pets] == sorted(p['id'] for p in pets)
+    assert pets[0] == client.get('/api/pets?limit=1').get_json()['pets'][0]
+
+
+def test_pets_export_respects_the_user_filter(app_module, client, db, pets_extras):
+    from models import User, Pet
+    outro = User(name='Bia', email='bia@petcloud.com', password='x')
+    db.add(outro)
+    db.flush()
+    db.add(Pet(name='Rex', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=outro.id))
+    db.commit()
+
+    token = app_module.auth_service.issue_token(outro)
+    pets = _linhas(client.get('/api/pets?stream=ndjson', headers={'Authorization': f'Bearer {token}'}))
+    assert [p['name'] for p in pets] == ['Rex']
+
+
+def test_users_export(client, voters):
+    voters(3)
+    users = _linhas(client.get('/api/users?stream=ndjson'))
+    assert [u['email'] for u in users] == ['ana@petcloud.com'] + [f'votante{i}@petcloud.com' for i in range(3)]
+    assert set(users[0]) == {'id', 'name', 'email'}
@@ -0,0 +1,78 @@
+"""Uploads servidos com cache imutável, respostas condicionais, Range e X-Sendfile/X-Accel-Redirect"""
+import hashlib
+
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+HASH = hashlib.sha256(PNG).hexdigest()
+CAMINHO = f'{HASH[:2]}/{HASH[2:4]}/{HASH}.png'
+
+
+@pytest.fixture
+def uploads(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    (tmp_path / HASH[:2] / HASH[2:4]).mkdir(parents=True)
+    (tmp_path / CAMINHO).write_bytes(PNG)
+    (tmp_path / '20251214_184024_Mia.jpg').write_bytes(b'\xff\xd8\xff antiga')
+    return tmp_path
+
+
+def test_content_named_files_are_cached_as_immutable(client, uploads):
+    resposta = client.get(f'/uploads/{CAMINHO}')
+
+    assert resposta.data == PNG
+    assert resposta.cache_control.immutable
+    assert resposta.cache_control.max_age == 365 * 24 * 3600
+    assert resposta.get_etag() == (HASH, False)
+    assert resposta.last_modified is not None
+
+    revalidada = client.get(f'/uploads/{CAMINHO}', headers={'If-None-Match': f'"{HASH}"'})
+    assert revalidada.status_code == 304
+    assert revalidada.data == b''
+
+
+def test_legacy_files_are_revalidated(client, uploads):
+    resposta = client.get('/uploads/20251214_184024_Mia.jpg')
+
+    assert resposta.cache_control.no_cache
+    assert not resposta.cache_control.immutable
+    assert client.get('/uploads/20251214_184024_Mia.jpg', headers={
+        'If-Modified-Since': resposta.headers['Last-Modified']
+    }).status_code == 304
+
+
+def test_range_requests_return_partial_content(client, uploads):
+    resposta = client.get(f'/uploads/{CAMINHO}', headers={'Range': 'bytes=8-15'})
+
+    assert resposta.status_code == 206
+    assert resposta.data == PNG[8:16]
+    assert resposta.headers['Content-Range'] == f'bytes 8-15/{len(PNG)}'
+
+
+def test_missing_variants_are_not_cached_under_the_variant_url(client, uploads):
+    resposta = client.get(f'/uploads/{CAMINHO}?variant=thumb')
+
+    assert resposta.data == PNG
+    assert not resposta.cache_control.immutable
+
+
+@pytest.mark.parametrize('modo, cabecalho', [
+    ('x-accel-redirect', 'X-Accel-Redirect'),
+    ('x-sendfile', 'X-Sendfile'),
+])
+def test_sendfile_modes_leave_the_bytes_to_the_web_server(client, uploads, monkeypatch, modo, cabecalho):
+    monkeypatch.setitem(client.application.config, 'UPLOAD_SENDFILE', modo)
+
+    resposta = client.get(f'/uploads/{CAMINHO}')
+
+    assert resposta.data == b''
+    assert resposta.headers[cabecalho] == (
+        f'/_uploads/{CAMINHO}' if modo == 'x-accel-redirect' else str(uploads / CAMINHO)
+    )
+    assert resposta.mimetype == 'image/png'
+    assert resposta.cache_control.immutable
+
+    revalidada = client.get(f'/uploads/{CAMINHO}', headers={'If-None-Match': f'"{HASH}"'})
+    assert revalidada.status_code == 304
+    assert cabecalho not in revalidada.headers
+    assert client.get('/uploads/../app.py').status_code == 404
@@ -0,0 +1,155 @@
+"""Uploads gravados pelo conteúdo, sem duplicatas e com contagem de referências"""
+import io
+from datetime import datetime
+
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 200
+
+
+@pytest.fixture
+def uploads(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+def _arquivos(uploads):
+    return sorted(str(p.relative_to(uploads)) for p in uploads.rglob('*') if p.is_file() and '.tmp' not in p.parts)
+
+
+def _novo_pet(client, seed, conteudo=PNG, nome='Luna'):
+    resposta = client.post('/api/pets', data={
+        'nome': nome, 'raca': 'SRD', 'birth_date': '2021-05-01', 'user_email': seed['user_email'],
+        'foto': (io.BytesIO(conteudo), 'luna.PNG'),
+    }, content_type='multipart/form-data')
+    assert resposta.status_code == 201
+    return resposta.get_json()['pet']
+
+
+def test_upload_is_stored_under_a_sharded_content_hash(client, seed, uploads):
+    import hashlib
+
+    pet = _novo_pet(client, seed)
+    hash_hex = hashlib.sha256(PNG).hexdigest()
+
+    assert pet['photo_url'] == f'/uploads/{hash_hex[:2]}/{hash_hex[2:4]}/{hash_hex}.png'
+    assert client.get(pet['photo_url']).data == PNG
+    assert not list((uploads / '.tmp').iterdir())
+
+
+def test_duplicate_uploads_share_one_file_until_the_last_reference_goes(client, db, seed, uploads):
+    from models import Arquivo
+
+    primeiro = _novo_pet(client, seed)
+    segundo = _novo_pet(client, seed, nome='Nina')
+    resposta = client.post('/api/concurso/enviar', data={
+        'pet_id': str(primeiro['id']), 'user_email': seed['user_email'], 'imagem': (io.BytesIO(PNG), 'c.png'),
+    }, content_type='multipart/form-data')
+    concurso = resposta.get_json()['concurso']
+
+    assert primeiro['photo_url'] == segundo['photo_url'] == concurso['imagem_url']
+    assert len(_arquivos(uploads)) == 1
+    assert db.query(Arquivo).one().referencias == 3
+
+    # Apagar o primeiro pet libera a foto dele e a do concurso; o arquivo continua para o segundo
+    assert client.delete(f"/api/pets/{primeiro['id']}").status_code == 200
+    db.expire_all()
+    assert db.query(Arquivo).one().referencias == 1
+    assert len(_arquivos(uploads)) == 1
+
+    assert client.delete(f"/api/pets/{segundo['id']}").status_code == 200
+    db.expire_all()
+    assert db.query(Arquivo).count() == 0
+    assert _arquivos(uploads) == []
+
+
+def test_replacing_a_photo_releases_the_previous_file(client, db, seed, uploads):
+    pet = _novo_pet(client, seed)
+    (uploads / pet['photo_url'][len('/uploads/'):]).with_suffix('.thumb.webp').write_bytes(b'miniatura')
+
+    resposta = client.put(f"/api/pets/{pet['id']}/photo", data={
+        'foto': (io.BytesIO(PNG + b'nova'), 'nova.png')
+    }, content_type='multipart/form-data')
+
+    assert resposta.status_code == 200
+    assert _arquivos(uploads) == [resposta.get_json()['photo_url'][len('/uploads/'):]]
+
+
+def test_files_are_kept_when_the_transaction_rolls_back(db, seed, uploads):
+    from models import Pet
+    from services.UploadStorageService import upload_storage
+
+    arquivo = upload_storage.store(str(uploads), io.BytesIO(PNG))
+    pet = Pet(name='Luna', breed='SRD', birth_date=datetime(2021, 1, 1), photo_url=arquivo.url)
+    db.add(pet)
+    upload_storage.acquire(db, arquivo)
+    db.commit()
+
+    upload_storage.release(db, str(uploads), pet.photo_url)
+    db.rollback()
+    assert (uploads / arquivo.caminho).exists()
+
+
+def test_legacy_flat_uploads_are_still_removed(client, db, seed, uploads):
+    from models import Pet
+
+    (uploads / '20251214_184024_Mia.jpg').write_bytes(b'antiga')
+    db.query(Pet).filter(Pet.id == seed['pet_ids'][1]).update({'photo_url': '/uploads/20251214_184024_Mia.jpg'})
+    db.commit()
+
+    assert client.delete(f"/api/pets/{seed['pet_ids'][1]}").status_code == 200
+    assert _arquivos(uploads) == []
+
+
+def test_invalid_pets_leave_no_file_behind(client, seed, uploads):
+    resposta = client.post('/api/pets', data={
+        'nome': 'Luna', 'birth_date': '2021-05-01', 'foto': (io.BytesIO(PNG), 'luna.png'),
+    }, content_type='multipart/form-data')
+
+    assert resposta.status_code == 400
+    assert _arquivos(uploads) == []
+    assert not list((uploads / '.tmp').iterdir())
+
+
+def test_file_released_between_store_and_acquire_is_written_again(client, db, seed, uploads):
+    from config.database import SessionLocal
+    from models import Arquivo, Pet
+    from services.UploadStorageService import upload_storage
+
+    pet = _novo_pet(client, seed)
+    arquivo = upload_storage.store(str(uploads), io.BytesIO(PNG))
+    assert not arquivo.novo
+
+    # Outra requisição apaga o único pet que usava o arquivo antes de este upload registrar a referência
+    outra = SessionLocal()
+    try:
+        upload_storage.release(outra, str(uploads), pet['photo_url'])
+        outra.commit()
+    finally:
+        outra.close()
+    assert _arquivos(uploads) == []
+
+    novo = Pet(name='Nina', breed='SRD', birth_date=datetime(2021, 1, 1), photo_url=arquivo.url)
+    db.add(novo)
+    upload_storage.acquire(db, arquivo)
+    db.commit()
+
+    assert (uploads / arquivo.caminho).read_bytes() == PNG
+    assert db.query(Arquivo).one().referencias == 1
+    assert not list((uploads / '.tmp').iterdir())
+
+
+def test_released_files_come_back_when_the_session_closes_without_commit(db, seed, uploads):
+    from config.database import SessionLocal
+    from services.UploadStorageService import upload_storage
+
+    arquivo = upload_storage.store(str(uploads), io.BytesIO(PNG))
+    upload_storage.acquire(db, arquivo)
+    db.commit()
+
+    sessao = SessionLocal()
+    upload_storage.release(sessao, str(uploads), arquivo.url)
+    assert not (uploads / arquivo.caminho).exists()  # fora do lugar enquanto a transação não termina
+    sessao.close()
+
+    assert (uploads / arquivo.caminho).read_bytes() == PNG
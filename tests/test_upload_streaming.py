@@ -0,0 +1,81 @@
+"""Uploads de imagem lidos em fluxo: tipo pelos bytes mágicos, limite de tamanho e rename atômico"""
+import hashlib
+import io
+
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 200
+WEBP = b'RIFF\x00\x00\x00\x00WEBPVP8 ' + b'\x00' * 50
+
+
+@pytest.fixture
+def uploads(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(client.application.config, 'UPLOAD_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+def _temporarios(uploads):
+    pasta = uploads / '.tmp'
+    return list(pasta.iterdir()) if pasta.exists() else []
+
+
+def _enviar_foto(client, pet_id, conteudo, nome='foto.png'):
+    return client.put(f'/api/pets/{pet_id}/photo', data={
+        'foto': (io.BytesIO(conteudo), nome)
+    }, content_type='multipart/form-data')
+
+
+def test_sniff_image_recognizes_the_accepted_formats():
+    from config.uploads import sniff_image
+
+    assert sniff_image(PNG[:12]) == 'png'
+    assert sniff_image(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01') == 'jpg'
+    assert sniff_image(b'GIF89a\x01\x00\x01\x00\x00\x00') == 'gif'
+    assert sniff_image(WEBP[:12]) == 'webp'
+    assert sniff_image(b'<?php echo 1;') is None
+
+
+def test_content_that_is_not_an_image_is_rejected_whatever_the_extension(client, db, seed, uploads):
+    from models import Pet
+
+    resposta = _enviar_foto(client, seed['pet_ids'][0], b'<script>alert(1)</script>', 'foto.png')
+
+    assert resposta.status_code == 415
+    assert resposta.get_json()['success'] is False
+    assert _temporarios(uploads) == []
+    assert db.get(Pet, seed['pet_ids'][0]).photo_url is None
+
+
+def test_oversized_images_are_rejected_while_streaming(client, seed, uploads, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'MAX_IMAGE_SIZE', 100)
+
+    resposta = _enviar_foto(client, seed['pet_ids'][0], PNG)
+
+    assert resposta.status_code == 413
+    assert _temporarios(uploads) == []
+
+
+def test_the_extension_comes_from_the_content(client, seed, uploads):
+    resposta = _enviar_foto(client, seed['pet_ids'][0], WEBP, 'foto.jpg')
+
+    hash_hex = hashlib.sha256(WEBP).hexdigest()
+    assert resposta.status_code == 200
+    assert resposta.get_json()['photo_url'].endswith(f'/{hash_hex}.webp')
+    assert (uploads / resposta.get_json()['photo_url'][len('/uploads/'):]).read_bytes() == WEBP
+    assert _temporarios(uploads) == []
+
+
+def test_unused_uploads_leave_no_temporary_files(client, uploads):
+    resposta = _enviar_foto(client, 999999, PNG)
+
+    assert resposta.status_code == 404
+    assert _temporarios(uploads) == []
+
+
+def test_csv_files_are_not_treated_as_images(client, seed, uploads):
+    resposta = client.post('/api/pets/import', data={
+        'arquivo': (io.BytesIO(f"nome,raca,birth_date,owner_email\nRex,SRD,2020-01-01,{seed['user_email']}\n".encode()), 'pets.csv'),
+    }, content_type='multipart/form-data')
+
+    assert resposta.status_code == 201
+    assert resposta.get_json()['importados'] == 1
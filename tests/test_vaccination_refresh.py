@@ -0,0 +1,110 @@
+"""O resumo pet_vaccination_status acompanha, na mesma transação, toda escrita em serviços de vacinação"""
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def resumo(db, seed):
+    """Resumo reconstruído a partir do seed; devolve uma função que lê a linha de um pet"""
+    from models import PetVaccinationStatus
+    from services.VaccinationService import vaccination_service
+
+    vaccination_service.rebuild(db)
+
+    def ler(pet_id):
+        db.expire_all()
+        status = db.get(PetVaccinationStatus, pet_id)
+        return (status.ultima_vacinacao, status.proxima_vacinacao) if status else None
+
+    return ler
+
+
+@pytest.fixture
+def auth(app_module, db, seed):
+    from models import User
+
+    user = db.query(User).filter(User.email == seed['user_email']).one()
+    return {'Authorization': f'Bearer {app_module.auth_service.issue_token(user)}'}
+
+
+def _esperado(data):
+    return data, data + timedelta(days=365)
+
+
+def _vacinar(client, seed, data):
+    resposta = client.post('/api/servicos', json={
+        'pet_id': seed['pet_ids'][0], 'tipo': 'vacinacao', 'data_agendada': data.isoformat(),
+        'clinica_id': seed['clinica_id'],
+    })
+    assert resposta.status_code == 201
+    return resposta.get_json()['servico']['id']
+
+
+def test_creating_a_vaccination_updates_the_summary(client, seed, resumo):
+    data = datetime.now().date() + timedelta(days=10)
+    _vacinar(client, seed, data)
+
+    assert resumo(seed['pet_ids'][0]) == _esperado(data)
+    assert resumo(seed['pet_ids'][1]) == _esperado(datetime.now().date() - timedelta(days=400))
+
+
+def test_updating_date_or_type_updates_the_summary(client, seed, resumo):
+    hoje = datetime.now().date()
+    servico_id = _vacinar(client, seed, hoje + timedelta(days=10))
+
+    assert client.put(f'/api/servicos/{servico_id}', json={'data_agendada': (hoje + timedelta(days=20)).isoformat()}).status_code == 200
+    assert resumo(seed['pet_ids'][0]) == _esperado(hoje + timedelta(days=20))
+
+    # Deixar de ser vacinação: volta para a vacinação anterior (arquivada pela criação)
+    assert client.put(f'/api/servicos/{servico_id}', json={'tipo': 'consulta'}).status_code == 200
+    assert resumo(seed['pet_ids'][0]) == _esperado(hoje - timedelta(days=400))
+
+    assert client.put(f'/api/servicos/{servico_id}', json={'tipo': 'vacinacao'}).status_code == 200
+    assert resumo(seed['pet_ids'][0]) == _esperado(hoje + timedelta(days=20))
+
+
+def test_deleting_a_vaccination_updates_the_summary(client, db, seed, resumo):
+    from models import Servico
+
+    vacina = db.query(Servico).filter(Servico.pet_id == seed['pet_ids'][1], Servico.tipo == 'vacinacao').one()
+
+    assert client.delete(f'/api/servicos/{vacina.id}').status_code == 200
+    assert resumo(seed['pet_ids'][1]) is None
+
+
+def test_chatbot_scheduling_updates_the_summary(client, seed, resumo, auth, app_module, monkeypatch):
+    data = datetime.now().date() + timedelta(days=3)
+    resposta_ia = {
+        'sucesso': True, 'acao': 'agendar', 'pet_nome': 'Thor', 'clinica_nome': 'VetCare',
+        'tipo': 'vacinacao', 'data': data.isoformat(),
+    }
+    completions = SimpleNamespace(create=lambda **_: SimpleNamespace(choices=[
+        SimpleNamespace(message=SimpleNamespace(content=json.dumps(resposta_ia)))
+    ]))
+    monkeypatch.setattr(app_module, 'openai_client', SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    resposta = client.post('/api/chatbot/agendar', json={'mensagem': 'Vacinar o Thor'}, headers=auth)
+
+    assert resposta.get_json()['success'] is True
+    assert resumo(seed['pet_ids'][1]) == _esperado(data)
+
+
+def test_rebuild_matches_incremental_refresh(client, db, seed, resumo):
+    from models import PetVaccinationStatus
+    from services.VaccinationService import vaccination_service
+
+    hoje = datetime.now().date()
+    servico_id = _vacinar(client, seed, hoje + timedelta(days=10))
+    client.put(f'/api/servicos/{servico_id}', json={'data_agendada': (hoje + timedelta(days=30)).isoformat()})
+    _vacinar(client, seed, hoje + timedelta(days=60))
+
+    def linhas():
+        db.expire_all()
+        return sorted((s.pet_id, s.ultima_vacinacao, s.proxima_vacinacao) for s in db.query(PetVaccinationStatus))
+
+    incremental = linhas()
+    vaccination_service.rebuild(db)
+    assert linhas() == incremental
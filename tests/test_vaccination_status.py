@@ -0,0 +1,71 @@
+"""Status de vacinação lido da tabela resumo pet_vaccination_status"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def pets_vacinados(db, seed):
+    """Mia vacinada há 365 dias, Thor há 366 dias, Luna sem vacinação e Rex (de outro dono) há 400 dias"""
+    from models import Pet, Servico, User
+    from services.VaccinationService import vaccination_service
+
+    hoje = datetime.now().date()
+    mia, thor = seed['pet_ids']
+    db.query(Servico).filter(Servico.tipo == 'vacinacao').delete()
+    db.add_all([
+        Servico(pet_id=mia, tipo='vacinacao', data_agendada=hoje - timedelta(days=365)),
+        Servico(pet_id=thor, tipo='vacinacao', data_agendada=hoje - timedelta(days=366)),
+    ])
+    luna = Pet(name='Luna', breed='SRD', birth_date=datetime(2021, 1, 1), owner_id=seed['user_id'])
+    outro = User(name='Bia', email='bia@petcloud.com', password='x')
+    db.add_all([luna, outro])
+    db.flush()
+    rex = Pet(name='Rex', breed='SRD', birth_date=datetime(2019, 1, 1), owner_id=outro.id)
+    db.add(rex)
+    db.flush()
+    db.add(Servico(pet_id=rex.id, tipo='vacinacao', data_agendada=hoje - timedelta(days=400)))
+    db.commit()
+    vaccination_service.rebuild(db)
+    return {'mia': mia, 'thor': thor, 'luna': luna.id, 'rex': rex.id, 'hoje': hoje, 'outro_id': outro.id}
+
+
+def test_vaccination_expires_after_365_days(db, seed, pets_vacinados):
+    from services.VaccinationService import vaccination_service
+
+    status = {s['pet_id']: s for s in vaccination_service.status_for_pets(db, owner_id=seed['user_id'])}
+
+    assert status[pets_vacinados['mia']]['vencida'] is False
+    assert status[pets_vacinados['mia']]['dias_desde_vacinacao'] == 365
+    assert status[pets_vacinados['thor']]['vencida'] is True
+    assert status[pets_vacinados['thor']]['dias_apos_vencimento'] == 1
+
+
+def test_pets_without_vaccination_are_overdue(db, seed, pets_vacinados):
+    from services.VaccinationService import vaccination_service
+
+    status = {s['pet_id']: s for s in vaccination_service.status_for_pets(db, owner_id=seed['user_id'])}
+
+    assert status[pets_vacinados['luna']] == {
+        'pet_id': pets_vacinados['luna'], 'pet_name': 'Luna', 'ultima_vacinacao': None, 'vencida': True,
+        'dias_desde_vacinacao': None, 'dias_apos_vencimento': None,
+    }
+
+
+def test_overdue_for_pets_matches_status_for_pets(db, seed, pets_vacinados):
+    from services.VaccinationService import vaccination_service
+
+    for owner_id in (seed['user_id'], pets_vacinados['outro_id'], None):
+        todos = vaccination_service.status_for_pets(db, owner_id=owner_id)
+        assert vaccination_service.overdue_for_pets(db, owner_id=owner_id) == [s for s in todos if s['vencida']]
+
+
+def test_owner_filter(db, seed, pets_vacinados):
+    from services.VaccinationService import vaccination_service
+
+    do_dono = vaccination_service.overdue_for_pets(db, owner_id=seed['user_id'])
+    assert [s['pet_id'] for s in do_dono] == [pets_vacinados['thor'], pets_vacinados['luna']]
+    assert [s['pet_id'] for s in vaccination_service.overdue_for_pets(db, owner_id=pets_vacinados['outro_id'])] == [
+        pets_vacinados['rex']
+    ]
+    assert len(vaccination_service.status_for_pets(db)) == 4
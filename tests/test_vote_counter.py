@@ -0,0 +1,230 @@
+"""Contador de votos write-behind do concurso"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def concurso_id(db, seed):
+    from models import Concurso
+    return db.query(Concurso.id).filter(Concurso.pet_id == seed['pet_ids'][0]).scalar()
+
+
+def _votos_no_banco(db, concurso_id):
+    from models import Concurso
+    db.expire_all()
+    return db.query(Concurso.votos).filter(Concurso.id == concurso_id).scalar()
+
+
+def _votar(client, concurso_id, headers):
+    return client.post(f'/api/concurso/votar/{concurso_id}', headers=headers)
+
+
+def test_votes_are_counted_in_memory_and_flushed_in_one_update(client, db, engine, concurso_id, voters):
+    from services.VoteCounterService import vote_counter
+
+    votantes = voters(6)
+    respostas = [_votar(client, concurso_id, headers).get_json()['votos'] for headers in votantes[:5]]
+    assert respostas == [4, 5, 6, 7, 8]
+    assert _votos_no_banco(db, concurso_id) == 3
+
+    fotos = client.get('/api/concurso/fotos').get_json()['fotos']
+    assert [f['votos'] for f in fotos if f['id'] == concurso_id] == [8]
+
+    updates = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(('UPDATE concursos', 'INSERT INTO concurso_votes')):
+            updates.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        assert vote_counter.flush() == 5
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    # Um INSERT em lote dos votos e um UPDATE em lote das contagens
+    assert len(updates) == 2 and 'votos + ?' in updates[1]
+    assert _votos_no_banco(db, concurso_id) == 8
+    from models import ConcursoVoto
+    assert db.query(ConcursoVoto).filter(ConcursoVoto.concurso_id == concurso_id).count() == 5
+    assert _votar(client, concurso_id, votantes[5]).get_json()['votos'] == 9
+
+
+def test_concurrent_votes_are_not_lost(client, db, concurso_id, voters):
+    from services.VoteCounterService import vote_counter
+
+    votantes = voters(200)
+
+    def votar(headers):
+        return _votar(client, concurso_id, headers).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert set(pool.map(votar, votantes)) == {200}
+
+    vote_counter.flush()
+    assert _votos_no_banco(db, concurso_id) == 3 + 200
+
+
+def test_repeated_votes_are_rejected_without_a_query(client, db, engine, concurso_id, voters):
+    from services.VoteCounterService import vote_counter
+
+    votante, outro = voters(2)
+    assert _votar(client, concurso_id, votante).status_code == 200
+
+    resposta = _votar(client, concurso_id, votante)
+    assert resposta.status_code == 409
+    assert resposta.get_json()['votos'] == 4
+    assert 'X-DB-Queries' not in resposta.headers
+
+    # Também depois de gravado, e com votos de usuários simultâneos
+    vote_counter.flush()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        status = list(pool.map(lambda headers: _votar(client, concurso_id, headers).status_code, [votante, outro] * 10))
+    assert sorted(status) == [200] + [409] * 19
+
+    vote_counter.flush()
+    assert _votos_no_banco(db, concurso_id) == 5
+
+
+def test_votes_need_a_user(client, concurso_id):
+    client.environ_base.pop('HTTP_AUTHORIZATION')
+    assert _votar(client, concurso_id, {}).status_code == 401
+
+
+def test_unknown_photo_returns_404(client, voters):
+    assert _votar(client, 999, voters(1)[0]).status_code == 404
+
+
+def test_votes_recorded_by_another_process_are_dropped_on_flush(db, seed, concurso_id):
+    from services.VoteCounterService import VoteCounterService
+
+    processo_a = VoteCounterService(flush_interval=3600)
+    processo_b = VoteCounterService(flush_interval=3600)
+    assert processo_a.record(db, concurso_id, seed['user_id']) == (4, True)
+    assert processo_b.record(db, concurso_id, seed['user_id']) == (4, True)
+
+    assert processo_a.flush() == 1
+    # A restrição única recusa o lote do outro processo; só o voto repetido é descartado
+    assert processo_b.flush() == 0
+    assert processo_b.pending() == {}
+    assert _votos_no_banco(db, concurso_id) == 4
+
+
+def test_warm_loads_existing_voters(db, seed, concurso_id):
+    from models import ConcursoVoto
+    from services.VoteCounterService import VoteCounterService
+
+    db.add(ConcursoVoto(concurso_id=concurso_id, user_id=seed['user_id']))
+    db.commit()
+
+    counter = VoteCounterService(flush_interval=3600)
+    assert counter.warm(db) == 1
+    assert counter.record(db, concurso_id, seed['user_id']) == (3, False)
+
+
+def test_failed_flush_keeps_votes_pending(db, concurso_id, monkeypatch):
+    import services.VoteCounterService as modulo
+    from config.database import SessionLocal
+
+    counter = modulo.VoteCounterService(flush_interval=3600)
+    counter.record(db, concurso_id, 101)
+    counter.record(db, concurso_id, 102)
+
+    class SessaoQuebrada:
+        def __init__(self):
+            self._db = SessionLocal()
+
+        def execute(self, *args, **kwargs):
+            raise RuntimeError('banco indisponível')
+
+        def __getattr__(self, nome):
+            return getattr(self._db, nome)
+
+    monkeypatch.setattr(modulo, 'SessionLocal', SessaoQuebrada)
+    assert counter.flush() == 0
+    assert counter.pending() == {concurso_id: 2}
+
+    monkeypatch.undo()
+    counter.stop()  # encerramento grava o pendente
+    assert counter.pending() == {}
+    assert _votos_no_banco(db, concurso_id) == 5
+
+
+def test_count_does_not_drop_while_flushing(db, concurso_id):
+    from services.VoteCounterService import VoteCounterService
+
+    counter = VoteCounterService(flush_interval=3600)
+    counter.record(db, concurso_id, 101)
+    counter.record(db, concurso_id, 102)
+    vistos = []
+    gravar = counter._write
+
+    def gravar_e_ler(sessao, lote):
+        # Outra requisição lendo a contagem no meio da gravação
+        vistos.append(counter.record(db, concurso_id, 101))
+        resultado = gravar(sessao, lote)
+        vistos.append(counter.record(db, concurso_id, 101))
+        return resultado
+
+    counter._write = gravar_e_ler
+    assert counter.flush() == 2
+    assert vistos == [(5, False), (5, False)]
+    assert counter.record(db, concurso_id, 101) == (5, False)
+    assert counter.pending() == {}
+
+
+def test_votes_of_forgotten_photos_are_not_written(db, concurso_id):
+    from models import Concurso, ConcursoVoto
+    from services.VoteCounterService import VoteCounterService
+
+    counter = VoteCounterService(flush_interval=3600)
+    counter.record(db, concurso_id, 101)
+    separar = counter._without_forgotten
+
+    def esquecer_durante_flush(lote):
+        # A foto é removida depois que o lote foi separado, antes da gravação
+        db.query(Concurso).filter(Concurso.id == concurso_id).delete()
+        db.commit()
+        counter.forget(concurso_id)
+        return separar(lote)
+
+    counter._without_forgotten = esquecer_durante_flush
+    assert counter.flush() == 0
+    assert counter.pending() == {}
+    assert db.query(ConcursoVoto).filter(ConcursoVoto.concurso_id == concurso_id).count() == 0
+
+
+def test_votes_of_photos_removed_by_another_process_are_dropped(db, concurso_id):
+    from models import Concurso, ConcursoVoto
+    from services.VoteCounterService import VoteCounterService
+
+    counter = VoteCounterService(flush_interval=3600)
+    counter.record(db, concurso_id, 101)
+    db.query(Concurso).filter(Concurso.id == concurso_id).delete()
+    db.commit()
+
+    assert counter.flush() == 0
+    assert db.query(ConcursoVoto).filter(ConcursoVoto.concurso_id == concurso_id).count() == 0
+
+
+def test_counters_are_warmed_once_per_process(app_module, monkeypatch):
+    from flask import Flask
+    from config.startup import init_app
+
+    chamadas = []
+    app = Flask(__name__)
+    app.add_url_rule('/', 'raiz', lambda: 'ok')
+    init_app(app, lambda: chamadas.append('aquecer'))
+
+    for _ in range(3):
+        assert app.test_client().get('/').status_code == 200
+    assert chamadas == ['aquecer']
+
+    # O app principal registra o aquecimento dos votos e o início da gravação
+    aquecido = []
+    monkeypatch.setattr(app_module.vote_counter, 'warm', lambda db: aquecido.append('warm'))
+    monkeypatch.setattr(app_module.vote_counter, 'start', lambda: aquecido.append('start'))
+    app_module._aquecer_votos()
+    assert aquecido == ['warm', 'start']